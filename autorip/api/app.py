@@ -1,32 +1,110 @@
 import os
-from typing import Any
+from typing import TYPE_CHECKING
 
 from api.database.json_storage import JsonStorage
 from core.config import Config
+from core.events.event_bus import EventBus
 from core.logger import Logger
+from core.metrics.metrics import CHILD_PROCESSES
+from core.tracing.tracer import Tracer
+from core.utils.lazy_utils import lazy_property
 from fastapi import FastAPI
-from handbrake.handbrake_wrapper import HandbrakeWrapper
-from media_management.uploader import Uploader
+from jobs.job_queue import JobQueue
+from jobs.lease_manager import LeaseManager
 from process.process_manager import ProcessManager
-from ripper.blueray_ripper import BlueRayRipper
+from process.transcripts import TranscriptRecorder
+
+if TYPE_CHECKING:
+    from handbrake.handbrake_wrapper import HandbrakeWrapper
+    from media_management.uploader import Uploader
+    from ripper.blueray_ripper import BlueRayRipper
 
 
 class App(FastAPI):
-    def __init__(self, *args: Any, **kwargs: Any):
-        super().__init__(*args, **kwargs)
+    """
+    The autorip service. Its subsystems are created on first use, so starting the service (e.g.
+    for a health check) doesn't pay for the ripper, encoder and uploader and their imports until
+    a job needs them.
+    """
+
+    @lazy_property
+    def config(self):
+        config = Config(os.environ.get("AUTORIP_CONFIG", "autorip.toml"))
+
+        os.makedirs(config.get["output"]["working_dir"], exist_ok=True)
+        os.makedirs(config.get["output"]["logging_dir"], exist_ok=True)
+
+        return config
+
+    @lazy_property
+    def logger(self):
+        return Logger(self.config)
+
+    @lazy_property
+    def process_manager(self):
+        process = self.config.get.get("process", {})
+        process_manager = ProcessManager(
+            self.logger, process.get("pools"), process.get("replay")
+        )
+        CHILD_PROCESSES.collector = lambda: [
+            ({"executable": name}, count)
+            for name, count in process_manager.process_counts().items()
+        ]
+        return process_manager
+
+    @lazy_property
+    def db(self):
+        return JsonStorage(
+            f"{self.config.get["output"]["logging_dir"]}/db.json",
+            self.config.get["output"].get("db_flush_interval", 1.0),
+        )
+
+    @lazy_property
+    def events(self):
+        return EventBus()
+
+    @lazy_property
+    def tracer(self):
+        return Tracer(
+            f"{self.config.get['output']['logging_dir']}/traces",
+            self.config.get["logger"].get("tracing", False),
+            self.logger,
+        )
+
+    @lazy_property
+    def transcripts(self):
+        return TranscriptRecorder(
+            f"{self.config.get['output']['logging_dir']}/transcripts",
+            self.config.get.get("process", {}).get("transcripts", False),
+        )
+
+    @lazy_property
+    def jobs(self):
+        return JobQueue(
+            self.db, self.logger, self.events, self.tracer, self.transcripts
+        )
+
+    @lazy_property
+    def leases(self):
+        return LeaseManager(
+            self.logger,
+            self.config.get.get("workers", {}).get("lease_timeout", 60),
+        )
+
+    @lazy_property
+    def ripper(self) -> "BlueRayRipper":
+        from ripper.blueray_ripper import BlueRayRipper
 
-        self.config = Config("autorip.toml")
+        return BlueRayRipper(self.config, self.logger, self.process_manager)
 
-        if not os.path.exists(self.config.get["output"]["working_dir"]):
-            os.makedirs(self.config.get["output"]["working_dir"])
+    @lazy_property
+    def encoder(self) -> "HandbrakeWrapper":
+        from handbrake.handbrake_wrapper import HandbrakeWrapper
 
-        if not os.path.exists(self.config.get["output"]["logging_dir"]):
-            os.makedirs(self.config.get["output"]["logging_dir"])
+        return HandbrakeWrapper(self.config, self.logger, self.process_manager)
 
-        self.logger = Logger(self.config)
-        self.process_manager = ProcessManager(self.logger)
-        self.db = JsonStorage(f"{self.config.get["output"]["logging_dir"]}/db.json")
+    @lazy_property
+    def uploader(self) -> "Uploader":
+        from media_management.uploader import Uploader
 
-        self.ripper = BlueRayRipper(self.config, self.logger, self.process_manager)
-        self.encoder = HandbrakeWrapper(self.config, self.logger, self.process_manager)
-        self.uploader = Uploader(self.config, self.logger)
+        return Uploader(self.config, self.logger)
@@ -1,13 +1,38 @@
+import atexit
 import json
 import os
+import tempfile
+import threading
+from contextlib import contextmanager
 from typing import Any
 
 
 class JsonStorage:
-    def __init__(self, path: str):
+    """
+    A key-value store which keeps its data in memory and persists it as JSON file. Changes are
+    not written immediately but flushed in the background at most once per `flush_interval`,
+    so frequent updates (e.g. progress) don't rewrite the file every time. The file is replaced
+    atomically, so a crash while writing never leaves a corrupted file behind.
+
+    Args:
+        - path (str): The path of the JSON file.
+        - flush_interval (float): The time in seconds changes are collected before they are
+            written, 0 writes every change immediately.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0):
         self.path = path
+        self.flush_interval = flush_interval
+
         self._data: dict[str, Any] = {}
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._dirty = False
+        self._batch_depth = 0
+        self._timer: threading.Timer | None = None
+
         self.load()
+        atexit.register(self.close)
 
     @property
     def data(self):
@@ -21,20 +46,102 @@ class JsonStorage:
             self._data = json.load(f)
 
     def save(self):
-        with open(self.path, "w", encoding="utf-8") as f:
-            json.dump(self._data, f, indent=4)
+        """
+        Marks the data as changed and schedules a write, unless a batch is in progress.
+        """
+
+        with self._lock:
+            self._dirty = True
+
+            if self._batch_depth > 0:
+                return
+
+            if self.flush_interval > 0:
+                if self._timer is None:
+                    self._timer = threading.Timer(self.flush_interval, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+
+        self.flush()
+
+    def flush(self):
+        """
+        Writes pending changes to disk immediately.
+        """
+
+        # Serialize the writes, so an older snapshot never overwrites a newer one
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+
+                if not self._dirty:
+                    return
+
+                content = json.dumps(self._data)
+                self._dirty = False
+
+            # The data can be changed again while the snapshot is written
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(content)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+            except BaseException:
+                os.remove(tmp)
+                raise
+
+    def close(self):
+        """
+        Writes pending changes, should be called before the application exits.
+        """
+
+        self.flush()
+
+    @contextmanager
+    def batch(self):
+        """
+        Collects all changes made within the context and schedules a single write at the end.
+        """
+
+        with self._lock:
+            self._batch_depth += 1
+
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                pending = self._batch_depth == 0 and self._dirty
+
+            if pending:
+                self.save()
 
     def get(self, key: str, default: Any = None):
         return self._data.get(key, default)
 
     def set(self, key: str, value: Any):
-        self._data[key] = value
+        with self._lock:
+            self._data[key] = value
+        self.save()
+
+    def update(self, values: dict[str, Any]):
+        with self._lock:
+            self._data.update(values)
         self.save()
 
     def delete(self, key: str):
-        if key in self._data:
+        with self._lock:
+            if key not in self._data:
+                return
             del self._data[key]
-            self.save()
+        self.save()
 
     def keys(self):
         return self._data.keys()
@@ -0,0 +1,100 @@
+"""
+Measures the throughput of `copy_with_callback` for every copy mode, with hashing and
+for the previous implementation, which copied through a Python read/write loop with a 64 KiB
+buffer and fired the callback for every chunk. The source files are sparse, so the benchmark
+doesn't need the disk space of a real encode.
+
+Usage (from the autorip directory):
+    python -m benchmarks.copy_benchmark [size in MiB] [directory]
+"""
+
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from typing import Callable
+
+from core.utils.file_utils import CopyMode, copy_with_callback
+
+
+def legacy_copy(src: str, dest: str, callback: Callable[[int, int, int], None]):
+    """
+    The previous copy loop of `copy_with_callback`.
+    """
+
+    size = os.stat(src).st_size
+    with open(src, "rb") as fsrc, open(dest, "wb") as fdest:
+        copied = 0
+        while True:
+            buf = fsrc.read(64 * 1024)
+            if not buf:
+                break
+            fdest.write(buf)
+            copied += len(buf)
+            callback(len(buf), copied, size)
+
+
+def create_sparse_file(path: str, size: int):
+    with open(path, "wb") as f:
+        # Some real data at the start, so the copy isn't trivially empty
+        f.write(os.urandom(min(size, 16 * 1024 * 1024)))
+        f.truncate(size)
+
+
+def measure(
+    name: str, size: int, fn: Callable[[Callable[[int, int, int], None]], object]
+):
+    callbacks = 0
+
+    def callback(*_: int):
+        nonlocal callbacks
+        callbacks += 1
+
+    start = time.perf_counter()
+    fn(callback)
+    elapsed = time.perf_counter() - start
+
+    throughput = size / 1024**2 / elapsed
+    print(f"  {name:<18} {throughput:10.1f} MiB/s  {callbacks:8d} callbacks")
+
+
+def main(size: int, directory: str | None):
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        src = os.path.join(tmp, "source.mkv")
+        dest = os.path.join(tmp, "destination.mkv")
+        create_sparse_file(src, size)
+
+        def copy(mode: CopyMode):
+            def run(cb: Callable[[int, int, int], None]):
+                copy_with_callback(src, dest, cb, mode=mode)
+
+            return run
+
+        def hashed(algorithm: str):
+            def run(cb: Callable[[int, int, int], None]):
+                copy_with_callback(src, dest, cb, hasher=hashlib.new(algorithm))
+
+            return run
+
+        def move(cb: Callable[[int, int, int], None]):
+            moved = os.path.join(tmp, "moved.mkv")
+            copy_with_callback(src, moved, cb, move=True)
+            os.rename(moved, src)
+
+        print(f"Copying a sparse file of {size / 1024**2:.0f} MiB in {tmp}")
+        measure("legacy (64 KiB)", size, lambda cb: legacy_copy(src, dest, cb))
+        measure("readinto", size, copy("readinto"))
+        measure("sendfile", size, copy("sendfile"))
+        measure("copy_file_range", size, copy("copy_file_range"))
+        measure("auto", size, copy("auto"))
+        measure("move (rename)", size, move)
+        measure("hashed (blake2b)", size, hashed("blake2b"))
+        measure("hashed (sha256)", size, hashed("sha256"))
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) * 1024**2 if len(sys.argv) > 1 else 1024**3,
+        sys.argv[2] if len(sys.argv) > 2 else None,
+    )
@@ -0,0 +1,106 @@
+"""
+Compares the streaming `DiscInfoParser` with the previous parse-after-exit implementation
+of `MakeMKVWrapper.read_disc_properties`.
+
+Usage (from the autorip directory):
+    python -m benchmarks.disc_info_parser_benchmark [stdout.log ...]
+
+Without arguments, a synthetic obfuscated disc is generated.
+"""
+
+import csv
+import sys
+import time
+from typing import Any, Callable
+
+from makemkv.constants.makemkv_attributes import MAKEMKV_ATTRIBUTE_ENUMS
+from makemkv.parsers.disc_info_parser import DiscInfoParser
+
+from benchmarks.fixtures import disc_info_lines
+
+
+def legacy_parse(lines: list[str]) -> tuple[dict[str, Any], dict[int, dict[str, Any]]]:
+    """
+    The previous implementation: the captured output is concatenated after the process exited
+    and parsed as a whole afterwards.
+    """
+
+    stdout = ""
+    for line in lines:
+        stdout += line + "\n"
+
+    disc: dict[str, Any] = {}
+    titles: dict[int, dict[str, Any]] = {}
+
+    for line in csv.reader(stdout.split("\n")):
+        if len(line) == 0:
+            continue
+
+        data = line[0].split(":", 1) + line[1:]
+        data = [int(x) if x.isdigit() else x for x in data]
+        key = data[0]
+
+        if key == "CINFO" and data[1] in MAKEMKV_ATTRIBUTE_ENUMS:
+            disc[MAKEMKV_ATTRIBUTE_ENUMS[data[1]]] = data[3]
+
+        elif key == "TINFO":
+            title = titles.setdefault(int(data[1]), {})
+            if data[2] in MAKEMKV_ATTRIBUTE_ENUMS:
+                title[MAKEMKV_ATTRIBUTE_ENUMS[data[2]]] = data[4]
+
+        elif key == "SINFO":
+            streams: dict[int, dict[str, Any]] = titles[int(data[1])].setdefault(
+                "streams", {}
+            )
+            stream = streams.setdefault(int(data[2]), {})
+            if data[3] in MAKEMKV_ATTRIBUTE_ENUMS:
+                stream[MAKEMKV_ATTRIBUTE_ENUMS[data[3]]] = data[5]
+
+    return (disc, titles)
+
+
+def streaming_parse(lines: list[str]):
+    parser = DiscInfoParser()
+    for line in lines:
+        parser.feed(line)
+    return parser.finish()
+
+
+def measure(fn: Callable[[list[str]], object], lines: list[str], repeats: int = 5):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(lines)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(paths: list[str]):
+    fixtures: list[tuple[str, list[str]]] = []
+
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            fixtures.append((path, [line.strip() for line in f]))
+
+    if not fixtures:
+        fixtures.append(("synthetic (900 titles)", disc_info_lines(900)))
+
+    for name, lines in fixtures:
+        assert legacy_parse(lines) == streaming_parse(lines), "parsers disagree"
+
+        size = sum(len(line) + 1 for line in lines) / 1024**2
+        legacy = measure(legacy_parse, lines)
+        streaming = measure(streaming_parse, lines)
+
+        print(f"{name}: {len(lines)} lines, {size:.2f} MiB")
+        print(
+            f"  legacy    {legacy * 1000:8.1f} ms  {len(lines) / legacy:12.0f} lines/s"
+        )
+        print(
+            f"  streaming {streaming * 1000:8.1f} ms  {len(lines) / streaming:12.0f} lines/s"
+            f"  ({legacy / streaming:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,170 @@
+"""
+Runs movie jobs through the whole pipeline of the service (scan, rip, encode and upload) with
+the simulated makemkvcon and HandBrakeCLI of `fakes/` and fake TMDB and Radarr servers. Reports
+the wall time, the CPU time and the peak RSS of the Python process per stage, so the overhead
+of autorip itself (process supervision, parsers, job storage, copying) shows up as numbers
+without a drive or hours of encoding. The CPU time of the fake tools is not included. The disc
+scan runs within the ripping stage, its row only reports the wall time the job recorded.
+
+Usage (from the autorip directory):
+    python -m benchmarks.end_to_end_benchmark [jobs] [rip size MiB] [seconds per tool]
+"""
+
+import json
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Any
+
+from core.utils.typing_utils import aware
+from fakes.fake_radarr import FakeRadarr
+from fakes.fake_tmdb import FakeTmdb
+
+from benchmarks.fixtures import write_config
+
+FAKES_BIN = os.path.join(os.path.dirname(os.path.dirname(__file__)), "fakes", "bin")
+
+
+def rss():
+    """
+    Returns the current resident set size of the process in bytes.
+    """
+
+    try:
+        with open("/proc/self/statm", "r", encoding="utf-8") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class StageMonitor(threading.Thread):
+    """
+    Samples the state of a job and attributes wall time, CPU time and peak RSS of the process
+    to the stage the job is running in.
+
+    Args:
+        - jobs (Any): The job queue of the app.
+        - job_id (str): The job to monitor.
+        - interval (float): The seconds between two samples.
+    """
+
+    def __init__(self, jobs: Any, job_id: str, interval: float = 0.005):
+        super().__init__(daemon=True)
+        self.stages: dict[str, dict[str, float]] = {}
+        self.state = "queued"
+
+        self._jobs = jobs
+        self._job_id = job_id
+        self._interval = interval
+
+    def run(self):
+        current: str | None = None
+        (wall, cpu) = (0.0, 0.0)
+
+        while self.state not in ("finished", "error"):
+            job = self._jobs.get(self._job_id)
+            self.state = job["state"]
+            stage = job["stage"] if self.state == "running" else None
+
+            if stage != current:
+                if current is not None:
+                    self.stages[current]["wall"] = time.perf_counter() - wall
+                    self.stages[current]["cpu"] = time.process_time() - cpu
+
+                (current, wall, cpu) = (stage, time.perf_counter(), time.process_time())
+
+                if current is not None:
+                    self.stages[current] = {"wall": 0, "cpu": 0, "rss": 0}
+
+            if current is not None:
+                self.stages[current]["rss"] = max(self.stages[current]["rss"], rss())
+
+            time.sleep(self._interval)
+
+
+def main(jobs: int, rip_size: int, seconds: float):
+    with (
+        tempfile.TemporaryDirectory() as directory,
+        FakeTmdb() as tmdb,
+        FakeRadarr(command_delay=0.1) as radarr,
+    ):
+        preset = os.path.join(directory, "preset.json")
+        with open(preset, "w", encoding="utf-8") as f:
+            json.dump({"PresetList": [{"PresetName": "Benchmark"}]}, f)
+
+        os.environ.update(
+            AUTORIP_CONFIG=write_config(
+                directory,
+                metadata={"tmdb_url": tmdb.url},
+                media={"radarr_url": radarr.url},
+                output={
+                    "presets": [{"type": "movie", "name": "Benchmark", "path": preset}]
+                },
+            ),
+            PATH=f"{FAKES_BIN}{os.pathsep}{os.environ['PATH']}",
+            FAKE_RIP_SIZE_MB=str(rip_size),
+            FAKE_RIP_SECONDS=str(seconds),
+            FAKE_ENCODE_SECONDS=str(seconds),
+        )
+
+        # The app reads its config on import
+        import main as service
+
+        service.start_jobs()
+        results: dict[str, list[dict[str, float]]] = defaultdict(list)
+
+        print(f"Running {jobs} movie jobs, {rip_size} MiB rips, {seconds} s per tool")
+
+        for i in range(jobs):
+            job = service.app.jobs.submit(tmdb_id=600 + i, media_type="movie")
+            monitor = StageMonitor(service.app.jobs, job["id"])
+            monitor.start()
+            monitor.join()
+
+            if monitor.state == "error":
+                error = aware(service.app.jobs.get(job["id"])).get("error")
+                raise RuntimeError(f"Job {job['id']} failed: {error}")
+
+            # The scan is part of the ripping stage, only its duration is recorded
+            finished = aware(service.app.jobs.get(job["id"]))
+            durations = finished.get("stage_durations", {})
+            if "scan" in durations:
+                results["scan"].append({"wall": durations["scan"]})
+
+            for stage, values in monitor.stages.items():
+                results[stage].append(values)
+
+        service.flush_db()
+        service.flush_logs()
+
+        print(
+            f"\n  {'stage':<12} {'wall':>9} {'cpu':>9} {'cpu/wall':>9} {'peak rss':>11}"
+        )
+
+        for stage, runs in results.items():
+            wall = statistics.median(run["wall"] for run in runs)
+
+            if "cpu" not in runs[0]:
+                print(f"  {stage:<12} {wall:8.2f}s {'-':>9} {'-':>9} {'-':>11}")
+                continue
+
+            cpu = statistics.median(run["cpu"] for run in runs)
+            peak = max(run["rss"] for run in runs)
+
+            print(
+                f"  {stage:<12} {wall:8.2f}s {cpu:8.2f}s {cpu / wall:8.1%} "
+                f"{peak / 1024**2:7.1f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 3,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 1024,
+        float(sys.argv[3]) if len(sys.argv) > 3 else 3,
+    )
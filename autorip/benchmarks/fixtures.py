@@ -0,0 +1,274 @@
+import json
+import os
+import random
+import sys
+from typing import Any, cast
+
+
+def disc_info_lines(titles: int = 400, seed: int = 0):
+    """
+    Generates the robot output of a `makemkvcon -r info` run for a synthetic, playlist
+    obfuscated Blu-ray disc. All titles reference the same m2ts segments in a different order,
+    like on real obfuscated discs.
+
+    Args:
+        - titles (int): The number of titles (playlists) on the disc.
+        - seed (int): The seed of the random generator, so fixtures are reproducible.
+
+    Returns:
+        list[str]: The output lines without trailing newlines.
+    """
+
+    rnd = random.Random(seed)
+    segments = list(range(10, 60))
+
+    lines = [
+        'MSG:1005,0,1,"MakeMKV v1.17.5 linux(x64-release) started","%1 started",'
+        '"MakeMKV v1.17.5 linux(x64-release)"',
+        'DRV:0,2,999,1,"BD-RE HL-DT-ST BD-RE WH16NS60 1.02","SYNTHETIC","/dev/sr0"',
+        'MSG:3007,0,0,"Using direct disc access mode","Using direct disc access mode"',
+        f"TCOUNT:{titles}",
+        'CINFO:1,6209,"Blu-ray disc"',
+        'CINFO:2,0,"Synthetic Disc"',
+        'CINFO:28,0,"eng"',
+        'CINFO:29,0,"English"',
+        'CINFO:30,0,"Synthetic Disc"',
+        'CINFO:31,6119,"<b>Source information</b><br>"',
+        'CINFO:32,0,"SYNTHETIC"',
+        'CINFO:33,0,"0"',
+    ]
+
+    for title in range(titles):
+        order = segments[:]
+        if title > 0:
+            rnd.shuffle(order)
+
+        duration = 7200 + rnd.randint(-30, 30)
+        size = 30_000_000_000 + rnd.randint(0, 999_999_999)
+
+        lines += [
+            f'TINFO:{title},2,0,"Synthetic Disc"',
+            f'TINFO:{title},8,0,"{rnd.randint(16, 32)}"',
+            f'TINFO:{title},9,0,"{duration // 3600}:{duration // 60 % 60:02}:'
+            f'{duration % 60:02}"',
+            f'TINFO:{title},10,0,"{size / 1024 ** 3:.1f} GB"',
+            f'TINFO:{title},11,0,"{size}"',
+            f'TINFO:{title},16,0,"{800 + title:05}.mpls"',
+            f'TINFO:{title},25,0,"{len(order)}"',
+            f'TINFO:{title},26,0,"{",".join(str(s) for s in order)}"',
+            f'TINFO:{title},27,0,"Synthetic_Disc_t{title:02}.mkv"',
+            f'TINFO:{title},28,0,"eng"',
+            f'TINFO:{title},29,0,"English"',
+            f'TINFO:{title},30,0,"Synthetic Disc - {len(order)} chapter(s) , 28.0 GB"',
+            f'TINFO:{title},31,6120,"<b>Title information</b><br>"',
+            f'TINFO:{title},33,0,"0"',
+        ]
+
+        streams = [
+            ("Video", 6201, "V_MPEG4/ISO/AVC", "", "1920x1080"),
+            ("Audio", 6202, "A_TRUEHD", "eng", "8"),
+            ("Audio", 6202, "A_AC3", "eng", "6"),
+            ("Audio", 6202, "A_AC3", "deu", "6"),
+            ("Subtitles", 6203, "S_HDMV/PGS", "eng", ""),
+            ("Subtitles", 6203, "S_HDMV/PGS", "deu", ""),
+        ]
+
+        for index, (kind, code, codec, lang, extra) in enumerate(streams):
+            lines += [
+                f'SINFO:{title},{index},1,{code},"{kind}"',
+                f'SINFO:{title},{index},2,0,"{kind} {index}"',
+                f'SINFO:{title},{index},5,0,"{codec}"',
+                f'SINFO:{title},{index},6,0,"{codec.split("/")[0]}"',
+                f'SINFO:{title},{index},7,0,"{codec}"',
+                f'SINFO:{title},{index},13,0,"{rnd.randint(192, 40000)} Kb/s"',
+                f'SINFO:{title},{index},30,0,"{kind} {codec}"',
+                f'SINFO:{title},{index},33,0,"90"',
+                f'SINFO:{title},{index},38,0,""',
+                f'SINFO:{title},{index},42,5088,"( Lossless conversion )"',
+            ]
+            if lang:
+                lines += [
+                    f'SINFO:{title},{index},3,0,"{lang}"',
+                    f'SINFO:{title},{index},4,0,"{lang.title()}"',
+                ]
+            if kind == "Video":
+                lines += [
+                    f'SINFO:{title},{index},19,0,"{extra}"',
+                    f'SINFO:{title},{index},20,0,"16:9"',
+                    f'SINFO:{title},{index},21,0,"23.976 (24000/1001)"',
+                ]
+            elif kind == "Audio":
+                lines += [
+                    f'SINFO:{title},{index},14,0,"{extra}"',
+                    f'SINFO:{title},{index},17,0,"48000"',
+                ]
+
+    lines.append(
+        'MSG:5011,0,0,"Operation successfully completed","Operation successfully '
+        'completed"'
+    )
+
+    return lines
+
+
+def write_config(directory: str, **sections: dict[str, Any]):
+    """
+    Writes a valid autorip.toml into the given directory, using the directory for the working
+    and logging directories. Single keys can be overwritten by passing sections.
+
+    Args:
+        - directory (str): The directory the config and all outputs are placed in.
+        - sections (dict[str, Any]): Keys that overwrite the defaults of a section.
+
+    Returns:
+        str: The path of the written config.
+    """
+
+    config: dict[str, dict[str, Any]] = {
+        "logger": {"debug": False, "silent": True},
+        "input": {"device": "/dev/sr0", "read_from_log": False},
+        "output": {
+            "languages": ["eng"],
+            "logging_dir": os.path.join(directory, "logs"),
+            "working_dir": os.path.join(directory, "work"),
+            "eject_disc": False,
+            "presets": [],
+        },
+        "metadata": {"imdb_token": "benchmark"},
+        "media": {
+            "media_dir": os.path.join(directory, "media") + "/",
+            "radarr_token": "benchmark",
+            "radarr_quality_profile": "HD-1080p",
+            "radarr_url": "http://127.0.0.1:7878",
+        },
+    }
+
+    for section, values in sections.items():
+        config.setdefault(section, {}).update(values)
+
+    path = os.path.join(directory, "autorip.toml")
+    with open(path, "w", encoding="utf-8") as f:
+        for section, values in config.items():
+            f.write(f"[{section}]\n")
+            for key, value in values.items():
+                f.write(f"{key} = {_toml_value(value)}\n")
+            f.write("\n")
+
+    return path
+
+
+def _toml_value(value: Any) -> str:
+    if isinstance(value, dict):
+        table = cast(dict[str, Any], value)
+        items = ", ".join(f"{k} = {_toml_value(v)}" for k, v in table.items())
+        return f"{{ {items} }}"
+
+    if isinstance(value, list):
+        array = cast(list[Any], value)
+        return f"[{', '.join(_toml_value(v) for v in array)}]"
+
+    return json.dumps(value)
+
+
+def prgv_emitter(lines: int, stderr_lines: int = 0):
+    """
+    Returns the arguments of a child process that replays the progress output of a
+    `makemkvcon --progress=-same mkv` run as fast as possible.
+
+    Args:
+        - lines (int): The number of PRGV lines to emit on stdout.
+        - stderr_lines (int): The number of lines to emit on stderr in between.
+
+    Returns:
+        list[str]: The arguments to spawn the emitter with.
+    """
+
+    code = f"""
+import sys
+lines, stderr_lines = {lines}, {stderr_lines}
+every = max(1, lines // stderr_lines) if stderr_lines else 0
+print('MSG:5085,0,0,"Loaded content hash table"')
+print('PRGT:5018,0,"Saving to MKV file"')
+for i in range(lines):
+    print(f"PRGV:{{i}},{{i}},{{lines}}")
+    if every and i % every == 0:
+        print(f"libmkv: chatty diagnostic message number {{i}}", file=sys.stderr)
+print('MSG:5036,0,1,"Copy complete. 1 titles saved."')
+"""
+
+    return [sys.executable, "-c", code]
+
+
+def handbrake_progress_lines(blocks: int = 10_000, passes: int = 2, seed: int = 0):
+    """
+    Generates the stdout of a `HandBrakeCLI --json` encode, stripped like the process manager
+    passes it on: the version and title set blocks, scanning and working progress blocks for
+    every pass, muxing and the final work done block.
+
+    Args:
+        - blocks (int): The number of working progress blocks over all passes.
+        - passes (int): The number of passes of the encode.
+        - seed (int): The seed of the random generator, so fixtures are reproducible.
+
+    Returns:
+        list[str]: The output lines without leading whitespace and trailing newlines.
+    """
+
+    rnd = random.Random(seed)
+
+    def block(name: str, value: dict[str, Any]):
+        return [
+            line.strip()
+            for line in f"{name}: {json.dumps(value, indent=4)}".splitlines()
+        ]
+
+    lines = block("Version", {"Arch": "x86_64", "Name": "HandBrake", "Official": True})
+    lines += block(
+        "JSON Title Set",
+        {
+            "MainFeature": 0,
+            "TitleList": [
+                {"Name": "Synthetic {Disc}", "Path": "/rips/movie.mkv", "Index": 1}
+            ],
+        },
+    )
+
+    for progress in range(0, 101, 25):
+        lines += block(
+            "Progress",
+            {
+                "State": "SCANNING",
+                "Scanning": {"Preview": 1, "Progress": progress / 100, "Title": 1},
+            },
+        )
+
+    per_pass = blocks // passes
+    for pass_number in range(1, passes + 1):
+        for i in range(per_pass):
+            rate = 60 + rnd.random() * 20
+            lines += block(
+                "Progress",
+                {
+                    "State": "WORKING",
+                    "Working": {
+                        "ETASeconds": (per_pass - i) * (passes - pass_number + 1),
+                        "Hours": 0,
+                        "Minutes": 0,
+                        "Pass": pass_number,
+                        "PassCount": passes,
+                        "PassID": pass_number,
+                        "Paused": 0,
+                        "Progress": i / per_pass,
+                        "Rate": rate,
+                        "RateAvg": 70.0,
+                        "Seconds": 0,
+                        "SequenceID": 1,
+                    },
+                },
+            )
+
+    lines += block("Progress", {"State": "MUXING", "Muxing": {"Progress": 0.5}})
+    lines += block("Progress", {"State": "WORKDONE", "WorkDone": {"Error": 0}})
+    lines.append("Encode done!")
+
+    return lines
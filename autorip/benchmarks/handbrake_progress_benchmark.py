@@ -0,0 +1,166 @@
+"""
+Replays captured HandBrakeCLI --json output through the structured `HandbrakeProgressParser`
+and the previous line based parser of `HandbrakeWrapper.encode_file`, once for the parsers
+alone and once for the whole line callback of the encode with debug logging, which the
+previous implementation did for every line and the current one once per progress block.
+
+Usage (from the autorip directory):
+    python -m benchmarks.handbrake_progress_benchmark [handbrake.log ...]
+
+Without arguments, a synthetic two pass encode is generated.
+"""
+
+import json
+import sys
+import tempfile
+import time
+from typing import Callable
+
+from core.config import Config
+from core.logger import Logger
+from handbrake.parsers.progress_parser import (
+    HandbrakeProgressParser,
+    ProgressHistory,
+    overall_progress,
+)
+
+from benchmarks.fixtures import handbrake_progress_lines, write_config
+
+
+def legacy_parse(lines: list[str]):
+    """
+    The previous implementation: a substring check and split on every line.
+    """
+
+    updates = 0
+    for line in lines:
+        if '"Progress":' in line:
+            float(line.split(":")[1].split(",")[0].strip())
+            updates += 1
+        elif '"ETASeconds":' in line:
+            float(line.split(":")[1].split(",")[0].strip())
+            updates += 1
+    return updates
+
+
+def structured_parse(lines: list[str]):
+    parser = HandbrakeProgressParser(ProgressHistory())
+    records = 0
+    for line in lines:
+        if parser.feed(line) is not None:
+            records += 1
+    return records
+
+
+def legacy_callback(logger: Logger):
+    """
+    The previous line callback of `HandbrakeWrapper.encode_file`.
+    """
+
+    def run(lines: list[str]):
+        updates: list[float] = []
+
+        def encode_callback(line: str):
+            logger.debug(line)
+
+            if '"Progress":' in line:
+                updates.append(float(line.split(":")[1].split(",")[0].strip()))
+
+            if '"ETASeconds":' in line:
+                updates.append(float(line.split(":")[1].split(",")[0].strip()))
+
+        for line in lines:
+            encode_callback(line)
+
+        return len(updates)
+
+    return run
+
+
+def structured_callback(logger: Logger):
+    """
+    The line callback of `HandbrakeWrapper.encode_file` feeding the structured parser.
+    """
+
+    def run(lines: list[str]):
+        parser = HandbrakeProgressParser(ProgressHistory())
+        updates: list[float] = []
+
+        def encode_callback(line: str):
+            record = parser.feed(line)
+
+            if record is not None:
+                if logger.debug_enabled:
+                    logger.debug(f"{parser.PREFIX} {json.dumps(record)}")
+                if record["state"] == "WORKING":
+                    updates.append(overall_progress(record))
+            elif not parser.in_block:
+                logger.debug(line)
+
+        for line in lines:
+            encode_callback(line)
+
+        return len(updates)
+
+    return run
+
+
+def measure(fn: Callable[[list[str]], int], lines: list[str], repeats: int = 5):
+    (best, count) = (float("inf"), 0)
+    for _ in range(repeats):
+        start = time.perf_counter()
+        count = fn(lines)
+        best = min(best, time.perf_counter() - start)
+    return (best, count)
+
+
+def report(name: str, lines: list[str], legacy: float, structured: float):
+    print(f"  {name}")
+    print(
+        f"    legacy     {legacy * 1000:8.1f} ms  {len(lines) / legacy:12.0f} lines/s"
+    )
+    print(
+        f"    structured {structured * 1000:8.1f} ms"
+        f"  {len(lines) / structured:12.0f} lines/s  ({structured / legacy:.2f}x the time)"
+    )
+
+
+def main(paths: list[str]):
+    fixtures: list[tuple[str, list[str]]] = []
+
+    for path in paths:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            fixtures.append((path, [line.strip() for line in f]))
+
+    if not fixtures:
+        fixtures.append(("synthetic (2 passes)", handbrake_progress_lines()))
+
+    for name, lines in fixtures:
+        (legacy, updates) = measure(legacy_parse, lines)
+        (structured, records) = measure(structured_parse, lines)
+
+        print(f"{name}: {len(lines)} lines, {updates} values, {records} records")
+        report("parser only", lines, legacy, structured)
+
+        # Loggers share the logging.Logger of the process, so only one exists at a time
+        for debug in (False, True):
+            with tempfile.TemporaryDirectory() as directory:
+                logger = Logger(
+                    Config(
+                        write_config(
+                            directory,
+                            logger={"debug": debug, "silent": True, "file": True},
+                        )
+                    )
+                )
+
+                (legacy, _) = measure(legacy_callback(logger), lines)
+                (structured, _) = measure(structured_callback(logger), lines)
+                logger.close()
+
+            state = "on" if debug else "off"
+            report(f"line callback, debug logging {state}", lines, legacy, structured)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,107 @@
+"""
+Measures how many job progress updates per second the job queue can persist with a database
+of a realistic size, for the previous storage which rewrote the whole file on every change,
+for atomic writes on every change and for debounced background flushing.
+
+Usage (from the autorip directory):
+    python -m benchmarks.json_storage_benchmark [updates] [jobs]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any
+
+from api.database.json_storage import JsonStorage
+from core.config import Config
+from core.logger import Logger
+from jobs.job_queue import JobQueue
+
+from benchmarks.fixtures import write_config
+
+
+class LegacyJsonStorage(JsonStorage):
+    """
+    The previous storage, which synchronously rewrote the whole file on every change.
+    """
+
+    def save(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, indent=4)
+
+    def flush(self):
+        pass
+
+
+def fake_jobs(count: int):
+    return {
+        f"{i:032x}": {
+            "id": f"{i:032x}",
+            "tmdb_id": 1000 + i,
+            "media_type": "movie",
+            "stage": "uploading",
+            "state": "finished",
+            "progress": 1,
+            "eta": 0,
+            "created_at": time.time(),
+            "updated_at": time.time(),
+            "metadata": {"title": f"Movie {i}", "runtime": 120, "genres": ["Drama"]},
+            "rip_name": f"Movie_{i}.mkv",
+            "rip_path": f"/tmp/ripping/Movie_{i}.mkv",
+        }
+        for i in range(count)
+    }
+
+
+def measure(name: str, storage: JsonStorage, logger: Logger, updates: int):
+    queue = JobQueue(storage, logger)
+    queue.add_stage("ripping", lambda _: None)
+    job = queue.submit(tmdb_id=1, media_type="movie")
+
+    start = time.perf_counter()
+    for i in range(updates):
+        queue.update(job["id"], progress=i / updates, eta=updates - i)
+    storage.close()
+    elapsed = time.perf_counter() - start
+
+    print(f"  {name:<24} {updates / elapsed:12.0f} updates/s")
+
+
+def main(updates: int, jobs: int):
+    with tempfile.TemporaryDirectory() as directory:
+        logger = Logger(Config(write_config(directory)))
+
+        def storage(cls: Any, name: str, **kwargs: Any):
+            path = os.path.join(directory, f"{name}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"jobs": fake_jobs(jobs)}, f)
+            return cls(path, **kwargs)
+
+        print(f"Persisting {updates} progress updates with {jobs} jobs in the database")
+        measure(
+            "legacy (sync, indent)",
+            storage(LegacyJsonStorage, "legacy"),
+            logger,
+            updates,
+        )
+        measure(
+            "atomic (every change)",
+            storage(JsonStorage, "atomic", flush_interval=0),
+            logger,
+            updates,
+        )
+        measure(
+            "debounced (1 s)",
+            storage(JsonStorage, "debounced", flush_interval=1),
+            logger,
+            updates,
+        )
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 2_000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 200,
+    )
@@ -0,0 +1,97 @@
+"""
+Measures the throughput of the reader loop of `ProcessManager.call` while every output line of
+a `makemkvcon mkv` rip is logged, with debug logging off, with the previous logger writing
+synchronously from the reader loop, and with the queued logger with and without sampling of
+progress lines. The time until the queued records are written is measured separately.
+
+Usage (from the autorip directory):
+    python -m benchmarks.logging_benchmark [lines]
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import Any
+
+from core.config import Config
+from core.logger import Logger
+from process.process_manager import ProcessManager
+
+from benchmarks.fixtures import prgv_emitter, write_config
+
+
+class LegacyLogger(Logger):
+    """
+    The previous logger, which wrote every record synchronously from the calling thread. It
+    logs into a file instead of stdout, so the terminal doesn't distort the measurement.
+    """
+
+    def __init__(self, config: Config, path: str):
+        self._log = logging.getLogger("legacy")
+        self._log.setLevel(logging.DEBUG)
+        self._log.propagate = False
+
+        self._handler = logging.FileHandler(path, encoding="utf-8")
+        self._handler.setFormatter(
+            logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+        )
+        self._log.addHandler(self._handler)
+
+    def __del__(self):
+        pass
+
+    def _emit(self, level: int, msg: str):
+        self._log.log(level, msg)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self._log.removeHandler(self._handler)
+        self._handler.close()
+
+
+def measure(name: str, logger: Logger, lines: int):
+    manager = ProcessManager(logger)
+
+    start = time.perf_counter()
+    manager.call(prgv_emitter(lines), cb=logger.debug)
+    loop = time.perf_counter() - start
+
+    logger.flush()
+    drained = time.perf_counter() - start
+    logger.close()
+
+    print(
+        f"  {name:<24} {lines / loop:12.0f} lines/s  "
+        f"loop {loop:6.2f} s  written {drained:6.2f} s"
+    )
+
+
+def main(lines: int):
+    with tempfile.TemporaryDirectory() as directory:
+
+        def config(name: str, **logger: Any):
+            path = os.path.join(directory, name)
+            os.makedirs(path)
+            return Config(
+                write_config(
+                    path, logger={"debug": True, "silent": True, "file": True, **logger}
+                )
+            )
+
+        print(f"Logging {lines} PRGV lines from the reader loop")
+        measure("debug off", Logger(config("off", debug=False)), lines)
+        measure(
+            "legacy (synchronous)",
+            LegacyLogger(config("legacy"), os.path.join(directory, "legacy.log")),
+            lines,
+        )
+        measure("queued", Logger(config("queued", sampling=[])), lines)
+        measure("queued, sampled (1 s)", Logger(config("sampled")), lines)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500_000)
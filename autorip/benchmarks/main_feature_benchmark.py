@@ -0,0 +1,133 @@
+"""
+Compares the NumPy main feature scoring with the previous nested-loop implementation of
+`BlueRayRipper.detect_main_feature` on synthetic obfuscated discs, and checks that the
+detected main feature doesn't depend on the order of the titles.
+
+Usage (from the autorip directory):
+    python -m benchmarks.main_feature_benchmark [titles ...]
+"""
+
+# The benchmark drives the internals of the ripper to time scoring on its own
+# pyright: reportPrivateUsage=false
+
+import random
+import sys
+import tempfile
+import time
+from typing import Callable
+
+from core.config import Config
+from core.logger import Logger
+from makemkv.parsers.disc_info_parser import DiscInfoParser
+from process.process_manager import ProcessManager
+from ripper.blueray_ripper import BlueRayRipper
+
+from benchmarks.fixtures import disc_info_lines, write_config
+
+
+def legacy_detect(metrics: list[tuple[int, int, int, int, int, int]]):
+    """
+    The previous scoring of `detect_main_feature`, on the previous metric tuples. The sort key
+    iterated over `range(len(metrics))`, which raises an IndexError for more than five titles,
+    and a metric with a maximum of zero divided by zero, both are worked around here.
+    """
+
+    weights = [0.81, 0.52, 0.089, 0.071, 0.030]
+
+    max_of_field = list(
+        max(list(float(x[i]) for x in metrics)) or 1 for i in range(len(weights))
+    )
+
+    metrics = list(filter(lambda x: x[0] > 0.85 * max_of_field[0], metrics))
+
+    metrics = sorted(
+        metrics,
+        key=lambda row: sum(
+            row[i] * weights[i] / max_of_field[i] for i in range(len(weights))
+        ),
+    )
+
+    return metrics[0][-1]
+
+
+def legacy_metrics(ripper: BlueRayRipper, runtime: int):
+    metrics: list[tuple[int, int, int, int, int, int]] = []
+
+    def is_type(stream: dict[str, str], stream_type: str):
+        return "type" in stream and stream_type in stream["type"].lower()
+
+    for title, title_info in ripper._titles.items():
+        stream = title_info.get("streams", {}).values()
+        duration = ripper._duration_to_seconds(title_info.get("duration", "0:00:00"))
+        metrics.append(
+            (
+                duration,
+                -abs(runtime - duration),
+                len([s for s in stream if is_type(s, "subtitle")]),  # type: ignore
+                len([s for s in stream if is_type(s, "audio")]),  # type: ignore
+                int(title_info.get("chapter_count", 0)),
+                title,
+            )
+        )
+
+    return metrics
+
+
+def measure(fn: Callable[[], object], repeats: int = 5):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(sizes: list[int]):
+    with tempfile.TemporaryDirectory() as directory:
+        config = Config(write_config(directory))
+        logger = Logger(config)
+        ripper = BlueRayRipper(config, logger, ProcessManager(logger))
+        ripper._movie_metadata = {"runtime": 120}  # type: ignore
+
+        for size in sizes:
+            parser = DiscInfoParser()
+            for line in disc_info_lines(size):
+                parser.feed(line)
+            _, titles = parser.finish()
+
+            def legacy():
+                return legacy_detect(legacy_metrics(ripper, 120 * 60))
+
+            def numpy():
+                return ripper.detect_main_feature().main_feature[0]
+
+            ripper._titles = titles
+            legacy_time, numpy_time = measure(legacy), measure(numpy)
+            main_feature = numpy()
+
+            # Scoring only, without collecting the metrics of the titles
+            rows = legacy_metrics(ripper, 120 * 60)
+            numbers, matrix = ripper._create_title_metrics()
+            legacy_scoring = measure(lambda: legacy_detect(rows))
+            numpy_scoring = measure(lambda: ripper._scorer.rank(numbers, matrix, 10))
+
+            # The winner must not change when makemkv lists the titles in another order
+            items = list(titles.items())
+            random.Random(0).shuffle(items)
+            ripper._titles = dict(items)
+            assert numpy() == main_feature, "detection depends on the title order"
+
+            print(f"{size} titles (main feature {main_feature})")
+            print(
+                f"  legacy {legacy_time * 1000:8.2f} ms"
+                f"  (scoring {legacy_scoring * 1000:8.2f} ms)"
+            )
+            print(
+                f"  numpy  {numpy_time * 1000:8.2f} ms"
+                f"  (scoring {numpy_scoring * 1000:8.2f} ms)"
+                f"  {legacy_time / numpy_time:.1f}x / {legacy_scoring / numpy_scoring:.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or [300, 900, 5000])
@@ -0,0 +1,79 @@
+"""
+Measures the peak memory and wall time of `ProcessManager.call` while replaying the progress
+output of a multi-hour `makemkvcon mkv` rip, for every capture policy and for the previous
+implementation that concatenated the whole output into a string.
+
+Usage (from the autorip directory):
+    python -m benchmarks.process_capture_benchmark [lines]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from subprocess import PIPE, Popen
+from typing import Callable
+
+from core.config import Config
+from core.logger import Logger
+from process.output_capture import (
+    DiscardCapture,
+    FileCapture,
+    OutputCapture,
+    RingBufferCapture,
+)
+from process.process_manager import ProcessManager
+
+from benchmarks.fixtures import prgv_emitter, write_config
+
+
+def legacy_call(args: list[str]):
+    """
+    The previous implementation of `ProcessManager.call`. stderr is only drained after stdout
+    was closed, so it must not be used with a chatty stderr.
+    """
+
+    with Popen(args, stdout=PIPE, stderr=PIPE) as pipe:
+        sout = ""
+        for line in iter(pipe.stdout.readline, b""):  # type: ignore
+            parsed_line = line.decode("utf-8").strip()
+            sout += parsed_line + "\n"
+
+        _, serr = pipe.communicate()
+        return (pipe.returncode, sout, serr.decode("utf-8"))
+
+
+def measure(name: str, fn: Callable[[], object]):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"  {name:<24} {elapsed:8.2f} s  peak {peak / 1024**2:10.2f} MiB")
+
+
+def main(lines: int):
+    with tempfile.TemporaryDirectory() as directory:
+        logger = Logger(Config(write_config(directory)))
+        manager = ProcessManager(logger)
+
+        def policy(capture: Callable[[], OutputCapture]):
+            return lambda: manager.call(
+                prgv_emitter(lines, lines // 10), stdout=capture(), stderr=capture()
+            )
+
+        print(f"Replaying {lines} PRGV lines ({lines // 10} stderr lines)")
+        measure("legacy (no stderr)", lambda: legacy_call(prgv_emitter(lines)))
+        measure("discard", policy(DiscardCapture))
+        measure("ring buffer (1000)", policy(RingBufferCapture))
+        measure(
+            "file spool",
+            policy(lambda: FileCapture(os.path.join(directory, "spool.log"))),
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,123 @@
+"""
+Measures the cold start of the service: the import time of `main` per top level package, as
+reported by `python -X importtime`, the wall time of importing `main`, of the startup hook and
+of creating the lazily initialized subsystems of the app on first use. Every run starts a fresh
+interpreter and also reports the subsystems importing `main` already created, which should be
+none.
+
+Usage (from the autorip directory):
+    python -m benchmarks.startup_benchmark [runs]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+from benchmarks.fixtures import write_config
+
+# Runs in the fresh interpreter and prints the wall times of the startup steps as JSON
+STARTUP_SCRIPT = """
+import json, os, time
+
+start = time.perf_counter()
+import main
+times = {"import main": time.perf_counter() - start}
+
+# Lazy properties store their value in the instance once created
+created = sorted(name for name in vars(main.app) if name in type(main.app).__dict__)
+
+start = time.perf_counter()
+main.start_jobs()
+times["startup hook"] = time.perf_counter() - start
+
+for name in ("ripper", "encoder", "uploader", "leases"):
+    start = time.perf_counter()
+    getattr(main.app, name)
+    times[f"app.{name}"] = time.perf_counter() - start
+
+from core.config import Config, config_validator
+
+config_validator.cache_clear()
+
+for name in ("config (compile validator)", "config (cached validator)"):
+    start = time.perf_counter()
+    Config(os.environ["AUTORIP_CONFIG"])
+    times[name] = time.perf_counter() - start
+
+main.flush_db()
+main.flush_logs()
+
+print(json.dumps({"times": times, "created": created}))
+"""
+
+
+def run(args: list[str], env: dict[str, str]):
+    return subprocess.run(
+        [sys.executable, *args], env=env, capture_output=True, text=True, check=True
+    )
+
+
+def import_times(env: dict[str, str]):
+    """
+    Returns the cumulative self import time in seconds of every top level package imported by
+    `main`.
+    """
+
+    totals: dict[str, float] = defaultdict(float)
+    stderr = run(["-X", "importtime", "-c", "import main"], env).stderr
+
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+
+        (self_us, _, name) = line[len("import time:") :].split("|")
+        if self_us.strip().isdigit():
+            totals[name.strip().split(".")[0]] += int(self_us) / 1e6
+
+    return totals
+
+
+def main(runs: int):
+    with tempfile.TemporaryDirectory() as directory:
+        env = {
+            **os.environ,
+            "AUTORIP_CONFIG": write_config(directory),
+            "PYTHONPATH": os.getcwd(),
+        }
+
+        packages: dict[str, list[float]] = defaultdict(list)
+        steps: dict[str, list[float]] = defaultdict(list)
+        created: set[str] = set()
+
+        for _ in range(runs):
+            for name, seconds in import_times(env).items():
+                packages[name].append(seconds)
+
+            startup = json.loads(run(["-c", STARTUP_SCRIPT], env).stdout)
+            for name, seconds in startup["times"].items():
+                steps[name].append(seconds)
+            created.update(startup["created"])
+
+        print(f"Cold start of the service, median of {runs} runs")
+        print(f"Subsystems created by importing main: {', '.join(created) or 'none'}")
+
+        print("\n  Startup step                   wall time")
+        for name, times in steps.items():
+            print(f"  {name:<28} {statistics.median(times) * 1000:9.1f} ms")
+
+        slowest = sorted(
+            packages.items(), key=lambda item: statistics.median(item[1]), reverse=True
+        )
+        total = sum(statistics.median(times) for times in packages.values())
+
+        print(f"\n  Imports of main: {total * 1000:.1f} ms, slowest packages:")
+        for name, times in slowest[:12]:
+            print(f"  {name:<28} {statistics.median(times) * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
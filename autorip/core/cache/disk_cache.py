@@ -0,0 +1,115 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any
+
+
+class DiskCache:
+    """
+    A persistent key-value cache which stores every entry as JSON file in a directory. When
+    the total size of the entries exceeds the limit, the least recently used entries are
+    evicted. The access time is tracked through the modification time of the entry files, so
+    it survives restarts. Keys must be usable as file names.
+
+    Args:
+        - directory (str): The directory the entries are stored in.
+        - max_bytes (int): The maximum total size of all entries in bytes.
+        - ttl (float | None): The time in seconds after which entries expire, never if None.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, ttl: float | None = None):
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def stats(self):
+        """
+        Returns the number of cache hits and misses since the cache was created.
+        """
+        return {"hits": self.hits, "misses": self.misses}
+
+    def get(self, key: str) -> Any | None:
+        """
+        Returns the value stored for the given key or None if there is no (valid) entry.
+        """
+
+        path = self._path(key)
+
+        with self._lock:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+                created_at, value = entry["created_at"], entry["value"]
+            except (OSError, ValueError, KeyError, TypeError):
+                self.misses += 1
+                return None
+
+            if self._ttl is not None and time.time() - created_at > self._ttl:
+                os.remove(path)
+                self.misses += 1
+                return None
+
+            # Mark the entry as recently used
+            os.utime(path)
+            self.hits += 1
+
+        return value
+
+    def set(self, key: str, value: Any):
+        """
+        Stores a JSON serializable value for the given key and evicts the least recently used
+        entries if the cache grew too large.
+        """
+
+        with self._lock:
+            fd, tmp = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"created_at": time.time(), "value": value}, f)
+
+            os.replace(tmp, self._path(key))
+            self._evict()
+
+    def delete(self, key: str):
+        """
+        Removes the entry of the given key if it exists.
+        """
+
+        with self._lock:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def _evict(self):
+        """
+        Removes the least recently used entries until the cache fits into its size limit.
+        """
+
+        entries: list[tuple[float, int, str]] = []
+
+        for entry in os.scandir(self._directory):
+            if entry.name.endswith(".json"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, path in sorted(entries):
+            if total <= self._max_bytes:
+                break
+
+            os.remove(path)
+            total -= size
+
+    def _path(self, key: str):
+        return os.path.join(self._directory, f"{key}.json")
@@ -0,0 +1,51 @@
+import threading
+import time
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class TTLCache:
+    """
+    A small in-memory cache whose entries expire after a fixed time, for lookups that rarely
+    change, like the configuration of other services.
+
+    Args:
+        - ttl (float): The time in seconds after which entries expire.
+    """
+
+    def __init__(self, ttl: float):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: dict[str, tuple[float, Any]] = {}
+
+    def get_or_load(self, key: str, loader: Callable[[], T]) -> T:
+        """
+        Returns the cached value of the given key or loads and caches it if there is no valid
+        entry.
+
+        Args:
+            - key (str): The key of the entry.
+            - loader (Callable[[], T]): The function loading the value on a cache miss.
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+        if entry is not None and time.monotonic() - entry[0] < self._ttl:
+            return entry[1]
+
+        value = loader()
+
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+
+        return value
+
+    def clear(self):
+        """
+        Removes all entries.
+        """
+
+        with self._lock:
+            self._entries.clear()
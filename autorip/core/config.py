@@ -1,14 +1,34 @@
-from typing import List, TypedDict
+import functools
+from typing import List, Literal, NotRequired, TypedDict, cast
 
 import tomllib
-from jsonschema import validate
+from jsonschema import exceptions, validators
 
 config_schema = {
     "type": "object",
     "properties": {
         "logger": {
             "type": "object",
-            "properties": {"debug": {"type": "boolean"}, "silent": {"type": "boolean"}},
+            "properties": {
+                "debug": {"type": "boolean"},
+                "silent": {"type": "boolean"},
+                "tracing": {"type": "boolean"},
+                "file": {"type": "boolean"},
+                "max_file_size_mb": {"type": "integer", "minimum": 1},
+                "backup_count": {"type": "integer", "minimum": 0},
+                "sampling": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "pattern": {"type": "string"},
+                            "interval": {"type": "number", "minimum": 0},
+                        },
+                        "required": ["pattern", "interval"],
+                        "additionalProperties": False,
+                    },
+                },
+            },
             "required": ["debug", "silent"],
             "additionalProperties": False,
         },
@@ -17,6 +37,7 @@ config_schema = {
             "properties": {
                 "device": {"type": "string"},
                 "read_from_log": {"type": "boolean"},
+                "disc_cache_size_mb": {"type": "integer", "minimum": 0},
             },
             "required": ["device", "read_from_log"],
             "additionalProperties": False,
@@ -28,6 +49,8 @@ config_schema = {
                 "logging_dir": {"type": "string"},
                 "working_dir": {"type": "string"},
                 "eject_disc": {"type": "boolean"},
+                "db_flush_interval": {"type": "number", "minimum": 0},
+                "encode_workers": {"type": "integer", "minimum": 1},
                 "presets": {
                     "type": "array",
                     "items": {
@@ -36,6 +59,8 @@ config_schema = {
                             "type": {"type": "string"},
                             "name": {"type": "string"},
                             "path": {"type": "string"},
+                            "split_chunks": {"type": "integer", "minimum": 1},
+                            "split_workers": {"type": "integer", "minimum": 1},
                         },
                         "required": ["type", "name", "path"],
                         "additionalProperties": False,
@@ -53,10 +78,88 @@ config_schema = {
         },
         "metadata": {
             "type": "object",
-            "properties": {"imdb_token": {"type": "string"}},
+            "properties": {
+                "imdb_token": {"type": "string"},
+                "tmdb_url": {"type": "string"},
+                "cache_ttl_hours": {"type": "number", "minimum": 0},
+                "cache_size_mb": {"type": "integer", "minimum": 0},
+            },
             "required": ["imdb_token"],
             "additionalProperties": False,
         },
+        "scoring": {
+            "type": "object",
+            "properties": {
+                "weights": {
+                    "type": "object",
+                    "properties": {
+                        "duration": {"type": "number"},
+                        "runtime_match": {"type": "number"},
+                        "subtitles": {"type": "number"},
+                        "audio": {"type": "number"},
+                        "chapters": {"type": "number"},
+                    },
+                    "additionalProperties": False,
+                },
+                "min_duration_ratio": {"type": "number", "minimum": 0, "maximum": 1},
+            },
+            "additionalProperties": False,
+        },
+        "process": {
+            "type": "object",
+            "properties": {
+                "pools": {
+                    "type": "object",
+                    "additionalProperties": {
+                        "type": "object",
+                        "properties": {
+                            "executable": {"type": "string"},
+                            "limit": {"type": "integer", "minimum": 1},
+                            "per_device": {"type": "boolean"},
+                            "nice": {"type": "integer", "minimum": -20, "maximum": 19},
+                            "cpu_set": {
+                                "oneOf": [
+                                    {"type": "string"},
+                                    {
+                                        "type": "array",
+                                        "items": {"type": "string"},
+                                        "minItems": 1,
+                                    },
+                                ]
+                            },
+                            "ionice_class": {
+                                "type": "string",
+                                "enum": ["realtime", "best-effort", "idle"],
+                            },
+                            "ionice_level": {
+                                "type": "integer",
+                                "minimum": 0,
+                                "maximum": 7,
+                            },
+                        },
+                        "additionalProperties": False,
+                    },
+                },
+                "transcripts": {"type": "boolean"},
+                "replay": {
+                    "type": "object",
+                    "properties": {
+                        "directory": {"type": "string"},
+                        "speed": {"type": "string", "enum": ["recorded", "fast"]},
+                    },
+                    "required": ["directory"],
+                    "additionalProperties": False,
+                },
+            },
+            "additionalProperties": False,
+        },
+        "workers": {
+            "type": "object",
+            "properties": {
+                "lease_timeout": {"type": "number", "exclusiveMinimum": 0},
+            },
+            "additionalProperties": False,
+        },
         "media": {
             "type": "object",
             "properties": {
@@ -64,6 +167,9 @@ config_schema = {
                 "radarr_token": {"type": "string"},
                 "radarr_quality_profile": {"type": "string"},
                 "radarr_url": {"type": "string"},
+                "tv_dir": {"type": "string"},
+                "checksum": {"enum": ["blake2b", "sha256", "none"]},
+                "verify_copy": {"type": "boolean"},
             },
             "required": [
                 "media_dir",
@@ -79,20 +185,33 @@ config_schema = {
 }
 
 
+class SamplingConfig(TypedDict):
+    pattern: str
+    interval: float
+
+
 class LoggerConfig(TypedDict):
     silent: bool
     debug: bool
+    tracing: NotRequired[bool]
+    file: NotRequired[bool]
+    max_file_size_mb: NotRequired[int]
+    backup_count: NotRequired[int]
+    sampling: NotRequired[List[SamplingConfig]]
 
 
 class InputConfig(TypedDict):
     device: str
     read_from_log: bool
+    disc_cache_size_mb: NotRequired[int]
 
 
 class PresetConfig(TypedDict):
     type: str
     name: str
     path: str
+    split_chunks: NotRequired[int]
+    split_workers: NotRequired[int]
 
 
 class MediaConfig(TypedDict):
@@ -100,6 +219,9 @@ class MediaConfig(TypedDict):
     radarr_token: str
     radarr_quality_profile: str
     media_dir: str
+    tv_dir: NotRequired[str]
+    checksum: NotRequired[Literal["blake2b", "sha256", "none"]]
+    verify_copy: NotRequired[bool]
 
 
 class OutputConfig(TypedDict):
@@ -108,10 +230,53 @@ class OutputConfig(TypedDict):
     working_dir: str
     eject_disc: bool
     presets: List[PresetConfig]
+    db_flush_interval: NotRequired[float]
+    encode_workers: NotRequired[int]
 
 
 class MetadataConfig(TypedDict):
     imdb_token: str
+    tmdb_url: NotRequired[str]
+    cache_ttl_hours: NotRequired[float]
+    cache_size_mb: NotRequired[int]
+
+
+class ScoringWeightsConfig(TypedDict, total=False):
+    duration: float
+    runtime_match: float
+    subtitles: float
+    audio: float
+    chapters: float
+
+
+class ScoringConfig(TypedDict, total=False):
+    weights: ScoringWeightsConfig
+    min_duration_ratio: float
+
+
+class PoolConfig(TypedDict, total=False):
+    executable: str
+    limit: int
+    per_device: bool
+    nice: int
+    cpu_set: str | list[str]
+    ionice_class: str
+    ionice_level: int
+
+
+class ReplayConfig(TypedDict):
+    directory: str
+    speed: NotRequired[Literal["recorded", "fast"]]
+
+
+class ProcessConfig(TypedDict, total=False):
+    pools: dict[str, PoolConfig]
+    transcripts: bool
+    replay: ReplayConfig
+
+
+class WorkersConfig(TypedDict, total=False):
+    lease_timeout: float
 
 
 class AppConfig(TypedDict):
@@ -120,6 +285,21 @@ class AppConfig(TypedDict):
     output: OutputConfig
     metadata: MetadataConfig
     media: MediaConfig
+    scoring: NotRequired[ScoringConfig]
+    process: NotRequired[ProcessConfig]
+    workers: NotRequired[WorkersConfig]
+
+
+@functools.cache
+def config_validator():
+    """
+    Returns the validator of the configuration schema. The schema is checked and the validator
+    compiled only once per process, instead of on every validation.
+    """
+
+    cls = validators.validator_for(config_schema)
+    cls.check_schema(config_schema)
+    return cls(config_schema)
 
 
 class Config:
@@ -142,7 +322,16 @@ class Config:
         an AppConfig object.
         """
 
-        validate(instance=self._raw, schema=config_schema)
+        errors = config_validator().iter_errors(self._raw)
+
+        # The stubs of best_match don't declare its return type
+        error = cast(
+            exceptions.ValidationError | None,
+            exceptions.best_match(errors),  # pyright: ignore[reportUnknownMemberType]
+        )
+        if error is not None:
+            raise error
+
         return AppConfig(**self._raw)
 
     def __str__(self) -> str:
@@ -0,0 +1,165 @@
+import asyncio
+import threading
+import time
+from typing import Any, AsyncIterator, Callable
+
+from core.events.models.event import Event
+
+EventCallback = Callable[[Event], None]
+
+
+class Subscription:
+    """
+    A subscription to the events of an event bus. Events are coalesced by their type and key,
+    so a subscriber only receives the latest event of every type and key and at most one of
+    them per `interval`. Events are either pushed to a callback or consumed by iterating over
+    the subscription asynchronously.
+
+    Args:
+        - bus (EventBus): The bus the subscription belongs to.
+        - interval (float): The minimum time in seconds between two events of the same type and key.
+        - callback (EventCallback | None): The function events are pushed to, called from the
+            publishing thread. If None, the subscription has to be iterated.
+        - types (list[str] | None): The event types to receive, all if None.
+    """
+
+    def __init__(
+        self,
+        bus: "EventBus",
+        interval: float,
+        callback: EventCallback | None = None,
+        types: list[str] | None = None,
+    ):
+        self.interval = interval
+        self.types = types
+
+        self._bus = bus
+        self._callback = callback
+        self._lock = threading.Lock()
+        self._pending: dict[tuple[str, str], Event] = {}
+        self._delivered_at: dict[tuple[str, str], float] = {}
+        self._notify: Callable[[], None] | None = None
+
+    def offer(self, event: Event):
+        """
+        Hands a published event to the subscription. Called by the event bus.
+        """
+
+        if self.types is not None and event["type"] not in self.types:
+            return
+
+        with self._lock:
+            self._pending[(event["type"], event["key"])] = event
+            notify = self._notify
+
+        if self._callback is not None:
+            for due in self.drain():
+                self._callback(due)
+        elif notify is not None:
+            notify()
+
+    def drain(self) -> list[Event]:
+        """
+        Removes and returns the pending events whose type and key weren't delivered within the
+        interval. The remaining events are delivered once they are due and another event was
+        published, or a newer event of the same type and key replaces them.
+        """
+
+        now = time.monotonic()
+
+        with self._lock:
+            due = [
+                key
+                for key in self._pending
+                if now - self._delivered_at.get(key, -self.interval) >= self.interval
+            ]
+
+            for key in due:
+                self._delivered_at[key] = now
+
+            return [self._pending.pop(key) for key in due]
+
+    def close(self):
+        """
+        Stops receiving events.
+        """
+
+        self._bus.unsubscribe(self)
+
+    async def __aiter__(self) -> AsyncIterator[Event]:
+        loop = asyncio.get_running_loop()
+        wakeup = asyncio.Event()
+
+        def notify() -> None:
+            # Called from the publishing thread, the event isn't thread-safe
+            loop.call_soon_threadsafe(wakeup.set)
+
+        with self._lock:
+            self._notify = notify
+
+        try:
+            while True:
+                await wakeup.wait()
+                wakeup.clear()
+
+                for event in self.drain():
+                    yield event
+
+                # Events not due yet are collected and coalesced until the next round
+                if self._pending:
+                    await asyncio.sleep(self.interval)
+                    wakeup.set()
+        finally:
+            self.close()
+
+
+class EventBus:
+    """
+    An in-process publish/subscribe bus for structured events, e.g. the progress of jobs.
+    Publishing is cheap and never blocks on slow subscribers, because every subscriber throttles
+    and coalesces the events itself.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions: list[Subscription] = []
+
+    def publish(self, event_type: str, key: str, **data: Any):
+        """
+        Publishes an event to all subscribers.
+
+        Args:
+            - event_type (str): The type of the event, e.g. "progress".
+            - key (str): The key events are coalesced by, e.g. the job id.
+            - data (Any): The payload of the event.
+        """
+
+        event = Event(type=event_type, key=key, timestamp=time.time(), data=data)
+
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+
+        for subscription in subscriptions:
+            subscription.offer(event)
+
+    def subscribe(
+        self,
+        interval: float = 0,
+        callback: EventCallback | None = None,
+        types: list[str] | None = None,
+    ):
+        """
+        Creates a new subscription, see `Subscription` for the arguments.
+        """
+
+        subscription = Subscription(self, interval, callback, types)
+
+        with self._lock:
+            self._subscriptions.append(subscription)
+
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
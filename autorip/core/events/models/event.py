@@ -0,0 +1,8 @@
+from typing import Any, TypedDict
+
+
+class Event(TypedDict):
+    type: str
+    key: str
+    timestamp: float
+    data: dict[str, Any]
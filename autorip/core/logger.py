@@ -1,17 +1,102 @@
 import logging
 import os
+import queue
+import re
 import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
-from core.config import Config
+from core.config import Config, SamplingConfig
+
+# The progress lines of makemkvcon and HandBrakeCLI make up almost all of the debug output
+DEFAULT_SAMPLING: list[SamplingConfig] = [
+    {"pattern": "^PRGV:", "interval": 1},
+    {"pattern": "^Progress: ", "interval": 1},
+]
+
+
+class _SamplerState(threading.local):
+    """
+    The sampling state of the current thread, dropped together with the thread.
+    """
+
+    def __init__(self):
+        # Per rule: the time of the last message let through and the suppressed count
+        self.rules: dict[int, tuple[float, int]] = {}
+
+
+class LogSampler:
+    """
+    Rate-limits log messages matching one of the given patterns to one message per interval,
+    pattern and thread, so concurrently running processes are sampled independently. The next
+    message let through mentions how many messages were suppressed in between.
+
+    Args:
+        - rules (list[SamplingConfig]): The patterns and the minimum number of seconds between
+            two messages matching them.
+    """
+
+    def __init__(self, rules: list[SamplingConfig]):
+        self._rules = [
+            (re.compile(rule["pattern"]), rule["interval"]) for rule in rules
+        ]
+        self._state = _SamplerState()
+
+    def sample(self, msg: str) -> str | None:
+        """
+        Returns the message to log or None if it is suppressed.
+        """
+
+        for index, (pattern, interval) in enumerate(self._rules):
+            if pattern.search(msg) is None:
+                continue
+
+            state = self._state.rules
+            now = time.monotonic()
+            (last, suppressed) = state.get(index, (-interval, 0))
+
+            if now - last < interval:
+                state[index] = (last, suppressed + 1)
+                return None
+
+            state[index] = (now, 0)
+
+            return (
+                f"{msg} ({suppressed} similar lines suppressed)" if suppressed else msg
+            )
+
+        return msg
+
+
+class _QueueHandler(QueueHandler):
+    """
+    Enqueues records without copying them. The messages are formatted strings already and the
+    records are not shared with other handlers, so copying would only slow down the caller.
+    """
+
+    def prepare(self, record: logging.LogRecord):
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
 
 
 class Logger:
     """
     A custom logger class that provides logging functionality with different log levels.
+    Records are handed to a background thread which writes them to stdout and, if enabled, a
+    rotating log file in the logging directory, so logging never blocks the caller on I/O.
 
     Args:
         - debug (bool): Whether to enable debug logging or not.
         - silent (bool): Whether to disable logging to stdout or not.
+        - file (bool): Whether to log into `autorip.log` in the logging directory or not,
+            off by default.
+        - max_file_size_mb (int): The size at which the log file is rotated.
+        - backup_count (int): The number of rotated log files to keep.
+        - sampling (list[SamplingConfig]): The patterns of log messages which are rate-limited,
+            by default the progress lines of makemkvcon and HandBrakeCLI.
     """
 
     def __init__(self, config: Config) -> None:
@@ -25,46 +110,109 @@ class Logger:
         self._log = logging.getLogger(os.path.basename(sys.argv[0]))
         self._log.setLevel(loglevel)
 
+        handlers: list[logging.Handler] = []
+
         if not self._config["silent"]:
-            self._stream_handler = logging.StreamHandler(sys.stdout)
-            self._stream_handler.setLevel(loglevel)
-            self._stream_handler.setFormatter(frmt)
-            self._log.addHandler(self._stream_handler)
+            handlers.append(logging.StreamHandler(sys.stdout))
+
+        if self._config.get("file", False):
+            logging_dir = config.get["output"]["logging_dir"]
+            os.makedirs(logging_dir, exist_ok=True)
+
+            handlers.append(
+                RotatingFileHandler(
+                    os.path.join(logging_dir, "autorip.log"),
+                    maxBytes=self._config.get("max_file_size_mb", 10) * 1024 * 1024,
+                    backupCount=self._config.get("backup_count", 5),
+                    encoding="utf-8",
+                    delay=True,
+                )
+            )
+
+        for handler in handlers:
+            handler.setLevel(loglevel)
+            handler.setFormatter(frmt)
+
+        self._queue: queue.Queue[logging.LogRecord] = queue.Queue()
+        self._queue_handler = _QueueHandler(self._queue)
+        self._sampler = LogSampler(self._config.get("sampling", DEFAULT_SAMPLING))
+
+        self._listener = QueueListener(
+            self._queue, *handlers, respect_handler_level=True
+        )
+        self._listener.start()
+        self._log.addHandler(self._queue_handler)
+        self._closed = False
 
     def __del__(self):
-        if not self._log.handlers:
+        if hasattr(self, "_closed"):
+            self.close()
+
+    @property
+    def debug_enabled(self):
+        """
+        Checks whether debug messages are logged, so callers can skip building expensive ones.
+        """
+        return self._log.isEnabledFor(logging.DEBUG)
+
+    def flush(self):
+        """
+        Blocks until all records logged so far are written.
+        """
+        self._queue.join()
+
+    def close(self):
+        """
+        Writes the remaining records and stops the background thread.
+        """
+
+        if self._closed:
             return
 
-        self._log.removeHandler(self._stream_handler)
-        self._stream_handler.close()
+        self._closed = True
+        self._log.removeHandler(self._queue_handler)
+        self._listener.stop()
+
+        for handler in self._listener.handlers:
+            handler.close()
+
+    def _emit(self, level: int, msg: str):
+        """
+        Samples the message before a log record is created, suppressed progress lines should
+        cost as little as possible in the reader loops.
+        """
+
+        if self._log.isEnabledFor(level) and (sampled := self._sampler.sample(msg)):
+            self._log.log(level, sampled)
 
     def debug(self, msg: str):
         """
         Log a message with severity 'DEBUG'.
         """
-        self._log.debug(msg)
+        self._emit(logging.DEBUG, msg)
 
     def info(self, msg: str):
         """
         Log a message with severity 'INFO'.
         """
-        self._log.info(msg)
+        self._emit(logging.INFO, msg)
 
     def warn(self, msg: str):
         """
         Log a message with severity 'WARN'.
         """
-        self._log.warning(msg)
+        self._emit(logging.WARNING, msg)
 
     def error(self, msg: str):
         """
         Log a message with severity 'ERROR'.
         """
-        self._log.error(msg)
+        self._emit(logging.ERROR, msg)
 
     def critical(self, msg: str):
         """
         Log a message with severity 'CRITICAL' and exit the application with status code 1.
         """
-        self._log.critical(msg)
+        self._emit(logging.CRITICAL, msg)
+        self.flush()
         sys.exit(1)
@@ -0,0 +1,52 @@
+from core.metrics.registry import MetricsRegistry
+
+# The registry rendered by the /metrics endpoint
+REGISTRY = MetricsRegistry()
+
+# Stages take minutes to hours, requests milliseconds to seconds
+STAGE_BUCKETS = (10, 30, 60, 300, 600, 1200, 1800, 3600, 7200, 14400, 28800)
+REQUEST_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+STAGE_DURATION = REGISTRY.histogram(
+    "autorip_stage_duration_seconds",
+    "Duration of the scan, rip, encode and upload stages.",
+    ("stage", "device"),
+    STAGE_BUCKETS,
+)
+STAGE_RESULTS = REGISTRY.counter(
+    "autorip_stage_results",
+    "Number of jobs processed by every stage of the job queue, by result.",
+    ("stage", "result"),
+)
+
+RIP_THROUGHPUT = REGISTRY.gauge(
+    "autorip_rip_read_megabytes_per_second",
+    "Current read throughput of a rip, derived from the makemkvcon progress.",
+    ("job_id", "device"),
+)
+ENCODE_RATE = REGISTRY.gauge(
+    "autorip_encode_frames_per_second",
+    "Current encoding rate of a job as reported by HandBrakeCLI.",
+    ("job_id", "device"),
+)
+COPY_THROUGHPUT = REGISTRY.gauge(
+    "autorip_copy_megabytes_per_second",
+    "Current throughput of the copy of a job into the media library.",
+    ("job_id", "device"),
+)
+COPIED_BYTES = REGISTRY.counter(
+    "autorip_copied_bytes", "Bytes copied into the media library."
+)
+
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "autorip_http_request_duration_seconds",
+    "Latency of the requests to TMDB and Radarr.",
+    ("service", "method"),
+    REQUEST_BUCKETS,
+)
+
+CHILD_PROCESSES = REGISTRY.gauge(
+    "autorip_child_processes",
+    "Number of running child processes by executable.",
+    ("executable",),
+)
@@ -0,0 +1,337 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Generic, Iterable, TypeVar
+
+LabelValues = tuple[str, ...]
+Collector = Callable[[], Iterable[tuple[dict[str, str], float]]]
+
+# The value stored per combination of label values
+V = TypeVar("V")
+M = TypeVar("M", bound="Metric[Any]")
+
+# The default buckets of the Prometheus client libraries, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# The charset is appended by the response
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+class Metric(Generic[V]):
+    """
+    The base of all metrics: a named family of values, one per combination of label values.
+
+    Args:
+        - name (str): The name of the metric.
+        - documentation (str): The help text of the metric.
+        - labels (tuple[str, ...]): The names of the labels of the metric.
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+
+        self._lock = threading.Lock()
+
+    def remove(self, **labels: str):
+        """
+        Removes the values of the given label values, e.g. of a finished job.
+        """
+
+        with self._lock:
+            self._values().pop(self._key(labels), None)
+
+    def samples(self) -> Iterable[tuple[str, dict[str, str], float]]:
+        """
+        Returns the samples of the metric as (name suffix, labels, value).
+        """
+        raise NotImplementedError()
+
+    def _values(self) -> dict[LabelValues, V]:
+        raise NotImplementedError()
+
+    def _key(self, labels: dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} expects the labels {self.labels}")
+
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def _labels(self, key: LabelValues):
+        return dict(zip(self.labels, key))
+
+
+class Counter(Metric[float]):
+    """
+    A value which only increases, e.g. the number of processed jobs.
+    """
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labels)
+        self._counts: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        if amount < 0:
+            raise ValueError("Counters can only be increased")
+
+        key = self._key(labels)
+
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            counts = list(self._counts.items())
+
+        return [("_total", self._labels(key), value) for key, value in counts]
+
+    def _values(self):
+        return self._counts
+
+
+class Gauge(Metric[float]):
+    """
+    A value which can go up and down, e.g. the current throughput of a job. Gauges can also be
+    computed at scrape time by a collector.
+
+    Args:
+        - collector (Collector | None): Returns the current (labels, value) pairs at scrape
+            time, instead of values being set.
+    """
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        collector: Collector | None = None,
+    ):
+        super().__init__(name, documentation, labels)
+        self.collector = collector
+        self._gauges: dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str):
+        key = self._key(labels)
+
+        with self._lock:
+            self._gauges[key] = value
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str):
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        if self.collector is not None:
+            return [("", labels, value) for labels, value in self.collector()]
+
+        with self._lock:
+            gauges = list(self._gauges.items())
+
+        return [("", self._labels(key), value) for key, value in gauges]
+
+    def _values(self):
+        return self._gauges
+
+
+class Histogram(Metric[tuple[list[int], float]]):
+    """
+    Counts observations, e.g. request latencies, in cumulative buckets.
+
+    Args:
+        - buckets (tuple[float, ...]): The upper bounds of the buckets, +Inf is added.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+        # Per label values: the count of every bucket (not cumulative) and the sum
+        self._observations: dict[LabelValues, tuple[list[int], float]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+
+        with self._lock:
+            (counts, total) = self._observations.get(
+                key, ([0] * len(self.buckets), 0.0)
+            )
+            counts[index] += 1
+            self._observations[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels: str):
+        """
+        Observes the duration of the wrapped block in seconds, also if it raises.
+        """
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            observations = [
+                (key, list(counts), total)
+                for key, (counts, total) in self._observations.items()
+            ]
+
+        samples: list[tuple[str, dict[str, str], float]] = []
+
+        for key, counts, total in observations:
+            labels = self._labels(key)
+            cumulative = 0
+
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else _format_value(bound)
+                samples.append(("_bucket", {**labels, "le": le}, cumulative))
+
+            samples.append(("_sum", labels, total))
+            samples.append(("_count", labels, cumulative))
+
+        return samples
+
+    def _values(self):
+        return self._observations
+
+
+class RateMeter:
+    """
+    Derives a rate, e.g. bytes per second, from a cumulative amount reported at irregular
+    intervals. The rate is averaged over a sliding window, so single late reports don't cause
+    spikes.
+
+    Args:
+        - window (float): The number of seconds the rate is averaged over.
+    """
+
+    def __init__(self, window: float = 10):
+        self._window = window
+        self._points: list[tuple[float, float]] = []
+
+    def update(self, amount: float, now: float | None = None):
+        """
+        Records the cumulative amount and returns the current rate per second.
+        """
+
+        now = time.monotonic() if now is None else now
+        self._points.append((now, amount))
+
+        # Keep one point older than the window as the start of the window
+        while len(self._points) > 2 and now - self._points[1][0] >= self._window:
+            self._points.pop(0)
+
+        (start, first) = self._points[0]
+        return (amount - first) / (now - start) if now > start else 0.0
+
+
+class MetricsRegistry:
+    """
+    A collection of metrics rendered in the Prometheus text exposition format, so they can be
+    scraped without any Prometheus client library.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: dict[str, Metric[Any]] = {}
+
+    def register(self, metric: M) -> M:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        collector: Collector | None = None,
+    ):
+        return self.register(Gauge(name, documentation, labels, collector))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self):
+        """
+        Renders all metrics in the Prometheus text exposition format (version 0.0.4).
+        """
+
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines: list[str] = []
+
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {_escape_help(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+
+            for suffix, labels, value in metric.samples():
+                lines.append(
+                    f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}"
+                )
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape_help(text: str):
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _format_labels(labels: dict[str, str]):
+    if not labels:
+        return ""
+
+    pairs = (f'{name}="{_escape_label(value)}"' for name, value in labels.items())
+    return "{" + ",".join(pairs) + "}"
+
+
+def _escape_label(value: str):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float):
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
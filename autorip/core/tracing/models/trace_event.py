@@ -0,0 +1,12 @@
+from typing import Any, Literal, NotRequired, TypedDict
+
+
+class TraceEvent(TypedDict):
+    name: str
+    ph: Literal["X", "M"]
+    pid: int
+    tid: int
+    ts: NotRequired[int]
+    dur: NotRequired[int]
+    cat: NotRequired[str]
+    args: NotRequired[dict[str, Any]]
@@ -0,0 +1,200 @@
+import functools
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, ParamSpec, TypeVar
+
+from core.logger import Logger
+from core.tracing.models.trace_event import TraceEvent
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+
+class Trace:
+    """
+    The spans recorded for a single job, from all threads working on it.
+    """
+
+    def __init__(self, events: list[TraceEvent] | None = None):
+        self._lock = threading.Lock()
+        self._events = events or []
+        self._threads = {e["tid"] for e in self._events if e["ph"] == "M"}
+
+    @property
+    def events(self):
+        with self._lock:
+            return list(self._events)
+
+    def add(self, name: str, start: float, duration: float, args: dict[str, Any]):
+        thread = threading.current_thread()
+        event = TraceEvent(
+            name=name,
+            ph="X",
+            pid=os.getpid(),
+            tid=thread.ident or 0,
+            ts=int(start * 1e6),
+            dur=int(duration * 1e6),
+            args=args,
+        )
+
+        with self._lock:
+            # Name the thread once, so the viewer shows the stage instead of its id
+            if event["tid"] not in self._threads:
+                self._threads.add(event["tid"])
+                self._events.append(
+                    TraceEvent(
+                        name="thread_name",
+                        ph="M",
+                        pid=event["pid"],
+                        tid=event["tid"],
+                        args={"name": thread.name},
+                    )
+                )
+            self._events.append(event)
+
+
+# The trace of the job the current thread or task works on, None if tracing is disabled
+_current: ContextVar[Trace | None] = ContextVar("trace", default=None)
+
+
+class span:
+    """
+    Records the duration of a block or function call as span of the current trace. Usable as
+    context manager and as decorator, the span name defaults to the qualified function name:
+
+        with span("makemkvcon info", device=device):
+            ...
+
+        @span()
+        def rip_main_feature(self, ...):
+            ...
+
+    Outside of a trace, e.g. if tracing is disabled, a span only costs a context lookup.
+
+    Args:
+        - name (str | None): The name of the span.
+        - args (Any): Additional values shown with the span, e.g. the processed file.
+    """
+
+    def __init__(self, name: str | None = None, **args: Any):
+        self.name = name
+        self.args = args
+
+        self._trace: Trace | None = None
+        self._start = 0.0
+        self._started_at = 0.0
+
+    def __call__(self, fn: Callable[P, R]) -> Callable[P, R]:
+        name = self.name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            if _current.get() is None:
+                return fn(*args, **kwargs)
+
+            with span(name, **self.args):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    def __enter__(self):
+        self._trace = _current.get()
+
+        if self._trace is not None:
+            self._started_at = time.time()
+            self._start = time.perf_counter()
+
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any):
+        if self._trace is None:
+            return
+
+        if exc is not None:
+            self.args["error"] = repr(exc)
+
+        self._trace.add(
+            self.name or "span",
+            self._started_at,
+            time.perf_counter() - self._start,
+            self.args,
+        )
+
+
+class Tracer:
+    """
+    Traces the stages of jobs into one Chrome trace event file per job, which can be opened in
+    chrome://tracing or https://ui.perfetto.dev. Every stage adds its spans to the file of the
+    job, so the file shows the whole job once it finished.
+
+    Args:
+        - directory (str): The directory the trace files are written to.
+        - enabled (bool): Whether spans are recorded at all.
+        - logger (Logger | None): Receives errors while writing trace files.
+    """
+
+    def __init__(
+        self, directory: str, enabled: bool = False, logger: Logger | None = None
+    ):
+        self.directory = directory
+        self.enabled = enabled
+        self._logger = logger
+
+    def path(self, job_id: str):
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    @contextmanager
+    def trace(self, job_id: str, name: str):
+        """
+        Records the spans of the wrapped block, e.g. a stage of a job, below a root span with
+        the given name and writes them to the trace file of the job. Errors while writing the
+        trace file are logged, they must neither hide an error of the block nor fail it.
+        """
+
+        if not self.enabled:
+            yield
+            return
+
+        trace = Trace(self._load(job_id))
+        token = _current.set(trace)
+
+        try:
+            with span(name, job_id=job_id):
+                yield
+        finally:
+            _current.reset(token)
+
+            try:
+                self._write(job_id, trace)
+            except (OSError, TypeError, ValueError) as err:
+                if self._logger is not None:
+                    self._logger.error(
+                        f"Could not write the trace of job {job_id}: {err}"
+                    )
+
+    def _load(self, job_id: str) -> list[TraceEvent]:
+        try:
+            with open(self.path(job_id), "r", encoding="utf-8") as f:
+                return json.load(f)["traceEvents"]
+        except (OSError, ValueError, KeyError):
+            return []
+
+    def _write(self, job_id: str, trace: Trace):
+        os.makedirs(self.directory, exist_ok=True)
+
+        (fd, temp_path) = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"traceEvents": trace.events, "displayTimeUnit": "ms"}, f)
+
+            os.replace(temp_path, self.path(job_id))
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
@@ -1,13 +1,48 @@
+import errno
 import os
 import pathlib
 import shutil
 import stat
-from io import BufferedReader, BufferedWriter
-from typing import Callable, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Protocol
 
 from typing_extensions import Literal
 
-BUFFER_SIZE = 64 * 1024
+BUFFER_SIZE = 8 * 1024 * 1024
+
+# Maximum number of bytes the kernel copies per syscall, so callbacks can still be fired
+KERNEL_CHUNK_SIZE = 64 * 1024 * 1024
+
+CopyMode = Literal["auto", "copy_file_range", "sendfile", "readinto"]
+
+# Errors signaling that a kernel copy method is not supported for the given files, in which
+# case the next method is tried
+_UNSUPPORTED_ERRNOS = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.ENOTSUP,
+    errno.EBADF,
+}
+
+
+class Hasher(Protocol):
+    """The part of the hashlib objects used for checksums, e.g. hashlib.blake2b()."""
+
+    @property
+    def name(self) -> str:
+        ...
+
+    def update(self, data: memoryview, /) -> None:
+        ...
+
+    def digest(self) -> bytes:
+        ...
+
+    def hexdigest(self) -> str:
+        ...
 
 
 class SameFileError(OSError):
@@ -19,26 +54,83 @@ class SpecialFileError(OSError):
     not supported on a special file (e.g. a named pipe)"""
 
 
+class IntegrityError(OSError):
+    """Raised when the digest of a copied file doesn't match the digest of its source."""
+
+
+class _ThrottledCallback:
+    """Fires the copy callback at most every `interval_bytes` bytes or `interval_seconds`
+    seconds, whatever comes first, and always once the copy completed."""
+
+    def __init__(
+        self,
+        callback: Optional[Callable[[int, int, int], None]],
+        total: int,
+        interval_bytes: int,
+        interval_seconds: float,
+        offset: int = 0,
+    ):
+        self._callback = callback
+        self._total = total
+        self._interval_bytes = interval_bytes
+        self._interval_seconds = interval_seconds
+        self._reported = offset
+        self._last_time = time.monotonic()
+
+    def __call__(self, copied: int):
+        if self._callback is None or copied == self._reported:
+            return
+
+        now = time.monotonic()
+        if (
+            copied - self._reported >= self._interval_bytes
+            or now - self._last_time >= self._interval_seconds
+            or copied >= self._total
+        ):
+            self._callback(copied - self._reported, copied, self._total)
+            self._reported = copied
+            self._last_time = now
+
+
 def copy_with_callback(
     src: str,
     dest: str,
     callback: Optional[Callable[[int, int, int], None]] = None,
     follow_symlinks: bool = True,
-    buffer_size: Literal[65536] = BUFFER_SIZE,
+    buffer_size: int = BUFFER_SIZE,
+    callback_interval_bytes: int = 64 * 1024 * 1024,
+    callback_interval_seconds: float = 1.0,
+    mode: CopyMode = "auto",
+    move: bool = False,
+    offset: int = 0,
+    hasher: Optional[Hasher] = None,
 ):
     """Copy file with a callback.
-        callback, if provided, must be a callable and will be
-        called after ever buffer_size bytes are copied.
+        The data is copied by the kernel with copy_file_range, falling back to sendfile
+        and finally to a read/write loop with a single reusable buffer.
+        callback, if provided, must be a callable and will be called
+        throttled by bytes or time.
     Args:
         src: source file, must exist
         dest: destination path; if an existing directory,
             file will be copied to the directory;
             if it is not a directory, assumed to be destination filename
-        callback: callable to call after every buffer_size bytes are copied
+        callback: callable to call while copying
             callback will called as callback(bytes_copied since last callback, total
             bytes copied, total bytes in source file)
         follow_symlinks: bool; if True, follows symlinks
-        buffer_size: how many bytes to copy before each call to the callback, default = 4Mb
+        buffer_size: size of the buffer of the read/write fallback, default = 8Mb
+        callback_interval_bytes: how many bytes to copy at most between two callbacks
+        callback_interval_seconds: how many seconds to wait at most between two callbacks
+        mode: the copy method to use, "auto" tries them from fastest to slowest
+        move: bool; if True, the source is atomically renamed if source and
+            destination are on the same filesystem, and removed after copying otherwise
+        offset: resumes an interrupted copy after the first `offset` bytes, which are
+            kept if the destination file has at least that many bytes
+        hasher: hashlib object updated with every byte of the source file; the kernel
+            copy methods never expose the data, so a sidecar thread reads the source
+            while it is copied, mostly from the page cache; a renamed file is read
+            once after the rename
 
     Returns:
         Full path to destination file
@@ -76,43 +168,205 @@ def copy_with_callback(
     if callback is not None and not callable(callback):
         raise ValueError("callback is not callable")
 
+    size = os.stat(src).st_size
+
+    # Only resume if the destination still holds the bytes copied before
+    if offset > 0 and destfile.exists():
+        offset = min(offset, size, os.stat(destfile).st_size)
+    else:
+        offset = 0
+
+    progress = _ThrottledCallback(
+        callback, size, callback_interval_bytes, callback_interval_seconds, offset
+    )
+
+    if move and os.stat(src).st_dev == os.stat(destfile.parent).st_dev:
+        os.rename(srcfile, destfile)
+        if hasher is not None:
+            hash_file(str(destfile), hasher, buffer_size)
+        progress(size)
+        return str(destfile)
+
     if not follow_symlinks and srcfile.is_symlink():
         if destfile.exists():
             os.unlink(destfile)
         os.symlink(os.readlink(str(srcfile)), str(destfile))
+        if hasher is not None:
+            hash_file(str(destfile), hasher, buffer_size)
     else:
-        size = os.stat(src).st_size
-        with open(srcfile, "rb") as fsrc:
-            with open(destfile, "wb") as fdest:
-                _copyfileobj(
-                    fsrc, fdest, callback=callback, total=size, length=buffer_size
-                )
+        # The executor only starts its thread once the hash is submitted
+        with ThreadPoolExecutor(1, thread_name_prefix="hash") as sidecar:
+            hashed = (
+                sidecar.submit(hash_file, str(srcfile), hasher, buffer_size)
+                if hasher is not None
+                else None
+            )
+
+            with open(srcfile, "rb") as fsrc:
+                with open(destfile, "r+b" if offset else "wb") as fdest:
+                    fdest.truncate(offset)
+                    _copy_data(
+                        fsrc.fileno(),
+                        fdest.fileno(),
+                        size,
+                        buffer_size,
+                        progress,
+                        mode,
+                        offset,
+                    )
+
+            if hashed is not None:
+                hashed.result()
     shutil.copymode(str(srcfile), str(destfile))
+
+    if move:
+        os.remove(srcfile)
+
     return str(destfile)
 
 
-def _copyfileobj(
-    fsrc: BufferedReader,
-    fdest: BufferedWriter,
+def _copy_data(
+    fdin: int,
+    fdout: int,
     total: int,
     length: int,
-    callback: Optional[Callable[[int, int, int], None]] = None,
+    progress: Callable[[int], None],
+    mode: CopyMode = "auto",
+    offset: int = 0,
 ):
-    """copy from fsrc to fdest
+    """copy from fdin to fdout
     Args:
-        fsrc: filehandle to source file
-        fdest: filehandle to destination file
-        callback: callable callback that will be called after every length bytes copied
-        total: total bytes in source file (will be passed to callback)
-        length: how many bytes to copy at once (between calls to callback)
+        fdin: file descriptor of the source file
+        fdout: file descriptor of the destination file
+        total: total bytes in source file
+        length: size of the buffer of the read/write fallback
+        progress: callable called with the total bytes copied so far
+        mode: the copy method to use, "auto" tries them from fastest to slowest
+        offset: the number of bytes already copied
     """
-    copied = 0
-
-    while True:
-        buf = fsrc.read(length)
-        if not buf:
-            break
-        fdest.write(buf)
-        copied += len(buf)
-        if callback is not None:
-            callback(len(buf), copied, total)
+    copied = offset
+
+    if mode in ("auto", "copy_file_range") and hasattr(os, "copy_file_range"):
+        copied = _copy_kernel(
+            lambda offset, count: os.copy_file_range(
+                fdin, fdout, count, offset, offset
+            ),
+            copied,
+            total,
+            progress,
+        )
+
+    if mode in ("auto", "sendfile") and copied < total and hasattr(os, "sendfile"):
+        os.lseek(fdout, copied, os.SEEK_SET)
+        copied = _copy_kernel(
+            lambda offset, count: os.sendfile(fdout, fdin, offset, count),
+            copied,
+            total,
+            progress,
+        )
+
+    if copied < total:
+        _copy_buffered(fdin, fdout, copied, length, progress)
+
+
+def _copy_kernel(
+    copy: Callable[[int, int], int],
+    copied: int,
+    total: int,
+    progress: Callable[[int], None],
+):
+    """Copies with the given kernel copy method starting at offset `copied` until the
+    whole file was copied or the method is not supported. Returns the new offset."""
+    while copied < total:
+        try:
+            sent = copy(copied, min(KERNEL_CHUNK_SIZE, total - copied))
+        except OSError as err:
+            if err.errno in _UNSUPPORTED_ERRNOS:
+                return copied
+            raise
+
+        # Source shrank while copying, let the fallback copy the rest
+        if sent == 0:
+            return copied
+
+        copied += sent
+        progress(copied)
+
+    return copied
+
+
+def _copy_buffered(
+    fdin: int,
+    fdout: int,
+    copied: int,
+    length: int,
+    progress: Callable[[int], None],
+):
+    """Copies the rest of the file starting at offset `copied` through a single reusable
+    buffer."""
+    buf = bytearray(length)
+    view = memoryview(buf)
+
+    os.lseek(fdin, copied, os.SEEK_SET)
+    os.lseek(fdout, copied, os.SEEK_SET)
+
+    with open(fdin, "rb", buffering=0, closefd=False) as fsrc:
+        while True:
+            n = fsrc.readinto(buf)
+            if not n:
+                break
+
+            written = 0
+            while written < n:
+                written += os.write(fdout, view[written:n])
+
+            copied += n
+            progress(copied)
+
+    progress(copied)
+
+
+def hash_file(
+    path: str,
+    hasher: Hasher,
+    buffer_size: int = BUFFER_SIZE,
+    drop_cache: bool = False,
+):
+    """Updates the hasher with the content of a file and returns it.
+    Args:
+        path: the file to hash
+        hasher: hashlib object, e.g. hashlib.blake2b()
+        buffer_size: size of the read buffer, default = 8Mb
+        drop_cache: bool; if True, the file is flushed and evicted from the page
+            cache first, so a freshly written file is read back from the disk
+            instead of from memory
+    """
+    with open(path, "rb") as f:
+        if drop_cache:
+            os.fsync(f.fileno())
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+        _hash_range(f.fileno(), hasher, 0, os.fstat(f.fileno()).st_size, buffer_size)
+
+    return hasher
+
+
+def _hash_range(
+    fd: int, hasher: Hasher, start: int, end: int, length: int = BUFFER_SIZE
+):
+    """Updates the hasher with the bytes from `start` to `end` of the file through a
+    single reusable buffer."""
+    buf = bytearray(length)
+    view = memoryview(buf)
+
+    os.lseek(fd, start, os.SEEK_SET)
+
+    with open(fd, "rb", buffering=0, closefd=False) as f:
+        while start < end:
+            n = f.readinto(view[: min(length, end - start)])
+            if not n:
+                break
+
+            hasher.update(view[:n])
+            start += n
@@ -0,0 +1,35 @@
+import functools
+import threading
+from typing import Any, Callable, Generic, Self, TypeVar, overload
+
+T = TypeVar("T")
+
+
+class lazy_property(functools.cached_property[T], Generic[T]):
+    """
+    A cached property whose value is computed at most once, also if several threads access it
+    for the first time at once. Once computed, the value is stored on the instance and returned
+    without calling the property again.
+
+    Args:
+        - fn (Callable[[Any], T]): Computes the value of the property.
+    """
+
+    def __init__(self, fn: Callable[[Any], T]):
+        super().__init__(fn)
+        self._lock = threading.RLock()
+
+    @overload
+    def __get__(self, instance: None, owner: type[Any] | None = None) -> Self:
+        ...
+
+    @overload
+    def __get__(self, instance: object, owner: type[Any] | None = None) -> T:
+        ...
+
+    def __get__(self, instance: object | None, owner: type[Any] | None = None):
+        if instance is None:
+            return self
+
+        with self._lock:
+            return super().__get__(instance, owner)
@@ -0,0 +1,138 @@
+"""
+A minimal, in-memory stand-in for the parts of the Radarr v3 API used by the RadarrWrapper,
+so uploads can be exercised without a Radarr instance. Commands complete after a configurable
+delay like real RescanMovie/RenameFiles commands.
+
+Usage (from the autorip directory):
+    python -m fakes.fake_radarr [--port 7878] [--command-delay 2]
+"""
+
+import argparse
+import threading
+import time
+from collections import Counter
+from typing import Any
+
+from fakes.fake_server import FakeServer
+
+
+class FakeRadarr(FakeServer):
+    """
+    A fake Radarr server running in a background thread.
+
+    Args:
+        - port (int): The port to listen on, 0 picks a free port.
+        - command_delay (float): The time in seconds after which commands complete.
+        - quality_profiles (list[str]): The names of the available quality profiles.
+    """
+
+    PREFIX = "/api/v3/"
+
+    def __init__(
+        self,
+        port: int = 0,
+        command_delay: float = 0.5,
+        quality_profiles: list[str] | None = None,
+    ):
+        super().__init__(port)
+
+        self.command_delay = command_delay
+        self.quality_profiles = quality_profiles or ["HD-1080p", "Ultra-HD"]
+        self.root_folder = "/movies"
+
+        self.requests: Counter[str] = Counter()
+        self.movies: dict[int, dict[str, Any]] = {}
+        self.commands: dict[int, dict[str, Any]] = {}
+
+        self._lock = threading.Lock()
+
+    ################################################################################################
+    # API                                                                                          #
+    ################################################################################################
+
+    def handle(self, method: str, path: str, query: dict[str, str], body: Any):
+        """
+        Handles a single API request and returns the status code and JSON response.
+        """
+
+        with self._lock:
+            self.requests[f"{method} {path}"] += 1
+            self._complete_commands()
+
+            if method == "GET" and path == "movie/lookup/tmdb":
+                tmdb_id = int(query["tmdbId"])
+                return 200, {
+                    "tmdbId": tmdb_id,
+                    "title": f"Movie {tmdb_id}",
+                    "year": 2020,
+                }
+
+            if method == "GET" and path == "movie":
+                tmdb_id = int(query["tmdbId"])
+                return 200, [m for m in self.movies.values() if m["tmdbId"] == tmdb_id]
+
+            if method == "POST" and path == "movie":
+                if any(m["tmdbId"] == body["tmdbId"] for m in self.movies.values()):
+                    return 400, [{"errorMessage": "This movie has already been added"}]
+
+                movie = dict(body, id=len(self.movies) + 1)
+                movie["folderName"] = f"{movie['title']} ({movie['year']})"
+                movie["path"] = f"{body['rootFolderPath']}/{movie['folderName']}"
+                self.movies[movie["id"]] = movie
+                return 201, movie
+
+            if method == "GET" and path == "rootfolder":
+                return 200, [{"id": 1, "path": self.root_folder}]
+
+            if method == "GET" and path == "qualityprofile":
+                return 200, [
+                    {"id": i + 1, "name": name}
+                    for i, name in enumerate(self.quality_profiles)
+                ]
+
+            if method == "POST" and path == "command":
+                command = dict(body, id=len(self.commands) + 1, status="started")
+                command["_due"] = time.monotonic() + self.command_delay
+                self.commands[command["id"]] = command
+                return 201, self._public(command)
+
+            if method == "GET" and path.startswith("command/"):
+                command = self.commands.get(int(path.split("/")[1]))
+                if command is None:
+                    return 404, {"message": "NotFound"}
+                return 200, self._public(command)
+
+            return 404, {"message": "NotFound"}
+
+    def _complete_commands(self):
+        for command in self.commands.values():
+            if command["status"] != "started" or time.monotonic() < command["_due"]:
+                continue
+
+            command["status"] = "completed"
+            movie = self.movies.get(command.get("movieId", -1))
+
+            if command["name"] == "RescanMovie" and movie is not None:
+                movie["hasFile"] = True
+                movie["movieFile"] = {"id": movie["id"]}
+
+    @staticmethod
+    def _public(command: dict[str, Any]):
+        return {k: v for k, v in command.items() if not k.startswith("_")}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=7878)
+    parser.add_argument("--command-delay", type=float, default=2)
+    args = parser.parse_args()
+
+    radarr = FakeRadarr(args.port, args.command_delay)
+    print(f"Fake Radarr listening on {radarr.url}")
+    radarr.start()
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        radarr.stop()
@@ -0,0 +1,87 @@
+"""
+A minimal stand-in for the TMDB endpoints used by the MetadataWrapper, so rips can be started
+without a TMDB token. Every id exists, movies have the configured runtime and TV shows the
+configured episode run time. Point `metadata.tmdb_url` at the printed URL.
+
+Usage (from the autorip directory):
+    python -m fakes.fake_tmdb [--port 8787] [--runtime 120] [--episode-runtime 45]
+"""
+
+import argparse
+import time
+from collections import Counter
+from typing import Any
+
+from fakes.fake_server import FakeServer
+
+
+class FakeTmdb(FakeServer):
+    """
+    A fake TMDB server running in a background thread.
+
+    Args:
+        - port (int): The port to listen on, 0 picks a free port.
+        - runtime (int): The runtime in minutes of every movie.
+        - episode_runtime (int): The episode run time in minutes of every TV show.
+    """
+
+    PREFIX = "/3/"
+
+    def __init__(self, port: int = 0, runtime: int = 120, episode_runtime: int = 45):
+        super().__init__(port)
+
+        self.runtime = runtime
+        self.episode_runtime = episode_runtime
+        self.requests: Counter[str] = Counter()
+
+    @property
+    def url(self):
+        return f"{super().url}/3"
+
+    def handle(self, method: str, path: str, query: dict[str, str], body: Any):
+        self.requests[f"{method} {path}"] += 1
+
+        (kind, _, tmdb_id) = path.partition("/")
+
+        if method != "GET" or not tmdb_id.isdigit():
+            return 404, {"status_code": 34, "status_message": "Not found."}
+
+        if kind == "movie":
+            return 200, {
+                "id": int(tmdb_id),
+                "imdb_id": f"tt{int(tmdb_id):07}",
+                "title": f"Movie {tmdb_id}",
+                "release_date": "2020-01-01",
+                "runtime": self.runtime,
+            }
+
+        if kind == "tv":
+            return 200, {
+                "id": int(tmdb_id),
+                "name": f"Show {tmdb_id}",
+                "episode_run_time": [self.episode_runtime],
+                "first_air_date": "2018-01-01",
+                "last_air_date": "2020-01-01",
+                "number_of_episodes": 24,
+                "number_of_seasons": 3,
+            }
+
+        return 404, {"status_code": 34, "status_message": "Not found."}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--runtime", type=int, default=120)
+    parser.add_argument("--episode-runtime", type=int, default=45)
+    args = parser.parse_args()
+
+    tmdb = FakeTmdb(args.port, args.runtime, args.episode_runtime)
+    print(f"Fake TMDB listening on {tmdb.url}")
+    tmdb.start()
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        tmdb.stop()
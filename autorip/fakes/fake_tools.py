@@ -0,0 +1,149 @@
+"""
+Simulated `makemkvcon` and `HandBrakeCLI` executables, so the whole pipeline can run without a
+drive and without encoding for hours. They print realistic output at a configurable pace and
+write sparse output files of a configurable size. The executables in `fakes/bin` call into
+this module, put the directory in front of PATH to use them:
+
+    PATH="$PWD/fakes/bin:$PATH" FAKE_RIP_SECONDS=5 uvicorn main:app
+
+The simulation is configured with environment variables:
+
+    FAKE_TITLES            number of titles on the disc (default 50)
+    FAKE_RIP_SIZE_MB       size of a ripped title in MiB (default 1024)
+    FAKE_RIP_SECONDS       duration of a rip (default 5)
+    FAKE_ENCODE_SECONDS    duration of an encode (default 5)
+    FAKE_ENCODE_RATIO      size of an encoded file relative to its input (default 0.25)
+    FAKE_DURATION          duration in seconds of an encoded source (default 7200)
+    FAKE_CHAPTERS          number of equally long chapters of an encoded source (default 24)
+    FAKE_PROGRESS_RATE     progress updates per second of both tools (default 50)
+"""
+
+import os
+import time
+from typing import Iterator
+
+from benchmarks.fixtures import disc_info_lines, handbrake_progress_lines
+
+# The maximum of the PRGV progress values of makemkvcon
+PROGRESS_MAX = 65536
+
+
+def _env(name: str, default: float):
+    return float(os.environ.get(name, default))
+
+
+def _paced(count: int, seconds: float) -> Iterator[int]:
+    """
+    Yields the indices of `count` steps evenly spread over the given duration.
+    """
+
+    start = time.monotonic()
+
+    for i in range(count):
+        if (delay := start + seconds * i / count - time.monotonic()) > 0:
+            time.sleep(delay)
+        yield i
+
+
+def makemkvcon(args: list[str]):
+    """
+    Simulates `makemkvcon -r info dev:<device>` and `makemkvcon -r mkv dev:<device> <title>
+    <output dir>`. Rips of "all" titles write the titles one after another.
+    """
+
+    titles = int(_env("FAKE_TITLES", 50))
+    info = disc_info_lines(titles)
+
+    if "info" in args:
+        print("\n".join(info))
+        return 0
+
+    (title, output_dir) = args[-2:]
+    selected = list(range(titles)) if title == "all" else [int(title)]
+    names = {
+        int(line[6:].split(",")[0]): line.rsplit(",", 1)[1].strip('"')
+        for line in info
+        if line.startswith("TINFO:") and line.split(",")[1] == "27"
+    }
+
+    size = int(_env("FAKE_RIP_SIZE_MB", 1024) * 1024 * 1024)
+    seconds = _env("FAKE_RIP_SECONDS", 5) / len(selected)
+    updates = max(1, int(_env("FAKE_PROGRESS_RATE", 50) * seconds))
+
+    os.makedirs(output_dir, exist_ok=True)
+    print('MSG:5085,0,0,"Loaded content hash table"')
+    print('PRGT:5018,0,"Saving to MKV file"', flush=True)
+
+    for index, number in enumerate(selected):
+        with open(os.path.join(output_dir, names[number]), "wb") as f:
+            for i in _paced(updates, seconds):
+                # Grow the file sparsely, like a rip in progress
+                f.truncate(size * (i + 1) // updates)
+
+                done = (index * updates + i + 1) / (len(selected) * updates)
+                value = int(done * PROGRESS_MAX)
+                print(f"PRGV:{value},{value},{PROGRESS_MAX}", flush=True)
+
+    print(f'MSG:5036,0,1,"Copy complete. {len(selected)} titles saved."', flush=True)
+    return 0
+
+
+def _selected_share(args: list[str]):
+    """
+    Returns the share of the source selected by the `--chapters a-b` or `--start-at seconds:N`
+    and `--stop-at seconds:N` arguments of HandBrakeCLI, the whole source without them.
+    """
+
+    def value(name: str):
+        index = args.index(name) + 1 if name in args else len(args)
+        return args[index] if index < len(args) else None
+
+    def seconds(name: str):
+        # HandBrakeCLI takes the time ranges as "seconds:N"
+        selected = value(name)
+        return float(selected.rpartition(":")[2]) if selected is not None else None
+
+    duration = _env("FAKE_DURATION", 7200)
+    chapters = int(_env("FAKE_CHAPTERS", 24))
+
+    if (selected := value("--chapters")) is not None:
+        (first, _, last) = selected.partition("-")
+        count = min(int(last or first), chapters) - int(first) + 1
+        return max(0, count) / chapters
+
+    start = seconds("--start-at") or 0
+    length = duration - start
+
+    # --stop-at is relative to --start-at
+    if (stop := seconds("--stop-at")) is not None:
+        length = min(length, stop)
+
+    return max(0, length) / duration
+
+
+def handbrake_cli(args: list[str]):
+    """
+    Simulates a `HandBrakeCLI --json --input <file> --output <file>` encode. Encodes of a
+    chapter or time range take and write the share of the source they select.
+    """
+
+    input_file = args[args.index("--input") + 1]
+    output_file = args[args.index("--output") + 1]
+
+    share = _selected_share(args)
+    seconds = _env("FAKE_ENCODE_SECONDS", 5) * share
+    blocks = max(1, int(_env("FAKE_PROGRESS_RATE", 50) * seconds))
+    lines = handbrake_progress_lines(blocks, passes=1)
+    paced = _paced(sum(line.startswith("Progress:") for line in lines), seconds)
+
+    for line in lines:
+        if line.startswith("Progress:"):
+            next(paced)
+        print(line, flush=True)
+
+    size = os.path.getsize(input_file) * _env("FAKE_ENCODE_RATIO", 0.25) * share
+
+    with open(output_file, "wb") as f:
+        f.truncate(int(size))
+
+    return 0
@@ -1,8 +1,24 @@
+import contextvars
+import json
 import os
-from typing import Callable, Literal, Optional
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import AsyncIterator, Callable, Literal, Optional
 
-from core.config import Config
+from core.config import Config, PresetConfig
 from core.logger import Logger
+from core.tracing.tracer import span
+from core.utils.typing_utils import aware
+from handbrake.models.chunk import Chunk
+from handbrake.models.progress import EncodeProgress
+from handbrake.parsers.progress_parser import (
+    HandbrakeProgressParser,
+    ProgressHistory,
+    overall_progress,
+)
+from handbrake.split_encode import SplitProgress, plan_chunks
+from process.output_capture import DiscardCapture, RingBufferCapture
 from process.process_manager import ProcessManager
 
 
@@ -19,54 +35,318 @@ class HandbrakeWrapper:
 
         return None
 
+    @span()
     def encode_file(
         self,
         input_file: str,
         output_file: str,
         preset_type: Literal["movie", "tv"],
         cb: Optional[Callable[[str, float], None]] = None,
+        history: ProgressHistory | None = None,
+        cancel: threading.Event | None = None,
     ):
+        """
+        Encodes a file with the preset of the given type.
+
+        Args:
+            - input_file (str): The file to encode.
+            - output_file (str): The path of the encoded file.
+            - preset_type (Literal["movie", "tv"]): The type of the preset to use.
+            - cb (Callable[[str, float], None] | None): Receives the overall "progress", the
+                "eta" in seconds and the current "rate" in frames per second.
+            - history (ProgressHistory | None): Records the progress and rate over time.
+            - cancel (threading.Event | None): Stops the encode once set.
+        """
+
         self.logger.debug(f"Encoding file: {input_file}")
 
         preset = self.get_preset(preset_type)
 
-        if preset is None:
-            raise ValueError(f"Could not find preset for type: {preset_type}")
+        if preset is not None and preset.get("split_chunks", 1) > 1:
+            return self._encode_split(
+                input_file, output_file, preset_type, preset, cb, history, cancel
+            )
+
+        parser = HandbrakeProgressParser(history)
 
         def encode_callback(line: str):
+            record = self._feed(parser, line)
+
+            if cb and record is not None:
+                for update in self._progress_updates(record):
+                    cb(*update)
+
+        returncode, stdout, stderr = self.process_manager.call(
+            self._encode_args(input_file, output_file, preset_type),
+            cb=encode_callback,
+            stdout=RingBufferCapture(100),
+            cancel=cancel,
+        )
+
+        self._check_encode_result(input_file, output_file, returncode, stderr)
+
+        return returncode, stdout, stderr
+
+    def _encode_split(
+        self,
+        input_file: str,
+        output_file: str,
+        preset_type: Literal["movie", "tv"],
+        preset: PresetConfig,
+        cb: Optional[Callable[[str, float], None]] = None,
+        history: ProgressHistory | None = None,
+        cancel: threading.Event | None = None,
+    ):
+        """
+        Cuts the source into chapter or time range parts, encodes the parts concurrently and
+        concatenates them losslessly into the output file. The progress of the parts is merged
+        into one overall progress and ETA.
+        """
+
+        (chapters, duration) = self._probe(input_file)
+        chunks = plan_chunks(
+            output_file, preset.get("split_chunks", 1), chapters, duration
+        )
+        cancel = cancel or threading.Event()
+        progress = SplitProgress(chunks, cb, history)
+
+        workers = preset.get("split_workers", len(chunks))
+        self.logger.info(
+            f"Encoding {input_file} in {len(chunks)} parts with {workers} workers"
+        )
+
+        def encode_chunk(chunk: Chunk):
+            parser = HandbrakeProgressParser()
+
+            def chunk_callback(line: str):
+                if (record := self._feed(parser, line)) is not None:
+                    for update in self._progress_updates(record):
+                        progress.update(chunk["index"], *update)
+
+            with span("HandbrakeWrapper.encode_chunk", chunk=chunk["index"]):
+                (returncode, _, stderr) = self.process_manager.call(
+                    self._encode_args(input_file, chunk["output_file"], preset_type)
+                    + chunk["range_args"],
+                    cb=chunk_callback,
+                    stdout=RingBufferCapture(100),
+                    cancel=cancel,
+                )
+
+            self._check_encode_result(
+                input_file, chunk["output_file"], returncode, stderr
+            )
+
+        with ThreadPoolExecutor(workers, thread_name_prefix="encode") as pool:
+            # Parts record their spans into the trace of the calling thread
+            futures = [
+                pool.submit(contextvars.copy_context().run, encode_chunk, chunk)
+                for chunk in chunks
+            ]
+
+            try:
+                for future in as_completed(futures):
+                    future.result()
+            except Exception:
+                # Drop the queued parts and terminate the running ones, which would otherwise
+                # keep encoding for hours before the error surfaces
+                for future in futures:
+                    future.cancel()
+                cancel.set()
+                pool.shutdown(wait=True)
+                self._remove_chunks(chunks)
+                raise
+
+        result = self._concat_chunks(chunks, output_file)
+        self._remove_chunks(chunks)
+
+        return result
+
+    @span()
+    def _probe(self, input_file: str) -> tuple[list[float], float]:
+        """
+        Reads the chapter durations and the duration in seconds of a Matroska file. Chapters
+        are assumed to be equally long if their timestamps can't be read.
+        """
+
+        lines: list[str] = []
+        (returncode, _, stderr) = self.process_manager.call(
+            ["mkvmerge", "-J", input_file], cb=lines.append, stdout=DiscardCapture()
+        )
+
+        if returncode != 0:
+            self.logger.error(f"mkvmerge output:\n{stderr}")
+            raise ValueError(f"Could not identify file: {input_file}")
+
+        info = json.loads("\n".join(lines))
+        count = sum(c.get("num_entries", 0) for c in info.get("chapters", []))
+        duration = (
+            info.get("container", {}).get("properties", {}).get("duration", 0) / 1e9
+        )
+
+        starts: list[float] = self._chapter_starts(input_file) if count else []
+
+        if len(starts) != count:
+            self.logger.warn(f"Could not read the chapter timestamps of {input_file}")
+            starts = [duration * i / count for i in range(count)]
+
+        chapters = [end - start for start, end in zip(starts, starts[1:] + [duration])]
+
+        return (chapters, duration)
+
+    def _chapter_starts(self, input_file: str) -> list[float]:
+        """
+        Reads the start times in seconds of the chapters of a Matroska file from the simple
+        chapter format of mkvextract, e.g. "CHAPTER01=00:00:00.000".
+        """
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "chapters.txt")
+            (returncode, _, _) = self.process_manager.call(
+                ["mkvextract", input_file, "chapters", "--simple", path],
+                stdout=DiscardCapture(),
+            )
+
+            if returncode != 0 or not os.path.exists(path):
+                return []
+
+            with open(path, "r", encoding="utf-8") as f:
+                lines = f.read().splitlines()
+
+        starts: list[float] = []
+
+        for line in lines:
+            (key, _, value) = line.partition("=")
+
+            if key.startswith("CHAPTER") and key[7:].isdigit():
+                (hours, minutes, seconds) = value.split(":")
+                starts.append(int(hours) * 3600 + int(minutes) * 60 + float(seconds))
+
+        return starts
+
+    @span()
+    def _concat_chunks(self, chunks: list[Chunk], output_file: str):
+        """
+        Appends the encoded parts to each other without re-encoding.
+        """
+
+        args = ["mkvmerge", "-o", output_file, chunks[0]["output_file"]]
+        for chunk in chunks[1:]:
+            args += ["+", chunk["output_file"]]
+
+        (returncode, stdout, stderr) = self.process_manager.call(
+            args, stdout=RingBufferCapture(100)
+        )
+
+        # mkvmerge exits with 1 if there were only warnings
+        if returncode > 1:
+            self.logger.error(f"mkvmerge output:\n{stdout}\n{stderr}")
+            raise ValueError(f"Could not concatenate the parts of: {output_file}")
+
+        self.logger.info(f"Successfully concatenated {len(chunks)} parts")
+
+        return 0, stdout, stderr
+
+    @staticmethod
+    def _remove_chunks(chunks: list[Chunk]):
+        for chunk in chunks:
+            if os.path.exists(chunk["output_file"]):
+                os.remove(chunk["output_file"])
+
+    async def encode_file_progress(
+        self,
+        input_file: str,
+        output_file: str,
+        preset_type: Literal["movie", "tv"],
+    ) -> AsyncIterator[tuple[Literal["progress", "eta", "rate"], float]]:
+        """
+        Encodes a file on the event loop of the caller, which allows to supervise several
+        encodes from a single thread.
+
+        Yields:
+            tuple: The key ("progress", "eta" or "rate") and value of every progress update.
+        """
+
+        self.logger.debug(f"Encoding file: {input_file}")
+        parser = HandbrakeProgressParser()
+
+        async with self.process_manager.async_manager.open(
+            self._encode_args(input_file, output_file, preset_type),
+            stdout=RingBufferCapture(100),
+        ) as process:
+            async for line in process:
+                if (record := self._feed(parser, line)) is not None:
+                    for update in self._progress_updates(record):
+                        yield update
+
+        self._check_encode_result(
+            input_file, output_file, aware(process.returncode), process.stderr
+        )
+
+    def _feed(self, parser: HandbrakeProgressParser, line: str):
+        """
+        Feeds an output line into the parser and logs it. Progress blocks are logged as a single
+        line once complete, so they can be sampled like the progress lines of makemkvcon.
+        """
+
+        record = parser.feed(line)
+
+        if record is not None:
+            if self.logger.debug_enabled:
+                self.logger.debug(f"{parser.PREFIX} {json.dumps(record)}")
+        elif not parser.in_block:
             self.logger.debug(line)
 
-            if cb and '"Progress":' in line:
-                cb("progress", float(line.split(":")[1].split(",")[0].strip()))
+        return record
+
+    @staticmethod
+    def _progress_updates(
+        record: EncodeProgress,
+    ) -> list[tuple[Literal["progress", "eta", "rate"], float]]:
+        """
+        Converts a progress record into the updates passed to progress callbacks. Only the
+        encoding itself reports progress, scanning and muxing have a progress of their own.
+        """
+
+        if record["state"] != "WORKING":
+            return []
 
-            if cb and '"ETASeconds":' in line:
-                cb("eta", float(line.split(":")[1].split(",")[0].strip()))
+        return [
+            ("progress", overall_progress(record)),
+            ("eta", record["eta"]),
+            ("rate", record["rate"]),
+        ]
+
+    def _encode_args(
+        self, input_file: str, output_file: str, preset_type: Literal["movie", "tv"]
+    ):
+        preset = self.get_preset(preset_type)
+
+        if preset is None:
+            raise ValueError(f"Could not find preset for type: {preset_type}")
 
         output_dir = os.path.dirname(output_file)
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
-        returncode, stdout, stderr = self.process_manager.call(
-            [
-                "HandBrakeCLI",
-                "--json",
-                "--input",
-                input_file,
-                "--output",
-                output_file,
-                "--preset-import-file",
-                preset["path"],
-                "-Z",
-                preset["name"],
-            ],
-            cb=encode_callback,
-        )
+        return [
+            "HandBrakeCLI",
+            "--json",
+            "--input",
+            input_file,
+            "--output",
+            output_file,
+            "--preset-import-file",
+            preset["path"],
+            "-Z",
+            preset["name"],
+        ]
 
+    def _check_encode_result(
+        self, input_file: str, output_file: str, returncode: int, stderr: str
+    ):
         if returncode != 0:
             self.logger.error(f"Could not encode file: {input_file}")
             self.logger.error(f"HandBrakeCLI output:\n{stderr}")
             raise ValueError(f"Could not encode file: {input_file}")
 
         self.logger.info(f"Successfully encoded {input_file} into {output_file}")
-
-        return returncode, stdout, stderr
@@ -0,0 +1,8 @@
+from typing import TypedDict
+
+
+class Chunk(TypedDict):
+    index: int
+    range_args: list[str]
+    weight: float
+    output_file: str
@@ -0,0 +1,17 @@
+from typing import TypedDict
+
+
+class EncodeProgress(TypedDict):
+    state: str
+    pass_number: int
+    pass_count: int
+    progress: float
+    rate: float
+    rate_avg: float
+    eta: float
+
+
+class ProgressSample(TypedDict):
+    elapsed: float
+    progress: float
+    rate: float
@@ -0,0 +1,210 @@
+import json
+import time
+from typing import Any, cast
+
+from handbrake.models.progress import EncodeProgress, ProgressSample
+
+
+class ProgressHistory:
+    """
+    A bounded history of progress samples for throughput graphs. Samples are taken at most once
+    per interval. Once the history is full, every second sample is dropped and the interval is
+    doubled, so the history always spans the whole encode with a fixed number of samples.
+
+    Args:
+        - size (int): The maximum number of samples.
+        - interval (float): The initial minimum number of seconds between two samples.
+    """
+
+    def __init__(self, size: int = 256, interval: float = 1.0):
+        self._size = size
+        self._interval = interval
+        self._samples: list[ProgressSample] = []
+
+    @property
+    def samples(self):
+        """
+        Returns a copy of the samples, oldest first.
+        """
+        return list(self._samples)
+
+    def add(self, elapsed: float, progress: float, rate: float):
+        if self._samples and elapsed - self._samples[-1]["elapsed"] < self._interval:
+            return
+
+        self._samples.append(
+            ProgressSample(elapsed=elapsed, progress=progress, rate=rate)
+        )
+
+        if len(self._samples) >= self._size:
+            self._samples = self._samples[::2]
+            self._interval *= 2
+
+
+class HandbrakeProgressParser:
+    """
+    Incrementally parses the JSON progress output of HandBrakeCLI (--json), which prints every
+    update as a multi-line block with one value per line:
+
+        Progress: {
+            "State": "WORKING",
+            "Working": {"ETASeconds": 1234, "Pass": 1, "PassCount": 1, "Progress": 0.12, ...}
+        }
+
+    Lines outside of progress blocks are skipped with a single prefix check. Lines of a block
+    are split into key and value without decoding the block as JSON, only the values of a
+    record are kept and the nesting is tracked by the opening and closing lines. A block
+    printed on a single line is decoded as JSON.
+
+    Args:
+        - history (ProgressHistory | None): The history encoding samples are recorded to.
+    """
+
+    PREFIX = "Progress:"
+
+    # The keys of the values of a record as printed by HandBrake
+    KEYS = tuple(
+        f'"{key}":'
+        for key in (
+            "State",
+            "Pass",
+            "PassCount",
+            "Progress",
+            "Rate",
+            "RateAvg",
+            "ETASeconds",
+        )
+    )
+
+    def __init__(self, history: ProgressHistory | None = None):
+        self.history = history or ProgressHistory()
+
+        self._fields: dict[str, str] = {}
+        self._depth = 0
+        self._started_at: float | None = None
+        self._last: EncodeProgress | None = None
+
+    @property
+    def last(self):
+        """
+        Returns the last parsed progress record or None if no block was completed yet.
+        """
+        return self._last
+
+    @property
+    def in_block(self):
+        """
+        Checks whether the parser is in the middle of a progress block.
+        """
+        return self._depth > 0
+
+    def feed(self, line: str) -> EncodeProgress | None:
+        """
+        Feeds a single, stripped output line of HandBrakeCLI into the parser.
+
+        Returns:
+            EncodeProgress | None: The progress record if the line completed a progress block.
+        """
+
+        # Most lines are plain values inside a block, check for them first
+        if self._depth:
+            first = line[:1]
+
+            if first == '"':
+                # A single prefix check skips the values which aren't part of a record
+                if line.startswith(self.KEYS):
+                    if self._depth <= 2:
+                        (key, _, value) = line.partition(":")
+                        self._fields[key[1:-1]] = value.strip().rstrip(",").strip('"')
+                elif line[-1] in "{[":
+                    self._depth += 1
+
+                return None
+
+            if first == "}" or first == "]":
+                self._depth -= 1
+                return self._complete(self._fields) if self._depth == 0 else None
+
+            if first == "{" or first == "[":
+                self._depth += 1
+                return None
+
+        if line.startswith(self.PREFIX):
+            return self._start(line[len(self.PREFIX) :].strip())
+
+        return None
+
+    def _start(self, line: str):
+        """
+        Starts a new block, dropping what is left of a truncated one.
+        """
+
+        self._fields = {}
+        self._depth = 0
+
+        if line == "{":
+            self._depth = 1
+            return None
+
+        try:
+            return self._complete(self._flatten(json.loads(line)))
+        except (ValueError, TypeError, AttributeError, KeyError):
+            return None
+
+    def _complete(self, fields: dict[str, str]):
+        try:
+            record = self._to_record(fields)
+        except (ValueError, KeyError):
+            return None
+
+        self._last = record
+
+        if record["state"] == "WORKING":
+            now = time.monotonic()
+            if self._started_at is None:
+                self._started_at = now
+            self.history.add(now - self._started_at, record["progress"], record["rate"])
+
+        return record
+
+    @staticmethod
+    def _flatten(block: dict[str, Any]) -> dict[str, str]:
+        """
+        Returns the values of a record from a decoded block. The values are nested in an object
+        named after the state, e.g. "Working", "Scanning" or "Muxing".
+        """
+
+        fields: dict[str, Any] = {}
+
+        for value in block.values():
+            if isinstance(value, dict):
+                fields.update(cast(dict[str, Any], value))
+                break
+
+        fields["State"] = block["State"]
+
+        return {key: str(value) for key, value in fields.items()}
+
+    @staticmethod
+    def _to_record(fields: dict[str, str]) -> EncodeProgress:
+        return EncodeProgress(
+            state=fields["State"],
+            pass_number=int(fields.get("Pass", 1)),
+            pass_count=int(fields.get("PassCount", 1)),
+            progress=float(fields.get("Progress", 0)),
+            rate=float(fields.get("Rate", 0)),
+            rate_avg=float(fields.get("RateAvg", 0)),
+            eta=float(fields.get("ETASeconds", 0)),
+        )
+
+
+def overall_progress(record: EncodeProgress):
+    """
+    Returns the progress of the whole encode, HandBrake reports the progress of the current
+    pass only.
+    """
+
+    pass_count = max(record["pass_count"], 1)
+    completed = min(max(record["pass_number"], 1), pass_count) - 1
+
+    return (completed + record["progress"]) / pass_count
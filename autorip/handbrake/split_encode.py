@@ -0,0 +1,132 @@
+import threading
+import time
+from typing import Callable, Optional
+
+from handbrake.models.chunk import Chunk
+from handbrake.parsers.progress_parser import ProgressHistory
+
+
+def plan_chunks(
+    output_file: str, chunks: int, chapters: list[float], duration: float
+) -> list[Chunk]:
+    """
+    Splits a source into at most `chunks` consecutive parts of about the same duration. Parts
+    are cut at chapter boundaries if the source has enough chapters, so every part starts at a
+    key frame, and at equal time ranges otherwise.
+
+    Args:
+        - output_file (str): The final output file, the parts are placed next to it.
+        - chunks (int): The wanted number of parts.
+        - chapters (list[float]): The durations in seconds of the chapters of the source.
+        - duration (float): The duration of the source in seconds.
+
+    Returns:
+        list[Chunk]: The parts with the HandBrakeCLI arguments selecting their range and their
+        share of the whole source.
+    """
+
+    parts: list[tuple[list[str], float]] = []
+    total = sum(chapters)
+
+    if len(chapters) >= chunks and total > 0:
+        # Cut at the chapter boundary closest to the end of the current share of the total
+        # duration, but leave at least one chapter for every remaining part
+        (start, elapsed, part_start) = (1, 0.0, 0.0)
+
+        for number, length in enumerate(chapters, start=1):
+            elapsed += length
+            target = total * (len(parts) + 1) / chunks
+            following = chapters[number] if number < len(chapters) else 0
+
+            # Parts and chapters after the current ones
+            remaining = chunks - len(parts) - 1
+            left = len(chapters) - number
+
+            if left == remaining or (
+                left > remaining > 0 and elapsed + following - target > target - elapsed
+            ):
+                # Chapter numbers start at 1
+                args = ["--chapters", f"{start}-{number}"]
+                parts.append((args, (elapsed - part_start) / total))
+                (start, part_start) = (number + 1, elapsed)
+
+    elif duration > 0:
+        length = duration / chunks
+        for i in range(chunks):
+            # --stop-at is relative to --start-at, the last part runs until the end
+            start = int(i * length)
+            args = ["--start-at", f"seconds:{start}"]
+            if i < chunks - 1:
+                args += ["--stop-at", f"seconds:{int((i + 1) * length) - start}"]
+            parts.append((args, 1 / chunks))
+
+    else:
+        parts.append(([], 1))
+
+    return [
+        Chunk(
+            index=i,
+            range_args=args,
+            weight=weight,
+            output_file=f"{output_file}.part{i:02}.mkv",
+        )
+        for i, (args, weight) in enumerate(parts)
+    ]
+
+
+class SplitProgress:
+    """
+    Merges the progress of concurrently encoded parts into the overall progress and estimated
+    remaining time of the whole encode. Thread safe, parts report from their worker threads.
+
+    Args:
+        - chunks (list[Chunk]): The parts of the encode.
+        - cb (Callable[[str, float], None] | None): The callback receiving the overall progress,
+            ETA and rate, with the same keys as a single encode.
+        - history (ProgressHistory | None): Records the overall progress and rate over time.
+    """
+
+    def __init__(
+        self,
+        chunks: list[Chunk],
+        cb: Optional[Callable[[str, float], None]] = None,
+        history: ProgressHistory | None = None,
+    ):
+        self._weights = [chunk["weight"] for chunk in chunks]
+        self._progress = [0.0] * len(chunks)
+        self._rates = [0.0] * len(chunks)
+        self._cb = cb
+        self._history = history
+        self._lock = threading.Lock()
+        self._started_at = time.monotonic()
+
+    def update(self, index: int, key: str, value: float):
+        if key == "rate":
+            with self._lock:
+                self._rates[index] = value
+            return
+
+        if key != "progress":
+            return
+
+        with self._lock:
+            self._progress[index] = value
+            progress = sum(w * p for w, p in zip(self._weights, self._progress))
+
+            # Finished parts don't contribute to the rate anymore
+            rate = sum(r for r, p in zip(self._rates, self._progress) if p < 1)
+            elapsed = time.monotonic() - self._started_at
+
+            # The history is not thread safe, parts report concurrently
+            if self._history is not None:
+                self._history.add(elapsed, progress, rate)
+
+        if self._cb is None:
+            return
+
+        self._cb("progress", progress)
+        self._cb("rate", rate)
+
+        # The ETAs of the single parts don't account for queued parts
+        if progress > 0:
+            self._cb("eta", elapsed / progress * (1 - progress))
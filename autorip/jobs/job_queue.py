@@ -0,0 +1,333 @@
+import queue
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+from typing import Any, Callable
+
+from api.database.json_storage import JsonStorage
+from core.events.event_bus import EventBus
+from core.logger import Logger
+from core.metrics.metrics import STAGE_RESULTS
+from core.tracing.tracer import Tracer
+from core.utils.typing_utils import aware
+from jobs.models.job import Job
+from process.transcripts import TranscriptRecorder
+
+# A handler returning False ends the stages of the job, e.g. when it fanned out into child jobs.
+# The job waits until all of its child jobs finished and then finishes or fails with them.
+StageHandler = Callable[[Job], bool | None]
+
+
+class JobQueue:
+    """
+    A persistent job queue that moves every job through a fixed sequence of stages (e.g. rip,
+    encode and upload). Each stage has its own worker threads and its own queue, so different
+    jobs can be processed by different stages at the same time.
+
+    Args:
+        - storage (JsonStorage): The storage the jobs are persisted to.
+        - logger (Logger): The logger object.
+        - events (EventBus | None): The bus changes of jobs are published to as "job" events.
+        - tracer (Tracer | None): The tracer recording the spans of every stage of a job.
+        - transcripts (TranscriptRecorder | None): The recorder of the output of the processes
+            spawned for a job.
+    """
+
+    STORAGE_KEY = "jobs"
+
+    def __init__(
+        self,
+        storage: JsonStorage,
+        logger: Logger,
+        events: EventBus | None = None,
+        tracer: Tracer | None = None,
+        transcripts: TranscriptRecorder | None = None,
+    ):
+        self._storage = storage
+        self._logger = logger
+        self._events = events
+        self._tracer = tracer
+        self._transcripts = transcripts
+        self._lock = threading.RLock()
+
+        self._stages: list[str] = []
+        self._handlers: dict[str, StageHandler] = {}
+        self._workers: dict[str, int] = {}
+        self._queues: dict[str, queue.Queue[str]] = {}
+        self._threads: list[threading.Thread] = []
+
+        self._jobs: dict[str, Job] = dict(storage.get(self.STORAGE_KEY, {}))
+
+    ################################################################################################
+    # Setup                                                                                        #
+    ################################################################################################
+
+    def add_stage(self, name: str, handler: StageHandler, workers: int = 1):
+        """
+        Appends a stage to the pipeline. Stages are processed in the order they were added.
+
+        Args:
+            - name (str): The name of the stage, also used as the job stage identifier.
+            - handler (StageHandler): The function processing a single job in this stage.
+            - workers (int): The number of jobs this stage may process concurrently.
+        """
+
+        if self._threads:
+            raise RuntimeError("Stages can not be added after the queue was started.")
+
+        self._stages.append(name)
+        self._handlers[name] = handler
+        self._workers[name] = workers
+        self._queues[name] = queue.Queue()
+
+    def start(self, resume: Callable[[Job], str | None] | None = None):
+        """
+        Re-enqueues the persisted jobs and starts the worker threads of every stage. Jobs which
+        were running when the service stopped are resumed if possible and marked as failed
+        otherwise.
+
+        Args:
+            - resume (Callable[[Job], str | None] | None): Returns the stage an interrupted job
+                resumes from, after validating the artifacts of the stages before, or None if
+                it can't be resumed.
+        """
+
+        with self._lock:
+            for job in sorted(
+                self._jobs.values(), key=lambda j: j.get("created_at", 0)
+            ):
+                if job.get("state") == "queued" and job.get("stage") in self._queues:
+                    self._queues[job["stage"]].put(job["id"])
+
+                elif job.get("state") == "running":
+                    stage = resume(Job(**job)) if resume is not None else None
+
+                    if stage not in self._queues:
+                        job["state"] = "error"
+                        job["error"] = "interrupted by a restart of the service"
+                        continue
+
+                    self._logger.info(f"Resuming job {job['id']} in stage {stage}")
+                    job.update(stage=aware(stage), state="queued", progress=0, eta=0)
+                    self._queues[aware(stage)].put(job["id"])
+
+            self._save()
+
+            # Children may have failed above, while their parent waits for them
+            for job in list(self._jobs.values()):
+                if job.get("state") == "waiting":
+                    self._settle(job["id"])
+
+        for stage in self._stages:
+            for i in range(self._workers[stage]):
+                thread = threading.Thread(
+                    target=self._work, args=(stage,), name=f"{stage}-{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    ################################################################################################
+    # Job management                                                                               #
+    ################################################################################################
+
+    @property
+    def jobs(self) -> list[Job]:
+        """
+        Returns a snapshot of all known jobs, oldest first.
+        """
+
+        with self._lock:
+            jobs = [Job(**job) for job in self._jobs.values()]
+
+        return sorted(jobs, key=lambda j: j.get("created_at", 0))
+
+    def get(self, job_id: str) -> Job | None:
+        """
+        Returns a snapshot of the job with the given id or None if it does not exist.
+        """
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return Job(**job) if job is not None else None
+
+    def submit(self, stage: str | None = None, **fields: Any) -> Job:
+        """
+        Creates a new job and enqueues it into the first stage.
+
+        Args:
+            - stage (str | None): The stage to enqueue the job into instead of the first one,
+                for child jobs which continue the work of another job.
+            - fields (Any): Additional job fields, e.g. the tmdb id and media type.
+
+        Returns:
+            Job: A snapshot of the created job.
+        """
+
+        if not self._stages:
+            raise RuntimeError("The job queue has no stages.")
+
+        now = time.time()
+        job = Job(
+            **fields,
+            id=uuid.uuid4().hex,
+            stage=stage or self._stages[0],
+            state="queued",
+            progress=0,
+            eta=0,
+            created_at=now,
+            updated_at=now,
+        )
+
+        with self._lock:
+            self._jobs[job["id"]] = job
+            self._save()
+
+        self._publish(job)
+
+        self._logger.info(f"Queued job {job['id']} for stage {job['stage']}")
+        self._queues[job["stage"]].put(job["id"])
+
+        return Job(**job)
+
+    def update(self, job_id: str, **fields: Any):
+        """
+        Updates the given fields of a job and persists the change.
+        """
+
+        with self._lock:
+            self._jobs[job_id].update(fields, updated_at=time.time())  # type: ignore
+            self._save()
+            job = Job(**self._jobs[job_id])
+
+        self._publish(job)
+
+    def is_stage_busy(self, stage: str):
+        """
+        Checks whether any job is currently queued for or running in the given stage.
+        """
+
+        with self._lock:
+            return any(
+                job.get("stage") == stage and job.get("state") in ("queued", "running")
+                for job in self._jobs.values()
+            )
+
+    ################################################################################################
+    # Workers                                                                                      #
+    ################################################################################################
+
+    def _work(self, stage: str):
+        """
+        Worker loop of a stage: takes the next job from the stage queue, processes it and hands
+        it over to the next stage.
+        """
+
+        while True:
+            job_id = self._queues[stage].get()
+            job = self.get(job_id)
+
+            if job is None or job.get("state") != "queued":
+                continue
+
+            self.update(job_id, state="running", progress=0, eta=0)
+            self._logger.info(f"Processing job {job_id} in stage {stage}")
+
+            try:
+                with self._trace(job_id, stage), self._record(job_id):
+                    proceed = (
+                        self._handlers[stage](aware(self.get(job_id))) is not False
+                    )
+            except Exception as err:
+                STAGE_RESULTS.inc(stage=stage, result="error")
+                self.update(job_id, state="error", error=str(err))
+                self._logger.error(
+                    f"Error while processing job {job_id} in {stage}: {err}"
+                )
+                self._settle(job.get("parent_id"))
+                continue
+
+            STAGE_RESULTS.inc(stage=stage, result="success")
+
+            if proceed:
+                self._advance(job_id, stage)
+            else:
+                self.update(job_id, state="waiting", eta=0)
+                self._settle(job_id)
+
+    def _advance(self, job_id: str, stage: str):
+        """
+        Moves a job to the stage following the given one or marks it as finished.
+        """
+
+        index = self._stages.index(stage) + 1
+
+        if index == len(self._stages):
+            self._finish(job_id)
+            return
+
+        next_stage = self._stages[index]
+        self.update(job_id, stage=next_stage, state="queued", progress=0, eta=0)
+        self._queues[next_stage].put(job_id)
+
+    def _finish(self, job_id: str):
+        self.update(job_id, state="finished", progress=1, eta=0)
+        self._logger.info(f"Finished job {job_id}")
+        self._settle(aware(self.get(job_id)).get("parent_id"))
+
+    def _settle(self, job_id: str | None):
+        """
+        Finishes a waiting job once all of its child jobs are done, or marks it as failed if
+        any of them failed.
+        """
+
+        with self._lock:
+            job = self._jobs.get(job_id or "")
+
+            if job is None or job.get("state") != "waiting":
+                return
+
+            children = [
+                child
+                for child in self._jobs.values()
+                if child.get("parent_id") == job_id
+            ]
+
+            if any(
+                child.get("state") not in ("finished", "error") for child in children
+            ):
+                return
+
+            failed = [
+                child["id"] for child in children if child.get("state") == "error"
+            ]
+
+            if failed:
+                self.update(
+                    job["id"], state="error", error=f"child jobs failed: {failed}"
+                )
+                self._logger.error(
+                    f"Job {job['id']} failed, child jobs failed: {failed}"
+                )
+            else:
+                self._finish(job["id"])
+
+    def _trace(self, job_id: str, stage: str):
+        if self._tracer is None:
+            return nullcontext()
+        return self._tracer.trace(job_id, stage)
+
+    def _record(self, job_id: str):
+        if self._transcripts is None:
+            return nullcontext()
+        return self._transcripts.record(job_id)
+
+    def _publish(self, job: Job):
+        if self._events is not None:
+            self._events.publish("job", job["id"], **job)
+
+    def _save(self):
+        # Store a snapshot, the storage serializes it in the background while jobs change
+        self._storage.set(
+            self.STORAGE_KEY, {job_id: Job(**job) for job_id, job in self._jobs.items()}
+        )
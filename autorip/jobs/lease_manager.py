@@ -0,0 +1,278 @@
+import os
+import threading
+import time
+import uuid
+from typing import Callable, Literal, Optional
+
+from core.logger import Logger
+from core.utils.typing_utils import aware
+from jobs.models.lease import Lease
+
+
+class EncodeTask:
+    """
+    An encode offered to remote workers, with the lease it is currently processed under.
+    """
+
+    def __init__(
+        self,
+        job_id: str,
+        input_file: str,
+        output_file: str,
+        preset_type: Literal["movie", "tv"],
+        cb: Optional[Callable[[str, float], None]],
+    ):
+        self.job_id = job_id
+        self.input_file = input_file
+        self.output_file = output_file
+        self.preset_type: Literal["movie", "tv"] = preset_type
+        self.cb = cb
+
+        self.lease_id: str | None = None
+        self.worker_id: str | None = None
+        self.heartbeat_at = 0.0
+        self.error: str | None = None
+        self.done = threading.Event()
+
+
+class LeaseManager:
+    """
+    Hands out encodes to remote encode workers. A worker leases an encode, keeps the lease
+    alive with heartbeats while it downloads, encodes and uploads, and completes it by
+    uploading the result. Leases without a heartbeat for `lease_timeout` seconds expire, and
+    the encode is offered again to the next worker.
+
+    Args:
+        - logger (Logger): The logger object.
+        - lease_timeout (float): The time in seconds after which a lease without heartbeat
+            expires. Workers without a request for this time are considered gone.
+    """
+
+    def __init__(self, logger: Logger, lease_timeout: float = 60):
+        self._logger = logger
+        self._lease_timeout = lease_timeout
+        self._lock = threading.Lock()
+
+        self._workers: dict[str, tuple[str, float]] = {}
+        self._pending: list[EncodeTask] = []
+        self._leases: dict[str, EncodeTask] = {}
+
+    ################################################################################################
+    # Coordinator                                                                                  #
+    ################################################################################################
+
+    def has_workers(self):
+        """
+        Checks whether any worker was seen within the lease timeout.
+        """
+
+        with self._lock:
+            return self._has_workers()
+
+    def encode(
+        self,
+        job_id: str,
+        input_file: str,
+        output_file: str,
+        preset_type: Literal["movie", "tv"],
+        cb: Optional[Callable[[str, float], None]] = None,
+    ):
+        """
+        Offers an encode to the remote workers and blocks until one of them completed it.
+
+        Args:
+            - job_id (str): The id of the job the encode belongs to.
+            - input_file (str): The file to encode.
+            - output_file (str): The path the encoded file is stored at.
+            - preset_type (Literal["movie", "tv"]): The preset to encode with.
+            - cb (Callable[[str, float], None] | None): Receives the progress and ETA reported
+                by the worker, like the callback of `HandbrakeWrapper.encode_file`.
+
+        Returns:
+            bool: True if a worker encoded the file, False if all workers left before any of
+            them leased it or the worker failed to encode it, so it has to be encoded locally.
+        """
+
+        task = EncodeTask(job_id, input_file, output_file, preset_type, cb)
+
+        with self._lock:
+            self._pending.append(task)
+
+        self._logger.info(f"Offered encode of job {job_id} to remote workers")
+
+        while not task.done.wait(1):
+            self._expire()
+
+            with self._lock:
+                if task in self._pending and not self._has_workers():
+                    self._pending.remove(task)
+                    self._logger.info(f"No remote workers left for job {job_id}")
+                    return False
+
+        if task.error is not None:
+            self._logger.warn(f"Remote encode of job {job_id} failed: {task.error}")
+            return False
+
+        return True
+
+    ################################################################################################
+    # Workers                                                                                      #
+    ################################################################################################
+
+    def register(self, name: str):
+        """
+        Registers a worker and returns its id.
+        """
+
+        worker_id = uuid.uuid4().hex
+
+        with self._lock:
+            self._workers[worker_id] = (name, time.monotonic())
+
+        self._logger.info(f"Registered encode worker {name} ({worker_id})")
+        return worker_id
+
+    def lease(self, worker_id: str) -> Lease | None:
+        """
+        Leases the oldest pending encode to a worker.
+
+        Returns:
+            Lease | None: The lease or None if there is nothing to encode.
+
+        Raises:
+            KeyError: If the worker is not registered.
+        """
+
+        self._expire()
+
+        with self._lock:
+            name = self._workers[worker_id][0]
+            self._workers[worker_id] = (name, time.monotonic())
+
+            if not self._pending:
+                return None
+
+            task = self._pending.pop(0)
+            task.lease_id = uuid.uuid4().hex
+            task.worker_id = worker_id
+            task.heartbeat_at = time.monotonic()
+            self._leases[task.lease_id] = task
+
+        self._logger.info(f"Leased encode of job {task.job_id} to worker {name}")
+
+        return Lease(
+            id=task.lease_id,
+            job_id=task.job_id,
+            preset_type=task.preset_type,
+            input_name=os.path.basename(task.input_file),
+            input_size=os.path.getsize(task.input_file),
+            expires_in=self._lease_timeout,
+        )
+
+    def input_file(self, lease_id: str):
+        """
+        Returns the file to encode of an active lease.
+
+        Raises:
+            KeyError: If the lease is unknown or expired.
+        """
+
+        return self._task(lease_id).input_file
+
+    def heartbeat(self, lease_id: str, progress: float = 0, eta: float = 0):
+        """
+        Keeps a lease alive and forwards the progress of the worker.
+
+        Raises:
+            KeyError: If the lease is unknown or expired.
+        """
+
+        task = self._task(lease_id)
+
+        if task.cb is not None:
+            task.cb("progress", progress)
+            task.cb("eta", eta)
+
+    def result_file(self, lease_id: str):
+        """
+        Returns the output path of an active lease. Results are uploaded into a temporary file
+        in the same directory, which `complete` moves to the output path.
+
+        Raises:
+            KeyError: If the lease is unknown or expired.
+        """
+
+        task = self._task(lease_id)
+        os.makedirs(os.path.dirname(task.output_file), exist_ok=True)
+
+        return task.output_file
+
+    def complete(self, lease_id: str, result_file: str):
+        """
+        Completes a lease with the completely uploaded result, which is moved to the output
+        path.
+
+        Raises:
+            KeyError: If the lease is unknown or expired.
+        """
+
+        task = self._task(lease_id)
+        os.replace(result_file, task.output_file)
+
+        self._finish(task)
+
+    def fail(self, lease_id: str, error: str):
+        """
+        Completes a lease with an error.
+
+        Raises:
+            KeyError: If the lease is unknown or expired.
+        """
+
+        task = self._task(lease_id)
+        task.error = error
+        self._finish(task)
+
+    def _task(self, lease_id: str):
+        """
+        Returns the task of an active lease and renews the lease.
+        """
+
+        self._expire()
+
+        with self._lock:
+            task = self._leases[lease_id]
+            task.heartbeat_at = time.monotonic()
+
+            worker_id = aware(task.worker_id)
+            self._workers[worker_id] = (self._workers[worker_id][0], task.heartbeat_at)
+
+        return task
+
+    def _finish(self, task: EncodeTask):
+        with self._lock:
+            self._leases.pop(task.lease_id or "", None)
+
+        task.done.set()
+
+    def _expire(self):
+        """
+        Offers encodes whose lease expired to the next worker again.
+        """
+
+        now = time.monotonic()
+
+        with self._lock:
+            for lease_id, task in list(self._leases.items()):
+                if now - task.heartbeat_at < self._lease_timeout:
+                    continue
+
+                del self._leases[lease_id]
+                self._pending.insert(0, task)
+                self._logger.warn(f"Lease of job {task.job_id} expired")
+
+    def _has_workers(self):
+        now = time.monotonic()
+        return any(
+            now - seen < self._lease_timeout for _, seen in self._workers.values()
+        )
@@ -0,0 +1,35 @@
+from typing import Literal, Required, TypedDict
+
+from handbrake.models.progress import ProgressSample
+from metadata.models.metadata import MovieMetadata, TvMetadata
+from ripper.models.candidate import Candidate
+
+JobState = Literal["queued", "running", "waiting", "finished", "error"]
+
+
+class Job(TypedDict, total=False):
+    id: Required[str]
+    tmdb_id: Required[int]
+    media_type: Required[Literal["movie", "tv"]]
+    stage: Required[str]
+    state: Required[JobState]
+    progress: Required[float]
+    eta: Required[float]
+    error: str
+    created_at: Required[float]
+    updated_at: Required[float]
+    metadata: MovieMetadata | TvMetadata
+    candidates: list[Candidate]
+    episodes: list[int]
+    parent_id: str
+    episode: int
+    rip_name: str
+    rip_path: str
+    rip_size: int
+    encoded_path: str
+    encoded_size: int
+    copy_path: str
+    copy_offset: int
+    checksum: str
+    throughput: list[ProgressSample]
+    stage_durations: dict[str, float]
@@ -0,0 +1,10 @@
+from typing import Literal, TypedDict
+
+
+class Lease(TypedDict):
+    id: str
+    job_id: str
+    preset_type: Literal["movie", "tv"]
+    input_name: str
+    input_size: int
+    expires_in: float
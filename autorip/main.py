@@ -1,116 +1,548 @@
+import asyncio
+import json
+import os
+import tempfile
 import time
+from contextlib import asynccontextmanager, contextmanager
 from typing import Union
 
 from api.app import App
-from fastapi import BackgroundTasks
+from core.events.models.event import Event
+from core.metrics.metrics import (
+    COPY_THROUGHPUT,
+    ENCODE_RATE,
+    REGISTRY,
+    RIP_THROUGHPUT,
+    STAGE_DURATION,
+)
+from core.metrics.registry import CONTENT_TYPE, RateMeter
+from core.utils.typing_utils import aware
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+from handbrake.parsers.progress_parser import ProgressHistory
+from jobs.models.job import Job
 
-app = App()
 
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    start_jobs()
+    yield
+    flush_db()
+    flush_logs()
 
-class RipperCallback:
-    def __init__(self):
-        self.last_set_time = time.time()
 
-    def call(self, progress: float):
-        current_time = time.time()
-        time_elapsed = current_time - self.last_set_time
+app = App(lifespan=lifespan)
 
-        if time_elapsed >= 5:
-            app.db.set("progress", progress)
-            self.last_set_time = current_time
 
+def device():
+    return app.config.get["input"]["device"]
 
-class EncoderCallback:
-    def __init__(self):
-        self.last_set_time = time.time()
-        self._last_progress = 0
-        self._last_eta = 0
 
-    def call(self, key: str, value: float):
+# Progress is published to the event bus on every update, but only persisted every few seconds
+PROGRESS_PERSIST_INTERVAL = 5
+
+
+class ProgressPublisher:
+    """
+    Publishes the progress reported by the ripper, encoder and uploader of a job as "progress"
+    events and their throughput as metrics. The throughput of rips and copies is derived from
+    the progress and the number of bytes processed in total.
+    """
+
+    def __init__(self, job_id: str, stage: str, size: int = 0):
+        self.job_id = job_id
+        self.stage = stage
+        self._progress = 0.0
+        self._eta = 0.0
+
+        self._size = size
+        self._meter = RateMeter()
+        self._labels = {"job_id": job_id, "device": device()}
+
+    def ripper(self, progress: float):
+        self._progress = progress
+        RIP_THROUGHPUT.set(self._megabytes_per_second(), **self._labels)
+        self.publish()
+
+    def encoder(self, key: str, value: float):
         if key == "progress":
-            self._last_progress = value
+            self._progress = value
         elif key == "eta":
-            self._last_eta = value
+            self._eta = value
+        elif key == "rate":
+            ENCODE_RATE.set(value, **self._labels)
+            return
+        self.publish()
+
+    def uploader(self, progress: float, eta: float):
+        self._progress = progress
+        self._eta = eta
+        COPY_THROUGHPUT.set(self._megabytes_per_second(), **self._labels)
+        self.publish()
+
+    def _megabytes_per_second(self):
+        return self._meter.update(self._progress * self._size) / 1e6
+
+    def publish(self):
+        app.events.publish(
+            "progress",
+            self.job_id,
+            job_id=self.job_id,
+            stage=self.stage,
+            progress=self._progress,
+            eta=self._eta,
+        )
+
+
+def persist_progress(event: Event):
+    job = app.jobs.get(event["key"])
+
+    # Ignore progress arriving after the job already moved on
+    if job is None or job.get("stage") != event["data"]["stage"]:
+        return
+
+    app.jobs.update(
+        event["key"], progress=event["data"]["progress"], eta=event["data"]["eta"]
+    )
+
+
+@contextmanager
+def measure_stage(job: Job, stage: str):
+    """
+    Records the duration of a successful scan, rip, encode or upload of a job in the job and
+    in the stage duration histogram. A metric per job would add series with every job. The
+    throughput gauges of the job are removed afterwards, so finished jobs don't report stale
+    values.
+    """
+
+    start = time.perf_counter()
+
+    try:
+        yield
+    finally:
+        for gauge in (RIP_THROUGHPUT, ENCODE_RATE, COPY_THROUGHPUT):
+            gauge.remove(job_id=job["id"], device=device())
+
+    duration = time.perf_counter() - start
+    STAGE_DURATION.observe(duration, stage=stage, device=device())
+
+    durations = (app.jobs.get(job["id"]) or job).get("stage_durations", {})
+    app.jobs.update(job["id"], stage_durations={**durations, stage: duration})
+
+
+def rip_stage(job: Job):
+    app.ripper.fetch_metadata(job["tmdb_id"], job["media_type"])
+    app.jobs.update(job["id"], metadata=app.ripper.metadata)
+
+    working_dir = app.config.get["output"]["working_dir"]
+
+    if job["media_type"] == "tv":
+        return rip_episodes(job, f"{working_dir}/ripping/{job['id']}/")
+
+    with measure_stage(job, "scan"):
+        app.ripper.read_disc_properties()
+
+    app.ripper.detect_main_feature()
+    app.jobs.update(job["id"], candidates=app.ripper.candidates)
+
+    with measure_stage(job, "rip"):
+        rip_name, rip_path = app.ripper.rip_main_feature(
+            f"{working_dir}/ripping/{job['id']}/",
+            ProgressPublisher(job["id"], "ripping", app.ripper.rip_size).ripper,
+        )
+
+    app.jobs.update(
+        job["id"],
+        rip_name=rip_name,
+        rip_path=rip_path,
+        rip_size=os.path.getsize(rip_path),
+    )
+
+
+def rip_episodes(job: Job, output_dir: str):
+    """
+    Rips all episodes of a TV disc. Every episode continues as a job of its own in the encoding
+    stage as soon as it is ripped, while the remaining episodes are still ripped.
+    """
+
+    with measure_stage(job, "scan"):
+        app.ripper.read_disc_properties()
+
+    app.ripper.detect_episodes()
+    app.jobs.update(job["id"], episodes=app.ripper.episodes)
+
+    def spawn_episode(episode: int, rip_name: str, rip_path: str):
+        app.jobs.submit(
+            stage="encoding",
+            parent_id=job["id"],
+            episode=episode,
+            tmdb_id=job["tmdb_id"],
+            media_type=job["media_type"],
+            metadata=app.ripper.metadata,
+            rip_name=rip_name,
+            rip_path=rip_path,
+            rip_size=os.path.getsize(rip_path),
+        )
+
+    with measure_stage(job, "rip"):
+        app.ripper.rip_episodes(
+            output_dir,
+            spawn_episode,
+            ProgressPublisher(job["id"], "ripping", app.ripper.rip_size).ripper,
+        )
+
+    # The episode jobs encode and upload the episodes, the job waits for them
+    return False
+
+
+def encode_stage(job: Job):
+    working_dir = app.config.get["output"]["working_dir"]
+
+    # Episodes of different discs may share their name
+    encoded_path = os.path.join(
+        working_dir, "encoding", job.get("parent_id", ""), aware(job.get("rip_name"))
+    )
+    publisher = ProgressPublisher(job["id"], "encoding")
+
+    with measure_stage(job, "encode"):
+        # Prefer remote encode workers and only encode locally if none is available or the
+        # remote encode failed
+        rip_path = aware(job.get("rip_path"))
+        encoded_remotely = app.leases.has_workers() and app.leases.encode(
+            job["id"],
+            rip_path,
+            encoded_path,
+            job["media_type"],
+            publisher.encoder,
+        )
+
+        if not encoded_remotely:
+            history = ProgressHistory()
+            app.encoder.encode_file(
+                rip_path,
+                encoded_path,
+                job["media_type"],
+                publisher.encoder,
+                history,
+            )
+            app.jobs.update(job["id"], throughput=history.samples)
+
+    app.jobs.update(
+        job["id"],
+        encoded_path=encoded_path,
+        encoded_size=os.path.getsize(encoded_path),
+    )
+
+
+def upload_stage(job: Job):
+    encoded_path = aware(job.get("encoded_path"))
+    size = os.path.getsize(encoded_path)
+
+    resume_from = None
+    if "copy_path" in job:
+        resume_from = (job["copy_path"], job.get("copy_offset", 0))
+
+    def checkpoint(copy_path: str, copy_offset: int):
+        app.jobs.update(job["id"], copy_path=copy_path, copy_offset=copy_offset)
+
+    with measure_stage(job, "upload"):
+        checksum = app.uploader.upload_file(
+            encoded_path,
+            job["tmdb_id"],
+            job["media_type"],
+            ProgressPublisher(job["id"], "uploading", size).uploader,
+            job.get("metadata"),
+            resume_from,
+            checkpoint,
+        )
+
+    if checksum is not None:
+        app.jobs.update(job["id"], checksum=checksum)
+
+
+def encode_workers():
+    """
+    Returns the number of jobs encoded at the same time. Defaults to the limit of the
+    HandBrakeCLI process pool, so the episodes of a disc are encoded concurrently as far as the
+    pool allows, and to 2 without a limit.
+    """
+
+    if "encode_workers" in app.config.get["output"]:
+        return app.config.get["output"]["encode_workers"]
+
+    for name, pool in app.config.get.get("process", {}).get("pools", {}).items():
+        if pool.get("executable", name) == "HandBrakeCLI" and "limit" in pool:
+            return pool["limit"]
+
+    return 2
+
+
+def resume_stage(job: Job):
+    """
+    Returns the stage a job interrupted by a restart resumes from: the stage after the last one
+    whose output still exists with the recorded size. Rips are never resumed, the drive may
+    contain another disc by now.
+    """
+
+    def is_intact(path_key: str, size_key: str):
+        path = job.get(path_key)
+        return (
+            isinstance(path, str)
+            and os.path.isfile(path)
+            and os.path.getsize(path) == job.get(size_key)
+        )
+
+    stage = job.get("stage")
+
+    if stage == "uploading" and is_intact("encoded_path", "encoded_size"):
+        return "uploading"
+
+    if stage in ("encoding", "uploading") and is_intact("rip_path", "rip_size"):
+        return "encoding"
+
+    return None
 
-        current_time = time.time()
-        time_elapsed = current_time - self.last_set_time
 
-        if time_elapsed >= 5:
-            app.db.set("progress", self._last_progress)
-            app.db.set("eta", self._last_eta)
-            self.last_set_time = current_time
+def start_jobs():
+    """
+    Sets up the job queue and resumes the interrupted jobs. Runs on startup instead of on
+    import, so importing main doesn't create the config, storage, job queue and logger.
+    """
 
+    app.events.subscribe(
+        PROGRESS_PERSIST_INTERVAL, persist_progress, types=["progress"]
+    )
 
-class UploaderCallback:
-    def __init__(self):
-        self.last_set_time = time.time()
+    app.jobs.add_stage("ripping", rip_stage)
+    app.jobs.add_stage("encoding", encode_stage, encode_workers())
+    app.jobs.add_stage("uploading", upload_stage)
 
-    def call(self, progress: float, eta: float):
-        current_time = time.time()
-        time_elapsed = current_time - self.last_set_time
+    app.jobs.start(resume_stage)
 
-        if time_elapsed >= 5:
-            app.db.set("progress", progress)
-            app.db.set("eta", eta)
-            self.last_set_time = current_time
+
+def flush_db():
+    app.db.close()
+
+
+def flush_logs():
+    app.logger.close()
 
 
 @app.post("/rip/{tmdb_id}")
-async def start_ripper(
-    tmdb_id: int, background_tasks: BackgroundTasks, media_type: Union[str, None] = None
-):
-    if app.db.get("state") != "finished" and app.db.get("state") != "rip_error":
+async def start_ripper(tmdb_id: int, media_type: Union[str, None] = None):
+    if app.jobs.is_stage_busy("ripping"):
         return {"status": 400, "msg": "ripping process already running"}
 
     media_type = "movie" if media_type == "movie" else "tv"
 
-    def rip_disc():
-        app.ripper.fetch_metadata(tmdb_id, media_type)
-        app.db.set("current_metadata", app.ripper.metadata)
+    job = app.jobs.submit(tmdb_id=tmdb_id, media_type=media_type)
+
+    return {
+        "status": 200,
+        "msg": f"initiated ripping process for {tmdb_id}",
+        "data": job,
+    }
+
+
+@app.get("/jobs")
+def get_jobs():
+    return {"status": 200, "data": app.jobs.jobs}
+
 
-        encoder_callback = EncoderCallback()
-        uploader_callback = UploaderCallback()
-        ripper_callback = RipperCallback()
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = app.jobs.get(job_id)
+
+    if job is None:
+        return {"status": 404, "msg": f"job {job_id} does not exist"}
+
+    return {"status": 200, "data": job}
+
+
+@app.get("/events")
+async def get_events(interval: float = 1, job_id: Union[str, None] = None):
+    """
+    Streams job and progress events as Server-Sent Events. Every client gets at most one event
+    per job and `interval` seconds.
+    """
+
+    async def stream():
+        subscription = app.events.subscribe(interval)
 
         try:
-            app.db.set("state", "ripping")
-            app.db.set("progress", 0)
+            async for event in subscription:
+                if job_id is None or event["key"] == job_id:
+                    yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            subscription.close()
 
-            working_dir = app.config.get["output"]["working_dir"]
+    return StreamingResponse(stream(), media_type="text/event-stream")
 
-            app.ripper.read_disc_properties().detect_main_feature()
-            (rip_name, rip_path) = app.ripper.rip_main_feature(
-                f"{working_dir}/ripping/", ripper_callback.call
-            )
 
-            app.db.set("state", "encoding")
-            app.db.set("progress", 0)
-            app.db.set("eta", 0)
+@app.post("/workers")
+def register_worker(name: str):
+    return {"status": 200, "data": {"worker_id": app.leases.register(name)}}
 
-            encoded_path = f"{working_dir}/encoding/{rip_name}"
-            app.encoder.encode_file(
-                rip_path, encoded_path, media_type, encoder_callback.call
-            )
 
-            app.db.set("state", "uploading")
-            app.db.set("progress", 0)
-            app.db.set("eta", 0)
+@app.post("/workers/{worker_id}/lease")
+def lease_encode(worker_id: str):
+    try:
+        return {"status": 200, "data": app.leases.lease(worker_id)}
+    except KeyError:
+        return {"status": 404, "msg": f"worker {worker_id} is not registered"}
 
-            app.uploader.upload_file(
-                encoded_path, tmdb_id, media_type, uploader_callback.call
-            )
 
-            app.db.set("progress", 1)
-            app.db.set("eta", 0)
-            app.db.set("state", "finished")
+def parse_range(header: str, size: int):
+    """
+    Parses a single byte range header, e.g. "bytes=100-", "bytes=100-199" or "bytes=-100".
+    Returns the first and last byte or None if the range is malformed or not satisfiable.
+    """
+
+    (unit, _, spec) = header.partition("=")
+    (first, _, last) = spec.strip().partition("-")
+
+    if unit.strip() != "bytes" or not (first or last):
+        return None
+
+    if any(part and not part.isdigit() for part in (first, last)):
+        return None
+
+    if first:
+        (start, end) = (int(first), min(int(last), size - 1) if last else size - 1)
+    else:
+        (start, end) = (max(0, size - int(last)), size - 1)
+
+    if start >= size or start > end:
+        return None
 
-        except Exception as err:
-            app.db.set("state", "rip_error")
-            app.logger.error(f"Error while ripping disc: {err}")
+    return (start, end)
+
+
+@app.get("/leases/{lease_id}/input")
+def download_lease_input(lease_id: str, request: Request):
+    """
+    Serves the file to encode of a lease. Supports single byte ranges, so workers can resume
+    interrupted downloads.
+    """
+
+    try:
+        path = app.leases.input_file(lease_id)
+    except KeyError:
+        return Response(status_code=404)
+
+    size = os.path.getsize(path)
+    (start, end) = (0, size - 1)
+
+    if (ranges := request.headers.get("range")) is not None:
+        if (byte_range := parse_range(ranges, size)) is None:
+            return Response(
+                status_code=416, headers={"Content-Range": f"bytes */{size}"}
+            )
 
-    background_tasks.add_task(rip_disc)
+        (start, end) = byte_range
 
-    return {"status": 200, "msg": f"initiated ripping process for {tmdb_id}"}
+    def stream():
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0 and (chunk := f.read(min(remaining, 1024 * 1024))):
+                remaining -= len(chunk)
+                yield chunk
+
+    headers = {"Accept-Ranges": "bytes", "Content-Length": str(end - start + 1)}
+    if ranges is not None:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    return StreamingResponse(
+        stream(),
+        status_code=206 if ranges is not None else 200,
+        media_type="application/octet-stream",
+        headers=headers,
+    )
+
+
+@app.post("/leases/{lease_id}/heartbeat")
+def heartbeat_lease(lease_id: str, progress: float = 0, eta: float = 0):
+    try:
+        app.leases.heartbeat(lease_id, progress, eta)
+    except KeyError:
+        return {"status": 404, "msg": f"lease {lease_id} expired"}
+
+    return {"status": 200}
+
+
+@app.put("/leases/{lease_id}/result")
+async def upload_lease_result(lease_id: str, request: Request):
+    """
+    Receives the encoded file of a lease into a temporary file next to the output path, which
+    only replaces the output once the whole body arrived. Partial uploads are removed.
+    """
+
+    try:
+        path = app.leases.result_file(lease_id)
+    except KeyError:
+        return {"status": 404, "msg": f"lease {lease_id} expired"}
+
+    if not (length := request.headers.get("content-length", "")).isdigit():
+        return {"status": 411, "msg": "the upload requires a Content-Length"}
+
+    (fd, temp_path) = tempfile.mkstemp(
+        dir=os.path.dirname(path), prefix=f".{lease_id}.", suffix=".upload"
+    )
+    received = 0
+
+    try:
+        # Write in large blocks off the event loop, the body arrives in small chunks
+        buffer = bytearray()
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in request.stream():
+                buffer += chunk
+                received += len(chunk)
+                if len(buffer) >= 8 * 1024 * 1024:
+                    await asyncio.to_thread(f.write, bytes(buffer))
+                    buffer.clear()
+            await asyncio.to_thread(f.write, bytes(buffer))
+
+        if received != int(length):
+            os.remove(temp_path)
+            return {
+                "status": 400,
+                "msg": f"received {received} of {length} bytes, upload again",
+            }
+
+        app.leases.complete(lease_id, temp_path)
+
+    except KeyError:
+        os.remove(temp_path)
+        return {"status": 404, "msg": f"lease {lease_id} expired"}
+
+    except BaseException:
+        # E.g. the worker disconnected in the middle of the upload
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return {"status": 200}
+
+
+@app.post("/leases/{lease_id}/fail")
+def fail_lease(lease_id: str, error: str):
+    try:
+        app.leases.fail(lease_id, error)
+    except KeyError:
+        return {"status": 404, "msg": f"lease {lease_id} expired"}
+
+    return {"status": 200}
+
+
+@app.get("/metrics")
+def get_metrics():
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/scan")
+def get_disc_scan():
+    return {"status": 200, "data": app.ripper.disc_scan}
 
 
 @app.get("/data")
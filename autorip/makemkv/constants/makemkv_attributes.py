@@ -11,6 +11,7 @@ MAKEMKV_ATTRIBUTE_ENUMS = {
     13: "bitrate",
     14: "audio_channels_count",
     15: "angle_info",
+    16: "source_file_name",
     17: "audio_sample_rate",
     18: "audio_sample_size",
     19: "video_size",
@@ -18,6 +19,8 @@ MAKEMKV_ATTRIBUTE_ENUMS = {
     21: "video_frame_rate",
     23: "date_time",
     24: "original_title_dd",
+    25: "segments_count",
+    26: "segments_map",
     27: "output_file_name",
     28: "metadata_language_code",
     29: "metadata_language_name",
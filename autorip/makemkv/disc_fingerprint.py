@@ -0,0 +1,104 @@
+import hashlib
+import os
+
+# Directories containing the playlists and streams of Blu-ray and DVD discs, their file sizes
+# identify a disc without reading any of the (large) files
+TITLE_DIRECTORIES = ["BDMV/PLAYLIST", "BDMV/STREAM", "VIDEO_TS"]
+
+
+def find_mount_point(device: str):
+    """
+    Finds the mount point of the given device in /proc/mounts.
+
+    Args:
+        - device (str): The path of the device, e.g. /dev/sr0.
+
+    Returns:
+        str | None: The mount point or None if the device is not mounted.
+    """
+
+    device = os.path.realpath(device)
+
+    try:
+        with open("/proc/mounts", "r", encoding="utf-8") as f:
+            mounts = [line.split() for line in f]
+    except OSError:
+        return None
+
+    for mount in mounts:
+        if len(mount) > 1 and os.path.realpath(mount[0]) == device:
+            return _unescape(mount[1])
+
+    return None
+
+
+def read_volume_label(device: str, mount_point: str):
+    """
+    Reads the volume label of the given device from /dev/disk/by-label and falls back to the
+    name of the mount point, which is the label for automatically mounted discs.
+    """
+
+    device = os.path.realpath(device)
+    by_label = "/dev/disk/by-label"
+
+    if os.path.isdir(by_label):
+        for label in os.listdir(by_label):
+            if os.path.realpath(os.path.join(by_label, label)) == device:
+                return _unescape(label)
+
+    return os.path.basename(mount_point.rstrip("/"))
+
+
+def disc_fingerprint(device: str):
+    """
+    Creates a cheap fingerprint of the disc in the given device from its volume label and the
+    names and sizes of its playlist and stream files. Only the file system metadata of the
+    mounted disc is read.
+
+    Args:
+        - device (str): The path of the device, e.g. /dev/sr0.
+
+    Returns:
+        str | None: The hex digest of the fingerprint or None if the disc is not mounted or
+        contains no title files.
+    """
+
+    mount_point = find_mount_point(device)
+
+    if mount_point is None:
+        return None
+
+    files: list[str] = []
+
+    for directory in TITLE_DIRECTORIES:
+        path = os.path.join(mount_point, directory)
+
+        if not os.path.isdir(path):
+            continue
+
+        for entry in os.scandir(path):
+            if entry.is_file():
+                files.append(f"{directory}/{entry.name}:{entry.stat().st_size}")
+
+    if not files:
+        return None
+
+    digest = hashlib.sha256(read_volume_label(device, mount_point).encode("utf-8"))
+    for file in sorted(files):
+        digest.update(b"\n" + file.encode("utf-8"))
+
+    return digest.hexdigest()
+
+
+def _unescape(value: str):
+    """
+    Replaces the octal (/proc/mounts) and hex (/dev/disk/by-label) escapes of special
+    characters like spaces.
+    """
+
+    return (
+        value.encode("utf-8")
+        .decode("unicode_escape")
+        .encode("latin-1")
+        .decode("utf-8", errors="replace")
+    )
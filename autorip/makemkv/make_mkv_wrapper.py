@@ -1,14 +1,18 @@
-import csv
 import os
-from typing import Callable, Optional
+from typing import Any, AsyncIterator, Callable, Optional
 
+from core.cache.disk_cache import DiskCache
 from core.config import Config
 from core.logger import Logger
+from core.tracing.tracer import span
 from core.utils.typing_utils import aware
+from process.output_capture import RingBufferCapture
 from process.process_manager import ProcessManager
 
-from makemkv.constants.makemkv_attributes import MAKEMKV_ATTRIBUTE_ENUMS
-from makemkv.models.disc_properties import Disc, Stream, Title
+from makemkv.disc_fingerprint import disc_fingerprint
+from makemkv.models.disc_properties import Title
+from makemkv.parsers.disc_info_parser import DiscInfoParser
+from makemkv.parsers.progress_parser import parse_prgv
 
 
 class MakeMKVWrapper:
@@ -25,14 +29,36 @@ class MakeMKVWrapper:
         self._config = config
         self._logger = logger
         self._process_manager = process_manager
+        self._disc_scan: DiscInfoParser | None = None
+
+        cache_size = self._config.get["input"].get("disc_cache_size_mb", 50)
+        self._disc_cache = (
+            DiskCache(
+                f"{self._config.get['output']['logging_dir']}/disc_cache",
+                cache_size * 1024 * 1024,
+            )
+            if cache_size > 0
+            else None
+        )
 
     ################################################################################################
     # Metadata-Gathering                                                   #
     ################################################################################################
 
+    @property
+    def disc_scan(self):
+        """
+        Returns the parser of the current or last disc scan, which can be used to inspect the
+        properties found so far while the scan is still running. None if no scan was started.
+        """
+        return self._disc_scan
+
+    @span()
     def read_disc_properties(self):
         """
-        Reads the properties of a disc using MakeMKV.
+        Reads the properties of a disc using MakeMKV. The output is parsed line by line while
+        makemkvcon is still scanning the disc. Known discs are identified by their fingerprint
+        and read from the disc cache, which skips the scan entirely.
 
         Returns:
             A tuple containing the disc properties and title properties.
@@ -43,56 +69,74 @@ class MakeMKVWrapper:
             Each title dictionary contains the title properties as key-value pairs.
         """
 
-        properties = self._read_raw_disc_properties()
+        parser = DiscInfoParser()
+        self._disc_scan = parser
 
-        _, stdout, _ = properties
-        parsed = list(csv.reader(stdout.split("\n")))
+        fingerprint = self._disc_fingerprint()
+        cached = (
+            self._disc_cache.get(fingerprint)
+            if self._disc_cache and fingerprint
+            else None
+        )
+
+        if cached is not None:
+            self._logger.info(f"Found disc {fingerprint} in the disc cache")
+            disc, titles = parser.load(
+                cached["disc"], self._restore_keys(cached["titles"])
+            )
+        else:
+            self._read_raw_disc_properties(parser.feed)
+            disc, titles = parser.finish()
 
-        def save_value(obj: Disc | Title | Stream, prop: int | str, value: int | str):
-            if prop in MAKEMKV_ATTRIBUTE_ENUMS:
-                obj[MAKEMKV_ATTRIBUTE_ENUMS[prop]] = value
+            if self._disc_cache and fingerprint:
+                self._disc_cache.set(fingerprint, {"disc": disc, "titles": titles})
 
-        disc: Disc = {}
-        titles: dict[int, Title] = {}
+        self._logger.info(f"Successfully read disc properties: {disc}")
+        self._logger.info(f"Successfully read title properties: {titles}")
 
-        for line in parsed:
-            if len(line) == 0:
-                continue
+        return (disc, titles)
 
-            # First column contains data after the first colon, make it a proper column
-            data = line[0].split(":", 1) + line[1:]
+    def _disc_fingerprint(self):
+        """
+        Returns the fingerprint of the disc in the configured device or None if the disc can't
+        be fingerprinted (not mounted) or properties are read from the log.
+        """
 
-            # Convert every possible column to int values
-            data = [int(x) if x.isdigit() else x for x in data]
-            key = data[0]
+        if self._config.get["input"]["read_from_log"] or self._disc_cache is None:
+            return None
 
-            # Parse general disc info
-            if key == "CINFO":
-                save_value(disc, data[1], data[3])
+        fingerprint = disc_fingerprint(self._config.get["input"]["device"])
 
-            # Parse title info
-            elif key == "TINFO":
-                title = int(data[1])
-                titles.setdefault(title, {})
-                save_value(titles[title], data[2], data[4])
+        if fingerprint is None:
+            self._logger.debug("Disc is not mounted, skipping the disc cache")
 
-            # Parse stream info
-            elif key == "SINFO":
-                title, stream = int(data[1]), int(data[2])
-                titles[title].setdefault("streams", {}).setdefault(stream, {})
-                save_value(
-                    aware(titles[title].get("streams"))[stream], data[3], data[5]
-                )
+        return fingerprint
 
-        self._logger.info(f"Successfully read disc properties: {disc}")
-        self._logger.info(f"Successfully read title properties: {titles}")
+    @staticmethod
+    def _restore_keys(titles: dict[str, Any]) -> dict[int, Title]:
+        """
+        Converts the title and stream numbers back to ints, JSON only supports string keys.
+        """
 
-        return (disc, titles)
+        restored: dict[int, Title] = {}
 
-    def _read_raw_disc_properties(self) -> tuple[int, str, str]:
+        for index, title in titles.items():
+            if "streams" in title:
+                title["streams"] = {int(i): s for i, s in title["streams"].items()}
+            restored[int(index)] = title
+
+        return restored
+
+    @span()
+    def _read_raw_disc_properties(
+        self, cb: Callable[[str], None]
+    ) -> tuple[int, str, str]:
         """
         Reads the disc properties using the makemkvcon command line tool.
 
+        Args:
+            - cb (Callable[[str], None]): A callback receiving the output line by line.
+
         Returns:
             A tuple containing the return code, stdout, and stderr of the command.
             If the command fails, returns None.
@@ -102,31 +146,39 @@ class MakeMKVWrapper:
 
         if self._config.get["input"]["read_from_log"]:
             with open(f"{logging_dir}/stdout.log", "r", encoding="utf-8") as f:
-                return 0, f.read(), ""
+                for line in f:
+                    cb(line.strip())
+            return 0, "", ""
 
         device = self._config.get["input"]["device"]
 
         self._logger.info(f"Reading disc properties from {device}")
 
-        returncode, stdout, stderr = self._process_manager.call(
-            ["makemkvcon", "-r", "info", f"dev:{device}"],
-            cb=self._logger.debug,
-        )
+        with open(f"{logging_dir}/stdout.log", "w", encoding="utf-8") as log:
+
+            def info_callback(line: str):
+                self._logger.debug(line)
+                log.write(line + "\n")
+                cb(line)
+
+            returncode, stdout, stderr = self._process_manager.call(
+                ["makemkvcon", "-r", "info", f"dev:{device}"],
+                cb=info_callback,
+                stdout=RingBufferCapture(100),
+            )
 
         if returncode != 0:
             self._logger.error(f"Could not acquire blue-ray title info from {device}")
-            self._logger.error(f"makemkvcon output:\n{stderr}")
+            self._logger.error(f"makemkvcon output:\n{stdout}\n{stderr}")
             raise ValueError("Could not acquire blue-ray title info from {device}")
 
-        with open(f"{logging_dir}/stdout.log", "w", encoding="utf-8") as f:
-            f.write(stdout)
-
         return returncode, stdout, stderr
 
     ################################################################################################
     # Actual ripping process                                                                       #
     ################################################################################################
 
+    @span()
     def rip_blue_ray(
         self, title: int, output_dir: str, cb: Optional[Callable[[float], None]] = None
     ) -> tuple[int, str, str]:
@@ -134,7 +186,9 @@ class MakeMKVWrapper:
         Rips the main feature of a blue-ray disc using the makemkvcon command line tool.
 
         Args:
-            - title (str): The title id of the blue-ray disc to rip.
+            - title (int): The title id of the blue-ray disc to rip.
+            - output_dir (str): The directory the title is ripped into.
+            - cb (Callable[[float], None] | None): Receives the total progress of the rip.
 
         Returns:
             A tuple containing the return code, stdout, and stderr of the command.
@@ -152,32 +206,81 @@ class MakeMKVWrapper:
         def rip_callback(line: str):
             self._logger.debug(line)
 
-            if cb and line.startswith("PRGV"):
-                parsed = line.split(":", 1)[1].strip().split(",")
-                [_, curr, total] = [float(x) for x in parsed]
-                cb(curr / total)
+            if cb and (progress := parse_prgv(line)) is not None:
+                cb(progress)
 
         returncode, stdout, stderr = self._process_manager.call(
-            [
-                "makemkvcon",
-                "--messages=-stdout",
-                "--progress=-same",
-                "-r",
-                "mkv",
-                f"dev:{device}",
-                f"{title}",
-                f"{output_dir}",
-            ],
+            self._rip_args(title, output_dir),
             cb=rip_callback,
+            stdout=RingBufferCapture(100),
         )
 
-        if returncode != 0:
-            self._logger.error(f"Could not rip blue-ray title {title} from {device}")
-            self._logger.error(f"makemkvcon output:\n{stderr}")
-            raise ValueError(f"Could not rip blue-ray title {title}")
+        self._check_rip_result(title, returncode, stdout, stderr)
+
+        return returncode, stdout, stderr
+
+    async def rip_blue_ray_progress(
+        self, title: int, output_dir: str
+    ) -> AsyncIterator[float]:
+        """
+        Rips a title of a blue-ray disc on the event loop of the caller, which allows to
+        supervise several rips from a single thread.
+
+        Args:
+            - title (str): The title id of the blue-ray disc to rip.
+            - output_dir (str): The directory the title is ripped into.
+
+        Yields:
+            float: The total progress of the rip as fraction between 0 and 1.
+        """
+
+        device = self._config.get["input"]["device"]
 
         self._logger.info(
-            f"Successfully ripped title with id {title} from {device} into {output_dir}"
+            f"Ripping title with id {title} from {device} into {output_dir}"
         )
 
-        return returncode, stdout, stderr
+        os.makedirs(output_dir, exist_ok=True)
+
+        async with self._process_manager.async_manager.open(
+            self._rip_args(title, output_dir), stdout=RingBufferCapture(100)
+        ) as process:
+            async for line in process:
+                self._logger.debug(line)
+
+                if (progress := parse_prgv(line)) is not None:
+                    yield progress
+
+        self._check_rip_result(
+            title, aware(process.returncode), process.stdout, process.stderr
+        )
+
+    def _rip_args(self, title: int, output_dir: str):
+        """
+        Returns the makemkvcon arguments to rip the given title into the output directory.
+        """
+
+        return [
+            "makemkvcon",
+            "--messages=-stdout",
+            "--progress=-same",
+            "-r",
+            "mkv",
+            f"dev:{self._config.get['input']['device']}",
+            f"{title}",
+            f"{output_dir}",
+        ]
+
+    def _check_rip_result(self, title: int, returncode: int, stdout: str, stderr: str):
+        """
+        Logs the result of a rip and raises a ValueError if makemkvcon failed.
+        """
+
+        device = self._config.get["input"]["device"]
+
+        if returncode != 0:
+            self._logger.error(f"Could not rip blue-ray title {title} from {device}")
+            self._logger.error(f"makemkvcon output:\n{stdout}\n{stderr}")
+            raise ValueError(f"Could not rip blue-ray title {title}")
+
+        self._logger.info(f"Successfully ripped title with id {title} from {device}")
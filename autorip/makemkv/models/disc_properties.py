@@ -21,8 +21,10 @@ class Title(TypedDict, total=False):
     disk_size: str
     disk_size_bytes: str
     output_file_name: str
+    source_file_name: str
+    chapter_count: int
     segments_count: int
-    segments_map: int
+    segments_map: str | int
     streams: dict[int, Stream]
 
 
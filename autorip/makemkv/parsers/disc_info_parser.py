@@ -0,0 +1,133 @@
+import csv
+import threading
+
+from makemkv.constants.makemkv_attributes import MAKEMKV_ATTRIBUTE_ENUMS
+from makemkv.models.disc_properties import Disc, Stream, Title
+
+# Attribute ids as they appear in the output, so unknown attributes can be skipped with a
+# single dictionary lookup and without converting the column to an int first
+_ATTRIBUTES = {str(key): name for key, name in MAKEMKV_ATTRIBUTE_ENUMS.items()}
+
+
+class DiscInfoParser:
+    """
+    An incremental parser for the robot output (-r) of `makemkvcon info`. Every line is parsed
+    as soon as it is fed, so the disc, title and stream properties are built while the scan is
+    still running and partial results can be inspected at any time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._disc: Disc = {}
+        self._titles: dict[int, Title] = {}
+        self._finished = False
+
+    @property
+    def disc(self):
+        """
+        Returns the disc properties parsed so far.
+        """
+        return self._disc
+
+    @property
+    def titles(self):
+        """
+        Returns the title properties parsed so far.
+        """
+        return self._titles
+
+    @property
+    def finished(self):
+        """
+        Returns whether the whole output was consumed.
+        """
+        return self._finished
+
+    def feed(self, line: str):
+        """
+        Parses a single line of makemkvcon output. Lines that don't contain disc, title or
+        stream information are ignored.
+
+        Args:
+            - line (str): The output line, with or without trailing newline.
+        """
+
+        # Only the first characters need to be checked to skip the majority of the lines
+        # (messages, progress, drive info) without splitting them
+        if line.startswith("CINFO:"):
+            fields = line[6:].split(",", 2)
+            if len(fields) == 3 and (attr := _ATTRIBUTES.get(fields[0])):
+                with self._lock:
+                    self._disc[attr] = self._value(fields[2])
+
+        elif line.startswith("TINFO:"):
+            fields = line[6:].split(",", 3)
+            if len(fields) == 4 and (attr := _ATTRIBUTES.get(fields[1])):
+                with self._lock:
+                    title = self._titles.setdefault(int(fields[0]), {})
+                    title[attr] = self._value(fields[3])
+
+        elif line.startswith("SINFO:"):
+            fields = line[6:].split(",", 4)
+            if len(fields) == 5 and (attr := _ATTRIBUTES.get(fields[2])):
+                with self._lock:
+                    title = self._titles.setdefault(int(fields[0]), {})
+                    streams = title.setdefault("streams", {})
+                    stream = streams.setdefault(int(fields[1]), {})
+                    stream[attr] = self._value(fields[4])
+
+    def load(self, disc: Disc, titles: dict[int, Title]):
+        """
+        Replaces the parsed properties with already known ones, e.g. from a cache, and marks
+        the parser as finished.
+        """
+
+        with self._lock:
+            self._disc = disc
+            self._titles = titles
+
+        return self.finish()
+
+    def finish(self):
+        """
+        Marks the parser as finished and returns the parsed disc and title properties.
+        """
+
+        self._finished = True
+        return (self._disc, self._titles)
+
+    def snapshot(self) -> tuple[Disc, dict[int, Title]]:
+        """
+        Returns a copy of the properties parsed so far, which is safe to use while the parser
+        is still being fed from another thread.
+        """
+
+        with self._lock:
+            disc = Disc(**self._disc)
+            titles: dict[int, Title] = {}
+
+            for index, title in self._titles.items():
+                titles[index] = Title(**title)
+                if "streams" in title:
+                    titles[index]["streams"] = {
+                        i: Stream(**stream) for i, stream in title["streams"].items()
+                    }
+
+        return (disc, titles)
+
+    @staticmethod
+    def _value(raw: str) -> int | str:
+        """
+        Unquotes a value column and converts it to an int if it only contains digits.
+        """
+
+        raw = raw.rstrip("\r\n")
+
+        if len(raw) >= 2 and raw[0] == '"' and raw[-1] == '"' and '"' not in raw[1:-1]:
+            value = raw[1:-1]
+        elif '"' in raw:
+            value = next(csv.reader([raw]))[0]
+        else:
+            value = raw
+
+        return int(value) if value.isdigit() else value
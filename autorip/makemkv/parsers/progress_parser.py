@@ -0,0 +1,17 @@
+def parse_prgv(line: str) -> float | None:
+    """
+    Parses the total progress of a makemkvcon progress line (PRGV:current,total,max).
+
+    Args:
+        - line (str): The output line of makemkvcon.
+
+    Returns:
+        float | None: The total progress as fraction between 0 and 1 or None if the line is
+        not a progress line.
+    """
+
+    if not line.startswith("PRGV"):
+        return None
+
+    [_, curr, total] = [float(x) for x in line.split(":", 1)[1].strip().split(",")]
+    return curr / total if total else None
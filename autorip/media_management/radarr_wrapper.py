@@ -1,8 +1,15 @@
+import time
 from typing import Any, Literal
 
 import requests
+from core.cache.ttl_cache import TTLCache
 from core.config import Config
 from core.logger import Logger
+from core.metrics.metrics import HTTP_REQUEST_DURATION
+from core.tracing.tracer import span
+
+# Radarr command states after which a command won't change anymore
+COMMAND_FAILED_STATES = ["failed", "aborted", "cancelled", "orphaned"]
 
 
 class RadarrWrapper:
@@ -10,36 +17,68 @@ class RadarrWrapper:
         self.config = config
         self.logger = logger
 
+        self._session = requests.Session()
+        self._session.verify = False
+        self._session.headers.update(
+            {
+                "accept": "application/json",
+                "X-Api-Key": self.config.get["media"]["radarr_token"],
+            }
+        )
+
+        # Quality profiles and root folders are static configuration of the Radarr instance
+        self._lookups = TTLCache(ttl=15 * 60)
+        self._movie_ids: dict[int, int] = {}
+
     def create_movie(self, tmdb_id: int):
         movie = self.tmdb_lookup(tmdb_id)
         movie["qualityProfileId"] = self.get_quality_profile_id()
         movie["rootFolderPath"] = self.get_root_folder()
         movie["monitored"] = True
         response = self._radarr_request("movie", "post", movie)
+
+        # Radarr rejects movies added before, e.g. by an upload interrupted by a restart
+        if isinstance(response, list):
+            existing = self._radarr_request(f"movie?tmdbId={tmdb_id}", "get")
+            if not existing:
+                raise RuntimeError(f"Radarr rejected movie {tmdb_id}: {response}")
+            response = existing[0]
+
+        self._movie_ids[tmdb_id] = response["id"]
         return self.config.get["media"]["media_dir"] + str(response["folderName"])
 
     def tmdb_lookup(self, tmdb_id: int):
         return self._radarr_request(f"movie/lookup/tmdb?tmdbId={tmdb_id}", "get")
 
     def get_movie(self, tmdb_id: int):
-        return self._radarr_request(f"movie?tmdbId={tmdb_id}", "get")[0]
+        movie = self._radarr_request(f"movie?tmdbId={tmdb_id}", "get")[0]
+        self._movie_ids[tmdb_id] = movie["id"]
+        return movie
+
+    def get_movie_id(self, tmdb_id: int) -> int:
+        if tmdb_id not in self._movie_ids:
+            self.get_movie(tmdb_id)
+        return self._movie_ids[tmdb_id]
 
     def get_root_folder(self):
-        return str(self._radarr_request("rootfolder", "get")[0]["path"])
+        return str(
+            self._lookups.get_or_load(
+                "rootfolder", lambda: self._radarr_request("rootfolder", "get")
+            )[0]["path"]
+        )
 
     def scan_movie(self, tmdb_id: int):
-        movie = self.get_movie(tmdb_id)
-
-        self._radarr_request(
+        command = self._radarr_request(
             "command",
             "post",
-            {"name": "RescanMovie", "movieId": movie["id"]},
+            {"name": "RescanMovie", "movieId": self.get_movie_id(tmdb_id)},
         )
+        self.wait_for_command(command["id"])
 
     def rename_movie(self, tmdb_id: int):
         movie = self.get_movie(tmdb_id)
 
-        self._radarr_request(
+        command = self._radarr_request(
             "command",
             "post",
             {
@@ -48,10 +87,13 @@ class RadarrWrapper:
                 "files": [movie["movieFile"]["id"]],
             },
         )
+        self.wait_for_command(command["id"])
 
     def get_quality_profile_id(self):
         wanted = self.config.get["media"]["radarr_quality_profile"]
-        quality_profiles = self._radarr_request("qualityprofile", "get")
+        quality_profiles = self._lookups.get_or_load(
+            "qualityprofile", lambda: self._radarr_request("qualityprofile", "get")
+        )
 
         for profile in quality_profiles:
             if profile.get("name") == wanted:
@@ -59,26 +101,62 @@ class RadarrWrapper:
 
         raise RuntimeError(f"Could not find quality profile {wanted}")
 
+    @span()
+    def wait_for_command(
+        self,
+        command_id: int,
+        timeout: float = 600,
+        initial_delay: float = 0.25,
+        max_delay: float = 5,
+    ):
+        """
+        Polls the status of a Radarr command with exponential backoff until it completed.
+
+        Args:
+            - command_id (int): The id of the command to wait for.
+            - timeout (float): The maximum time in seconds to wait.
+            - initial_delay (float): The delay before the first poll in seconds.
+            - max_delay (float): The maximum delay between two polls in seconds.
+
+        Raises:
+            RuntimeError: If the command failed or didn't complete in time.
+        """
+
+        deadline = time.monotonic() + timeout
+        delay = initial_delay
+
+        while True:
+            with span("sleep", seconds=delay):
+                time.sleep(delay)
+            status = self._radarr_request(f"command/{command_id}", "get")["status"]
+
+            if status == "completed":
+                return
+
+            if status in COMMAND_FAILED_STATES:
+                raise RuntimeError(f"Radarr command {command_id} {status}")
+
+            if time.monotonic() + delay > deadline:
+                raise RuntimeError(f"Radarr command {command_id} timed out ({status})")
+
+            delay = min(delay * 2, max_delay)
+
     def _radarr_request(
         self, url: str, method: Literal["get", "post"], json: Any = None
     ) -> Any:
-        headers = {
-            "accept": "application/json",
-            "X-Api-Key": self.config.get["media"]["radarr_token"],
-        }
         url = f"{self.config.get['media']['radarr_url']}/api/v3/{url}"
 
-        self.logger.debug(f"Making Radarr API request to {url}, {headers}")
-
-        body = (
-            requests.get(
-                url, timeout=10, headers=headers, json=json, verify=False
-            ).json()
-            if method == "get"
-            else requests.post(
-                url, timeout=10, headers=headers, json=json, verify=False
-            ).json()
-        )
+        self.logger.debug(f"Making Radarr API request to {url}")
+
+        with (
+            span(f"radarr {method}", url=url),
+            HTTP_REQUEST_DURATION.time(service="radarr", method=method),
+        ):
+            body = (
+                self._session.get(url, timeout=10, json=json).json()
+                if method == "get"
+                else self._session.post(url, timeout=10, json=json).json()
+            )
 
         self.logger.debug(f"Got Radarr response: {body}")
         return body
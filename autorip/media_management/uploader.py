@@ -1,10 +1,19 @@
+import hashlib
 import os
 import time
 from typing import Callable, Optional
 
 from core.config import Config
 from core.logger import Logger
-from core.utils.file_utils import copy_with_callback
+from core.metrics.metrics import COPIED_BYTES
+from core.tracing.tracer import span
+from core.utils.file_utils import (
+    Hasher,
+    IntegrityError,
+    copy_with_callback,
+    hash_file,
+)
+from metadata.models.metadata import MovieMetadata, TvMetadata
 from typing_extensions import Literal
 
 from media_management.radarr_wrapper import RadarrWrapper
@@ -16,34 +25,85 @@ class Uploader:
         self.logger = logger
         self.radarr_wrapper = RadarrWrapper(config, logger)
 
+    @span()
     def upload_file(
         self,
         input_file: str,
         tmdb_id: int,
         media_type: Literal["movie", "tv"],
         callback: Optional[Callable[[float, float], None]] = None,
+        metadata: MovieMetadata | TvMetadata | None = None,
+        resume_from: tuple[str, int] | None = None,
+        checkpoint: Optional[Callable[[str, int], None]] = None,
     ):
-        output_dir = self.create_media(tmdb_id, media_type)
+        """
+        Copies a file into the media library and lets the media manager scan and rename it.
+        The file is hashed while it is copied, optionally the copy is read back from the disk
+        and compared against the digest. Returns the digest as "<algorithm>:<hex>" or None if
+        checksums are disabled.
+
+        Args:
+            - input_file (str): The file to upload.
+            - tmdb_id (int): The TMDB id of the movie or tv show.
+            - media_type (Literal["movie", "tv"]): The type of the media.
+            - callback (Callable[[float, float], None] | None): Receives the progress and ETA.
+            - metadata (MovieMetadata | TvMetadata | None): The metadata, required for tv shows.
+            - resume_from (tuple[str, int] | None): The destination and byte offset of an
+                interrupted copy of the same file, which is continued if it still exists.
+            - checkpoint (Callable[[str, int], None] | None): Receives the destination and the
+                number of bytes copied so far, to resume the copy after a restart.
+        """
+
+        output_dir = self.create_media(tmdb_id, media_type, metadata)
         output_file = os.path.join(output_dir, os.path.basename(input_file))
-        time.sleep(5)
+        os.makedirs(output_dir, exist_ok=True)
+
+        offset = 0
+        if resume_from is not None and resume_from[0] == output_file:
+            offset = resume_from[1]
+            self.logger.info(f"Resuming copy of {input_file} at {offset} bytes")
 
         self.logger.info(f"Moving file {input_file} to {output_file}")
         start_time = time.time()
+        resumed_at: list[int] = []
 
-        def progress_callback(_: int, curr: int, total: int):
+        def progress_callback(copied: int, curr: int, total: int):
+            COPIED_BYTES.inc(copied)
             progress = curr / total
-            estimated_time = ((time.time() - start_time) / progress) * (1 - progress)
+
+            # Only the bytes copied since the start of this run count for the ETA, the copy
+            # may resume before the requested offset if the destination is shorter
+            if not resumed_at:
+                resumed_at.append(curr - copied)
+            done = (curr - resumed_at[0]) / total
+            estimated_time = ((time.time() - start_time) / done) * (1 - progress)
 
             if callback:
                 callback(progress, estimated_time)
+            if checkpoint:
+                checkpoint(output_file, curr)
+
+        media_config = self.config.get["media"]
+        algorithm = media_config.get("checksum", "blake2b")
+        hasher = hashlib.new(algorithm) if algorithm != "none" else None
 
-        copy_with_callback(input_file, output_file, progress_callback)
+        with span("copy", file=input_file):
+            copy_with_callback(
+                input_file, output_file, progress_callback, offset=offset, hasher=hasher
+            )
 
         self.logger.info(f"Finished moving file {input_file} to {output_file}")
 
+        checksum = None
+        if hasher is not None:
+            checksum = f"{algorithm}:{hasher.hexdigest()}"
+            self.logger.info(f"Checksum of {output_file} is {checksum}")
+
+            if media_config.get("verify_copy", False):
+                self.verify_file(output_file, hasher)
+
         self.logger.info(f"Scanning {output_file}")
         self.scan_media(tmdb_id, media_type)
-        time.sleep(10)
 
         self.logger.info(f"Removing {input_file}")
         # os.remove(input_file)
@@ -51,20 +111,56 @@ class Uploader:
         self.logger.info(f"Renaming {output_file}")
         self.rename_media(tmdb_id, media_type)
 
-    def create_media(self, tmdb_id: int, media_type: Literal["movie", "tv"]):
+        return checksum
+
+    @span()
+    def verify_file(self, output_file: str, hasher: Hasher):
+        """
+        Reads a copied file back from the disk and compares its digest against the digest
+        computed while copying. A mismatching file is removed, so a retry copies it again
+        instead of resuming after the corrupted bytes.
+
+        Raises:
+            IntegrityError: If the digests don't match.
+        """
+
+        self.logger.info(f"Verifying {output_file}")
+        digest = hash_file(output_file, hashlib.new(hasher.name), drop_cache=True)
+
+        if digest.digest() != hasher.digest():
+            os.remove(output_file)
+            raise IntegrityError(
+                f"Checksum of {output_file} is {digest.hexdigest()}, "
+                f"expected {hasher.hexdigest()}"
+            )
+
+    @span()
+    def create_media(
+        self,
+        tmdb_id: int,
+        media_type: Literal["movie", "tv"],
+        metadata: MovieMetadata | TvMetadata | None = None,
+    ):
         if media_type == "movie":
             return self.radarr_wrapper.create_movie(tmdb_id)
 
-        raise NotImplementedError()
+        tv_dir = self.config.get["media"].get("tv_dir")
+
+        if tv_dir is None or metadata is None or "name" not in metadata:
+            raise ValueError("Uploading tv shows requires media.tv_dir and tv metadata")
 
+        return os.path.join(
+            tv_dir, f"{metadata['name']} ({metadata['first_air_date']})"
+        )
+
+    # TV shows are not managed by an arr service, media servers pick them up from the tv_dir
+
+    @span()
     def scan_media(self, tmdb_id: int, media_type: Literal["movie", "tv"]):
         if media_type == "movie":
             return self.radarr_wrapper.scan_movie(tmdb_id)
 
-        raise NotImplementedError()
-
+    @span()
     def rename_media(self, tmdb_id: int, media_type: Literal["movie", "tv"]):
         if media_type == "movie":
             return self.radarr_wrapper.rename_movie(tmdb_id)
-
-        raise NotImplementedError()
@@ -1,15 +1,22 @@
+import hashlib
 from typing import Any
 
 import requests
+from core.cache.disk_cache import DiskCache
 from core.config import Config
 from core.logger import Logger
+from core.metrics.metrics import HTTP_REQUEST_DURATION
+from core.tracing.tracer import span
+from requests.adapters import HTTPAdapter
 
 from metadata.models.metadata import MovieMetadata, TvMetadata
 
 
 class MetadataWrapper:
     """
-    A wrapper class for interacting with the TMDb API.
+    A wrapper class for interacting with the TMDb API. Requests share a pooled session and
+    successful responses are cached on disk, so repeated lookups of the same id don't cause
+    any network round trips.
 
     Args:
         - config (Config): The configuration object.
@@ -22,6 +29,37 @@ class MetadataWrapper:
         self._config = config
         self._logger = logger
 
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(pool_maxsize=4, max_retries=2))
+        self._session.headers.update(
+            {
+                "accept": "application/json",
+                "Authorization": f"Bearer {self._config.get['metadata']['imdb_token']}",
+            }
+        )
+
+        metadata_config = self._config.get["metadata"]
+        self._base_url = metadata_config.get("tmdb_url", self.BASE_URL).rstrip("/")
+
+        cache_size = metadata_config.get("cache_size_mb", 20)
+        self._cache = (
+            DiskCache(
+                f"{self._config.get['output']['logging_dir']}/cache/tmdb",
+                cache_size * 1024 * 1024,
+                metadata_config.get("cache_ttl_hours", 24 * 30) * 3600,
+            )
+            if cache_size > 0
+            else None
+        )
+
+    @property
+    def cache_stats(self):
+        """
+        Returns the number of hits and misses of the response cache.
+        """
+        return self._cache.stats if self._cache else {"hits": 0, "misses": 0}
+
+    @span()
     def get_movie_details(self, movie_id: int) -> MovieMetadata:
         """
         Get details for a movie by its ID.
@@ -33,7 +71,7 @@ class MetadataWrapper:
             A dictionary containing the movie's ID, IMDb ID, year, runtime, and title.
         """
 
-        result = self._tmdb_request(f"{self.BASE_URL}/movie/{movie_id}?language=en-US")
+        result = self._tmdb_request(f"{self._base_url}/movie/{movie_id}?language=en-US")
         movie: MovieMetadata = {
             "id": result["id"],
             "imdb_id": result["imdb_id"],
@@ -44,6 +82,7 @@ class MetadataWrapper:
         self._logger.info(f"Got movie details: {movie}")
         return movie
 
+    @span()
     def get_tv_details(self, tv_id: int) -> TvMetadata:
         """
         Get details for a TV show by its ID.
@@ -56,7 +95,7 @@ class MetadataWrapper:
             last air date, number of episodes, and number of seasons.
         """
 
-        result = self._tmdb_request(f"{self.BASE_URL}/tv/{tv_id}?language=en-US")
+        result = self._tmdb_request(f"{self._base_url}/tv/{tv_id}?language=en-US")
         tv: TvMetadata = {
             "id": result["id"],
             "name": result["name"],
@@ -71,7 +110,7 @@ class MetadataWrapper:
 
     def _tmdb_request(self, url: str) -> Any:
         """
-        Send a request to TMDb API.
+        Send a request to TMDb API or return the cached response of a previous request.
 
         Args:
             - url (str): The URL to send the request to.
@@ -80,11 +119,24 @@ class MetadataWrapper:
             The JSON response from the API as string.
         """
 
-        headers = {
-            "accept": "application/json",
-            "Authorization": f"Bearer {self._config.get['metadata']['imdb_token']}",
-        }
-        self._logger.debug(f"Making TMDb request to {url}, {headers}")
-        body = requests.get(url, timeout=10, headers=headers).json()
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+        if self._cache and (body := self._cache.get(key)) is not None:
+            self._logger.debug(
+                f"Got cached TMDb response for {url} ({self.cache_stats})"
+            )
+            return body
+
+        self._logger.debug(f"Making TMDb request to {url} ({self.cache_stats})")
+        with (
+            span("tmdb get", url=url),
+            HTTP_REQUEST_DURATION.time(service="tmdb", method="get"),
+        ):
+            response = self._session.get(url, timeout=10)
+        body = response.json()
         self._logger.debug(f"Got TMDb response: {body}")
+
+        if self._cache and response.ok:
+            self._cache.set(key, body)
+
         return body
@@ -0,0 +1,375 @@
+import asyncio
+import errno
+import os
+import threading
+from asyncio.subprocess import PIPE, Process
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Optional, Type
+
+from core.logger import Logger
+from core.utils.typing_utils import aware
+
+from process.output_capture import OutputCapture, RingBufferCapture
+from process.resource_pool import FairSemaphore
+from process.transcripts import ReplayedProcess, TranscriptWriter, open_transcript
+
+if TYPE_CHECKING:
+    from process.process_manager import ProcessManager
+
+# Number of bytes read from a pipe at once, lines are split from these chunks afterwards which is
+# considerably cheaper than awaiting every single line
+CHUNK_SIZE = 64 * 1024
+
+# Seconds between two checks of the cancel event of a call
+CANCEL_POLL_INTERVAL = 0.2
+
+
+class ProcessCancelledException(Exception):
+    pass
+
+
+async def read_lines(stream: asyncio.StreamReader) -> AsyncIterator[str]:
+    """
+    Yields the decoded and stripped lines of a stream until it is closed.
+    """
+
+    pending = b""
+
+    while chunk := await stream.read(CHUNK_SIZE):
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+
+        for line in lines:
+            yield line.decode("utf-8", errors="replace").strip()
+
+    if pending:
+        yield pending.decode("utf-8", errors="replace").strip()
+
+
+class AsyncOpenProcess:
+    """
+    An async context manager that wraps a child process spawned by the AsyncProcessManager.
+    Iterating over it yields the lines of the output stream while the error stream is drained
+    concurrently. The child process is terminated if the context is left with an exception and
+    its resources are released in any case.
+    """
+
+    def __init__(
+        self,
+        manager: "AsyncProcessManager",
+        args: list[str],
+        stdout: OutputCapture,
+        stderr: OutputCapture,
+        killtimeout: float = 1.0,
+    ):
+        self._manager = manager
+        self._args = args
+        self._stdout = stdout
+        self._stderr = stderr
+        self._timeout = killtimeout
+        self._process: Process | None = None
+        self._stderr_reader: asyncio.Task[None] | None = None
+        self._transcript: TranscriptWriter | None = None
+
+    async def __aenter__(self):
+        """
+        Spawns the child process and starts draining its error stream. The transcript is opened
+        first, a failure to create it must not leave a child behind that nobody releases. If
+        the spawn fails, e.g. because the executable wasn't found, `__aexit__` isn't called, so
+        the captures and the transcript are closed here.
+        """
+
+        try:
+            self._transcript = open_transcript(self._args)
+            self._process = await self._manager.spawn(self._args)
+        except BaseException:
+            self._stdout.close()
+            self._stderr.close()
+
+            if self._transcript is not None:
+                self._transcript.close(None)
+            raise
+
+        self._stderr_reader = asyncio.create_task(
+            self._drain(aware(self._process.stderr))
+        )
+        return self
+
+    async def __aexit__(self, errtype: Type[BaseException] | None, _: Any, __: Any):
+        """
+        Waits for the child process to finish or terminates it if an exception occurred.
+        """
+
+        process = aware(self._process)
+
+        try:
+            if errtype is None:
+                # Drain the rest of the output in case the caller stopped reading early
+                async for _ in self:
+                    pass
+
+                await aware(self._stderr_reader)
+                await process.wait()
+            else:
+                await self._terminate(process)
+
+        finally:
+            if self._stderr_reader and not self._stderr_reader.done():
+                self._stderr_reader.cancel()
+
+            self._manager.release(process.pid)
+            self._stdout.close()
+            self._stderr.close()
+
+            if self._transcript is not None:
+                self._transcript.close(process.returncode)
+
+    async def __aiter__(self):
+        """
+        Yields the lines of the output stream until the child closes it.
+        """
+
+        async for line in read_lines(aware(aware(self._process).stdout)):
+            self._stdout.write(line)
+
+            if self._transcript is not None:
+                self._transcript.write("stdout", line)
+
+            yield line
+
+    @property
+    def pid(self):
+        """
+        Returns the process id of the child process.
+        """
+        return aware(self._process).pid
+
+    @property
+    def returncode(self):
+        """
+        Returns the return code of the child process or None if it is still running.
+        """
+        return aware(self._process).returncode
+
+    @property
+    def stdout(self):
+        """
+        Returns the captured output stream.
+        """
+        return self._stdout.getvalue()
+
+    @property
+    def stderr(self):
+        """
+        Returns the captured error stream.
+        """
+        return self._stderr.getvalue()
+
+    async def _terminate(self, process: Process):
+        """
+        Terminates the child process and kills it if it doesn't exit within the kill timeout.
+        """
+
+        if process.returncode is not None:
+            return
+
+        try:
+            process.terminate()
+            await asyncio.wait_for(process.wait(), self._timeout)
+        except ProcessLookupError:
+            return
+        except asyncio.TimeoutError:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                return
+            await process.wait()
+
+    async def _drain(self, stream: asyncio.StreamReader):
+        """
+        Reads the error stream of the child process line by line until it is closed.
+        """
+
+        async for line in read_lines(stream):
+            self._stderr.write(line)
+
+            if self._transcript is not None:
+                self._transcript.write("stderr", line)
+
+
+class AsyncProcessManager:
+    """
+    The asyncio backend of the ProcessManager. Child processes are supervised by the event loop
+    instead of a thread per process, so one loop can run several rips and encodes at once.
+    Spawned processes are tracked by and respect the start lock of the owning ProcessManager.
+
+    Args:
+        - manager (ProcessManager): The process manager tracking the spawned processes.
+        - logger (Logger): A logger instance to log messages.
+    """
+
+    def __init__(self, manager: "ProcessManager", logger: Logger):
+        self._manager = manager
+        self._logger = logger
+
+    def open(
+        self,
+        args: list[str],
+        stdout: Optional[OutputCapture] = None,
+        stderr: Optional[OutputCapture] = None,
+    ):
+        """
+        Creates an async context manager that spawns the given command when entered.
+
+        Args:
+            - args (list[str]): The command and its arguments to execute.
+            - stdout (Optional[OutputCapture]): The capture policy of the output stream.
+            - stderr (Optional[OutputCapture]): The capture policy of the error stream.
+
+        Returns:
+            AsyncOpenProcess | ReplayedProcess: The process, which can be iterated for its
+            output lines. In replay mode, the next recorded transcript of the command.
+        """
+
+        stdout = stdout or RingBufferCapture()
+        stderr = stderr or RingBufferCapture()
+
+        if (replay := self._manager.replay) is not None:
+            self._logger.info(f"Replaying {' '.join(args)}")
+            return ReplayedProcess(replay.next(args), replay.speed, stdout, stderr)
+
+        return AsyncOpenProcess(self, args, stdout, stderr)
+
+    async def call(
+        self,
+        args: list[str],
+        cb: Optional[Callable[[str], None]] = None,
+        stdout: Optional[OutputCapture] = None,
+        stderr: Optional[OutputCapture] = None,
+        cancel: threading.Event | None = None,
+    ):
+        """
+        Executes a command with the given arguments and returns the output and error streams.
+
+        Args:
+            - args (list[str]): The command and its arguments to execute.
+            - cb (Optional[Callable[[str], None]]): An optional callback function to
+            receive the output stream line by line.
+            - stdout (Optional[OutputCapture]): The capture policy of the output stream.
+            - stderr (Optional[OutputCapture]): The capture policy of the error stream.
+            - cancel (threading.Event | None): Terminates the child process once set, e.g. from
+            another thread. A call still waiting for its pool slot gives up waiting.
+
+        Raises:
+            ProcessCancelledException: If the call was cancelled.
+
+        Returns:
+            Tuple[int, str, str]: A tuple containing the return code, the captured output
+            stream and the captured error stream.
+        """
+
+        if cancel is None:
+            return await self._call(args, cb, stdout, stderr)
+
+        if cancel.is_set():
+            for capture in (stdout, stderr):
+                if capture is not None:
+                    capture.close()
+
+            raise ProcessCancelledException(
+                f"{args[0]} was cancelled before it started"
+            )
+
+        task = asyncio.ensure_future(self._call(args, cb, stdout, stderr))
+
+        while not task.done():
+            await asyncio.wait({task}, timeout=CANCEL_POLL_INTERVAL)
+
+            if cancel.is_set() and not task.done():
+                # Leaving the process context with an exception terminates the child
+                task.cancel()
+
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    raise ProcessCancelledException(f"{args[0]} was cancelled")
+
+        return task.result()
+
+    async def _call(
+        self,
+        args: list[str],
+        cb: Optional[Callable[[str], None]] = None,
+        stdout: Optional[OutputCapture] = None,
+        stderr: Optional[OutputCapture] = None,
+    ):
+        async with self.open(args, stdout, stderr) as process:
+            async for line in process:
+                if cb:
+                    cb(line)
+
+        return (aware(process.returncode), process.stdout, process.stderr)
+
+    async def spawn(self, args: list[str]):
+        """
+        Spawns a new process with piped output and error streams and tracks its process id.
+
+        Args:
+            - args (list[str]): The command-line arguments to pass to the process.
+
+        Returns:
+            Process: The spawned asyncio process.
+        """
+
+        self._manager.check_process_start()
+
+        pool = self._manager.find_pool(args)
+        semaphore = pool.semaphore(args) if pool else None
+        slot = await self._acquire(semaphore) if semaphore is not None else None
+
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *(pool.wrap(args, slot) if pool else args), stdout=PIPE, stderr=PIPE
+            )
+        except BaseException as err:
+            if semaphore is not None:
+                semaphore.release(aware(slot))
+            if isinstance(err, OSError) and err.errno == errno.ENOENT:
+                self._logger.error(f"{args[0]} could not be found. Is it installed?")
+            raise
+
+        self._manager.add_process(
+            process.pid, semaphore, os.path.basename(args[0]), slot
+        )
+        self._logger.info(f"Executing {' '.join(args)}")
+
+        return process
+
+    async def _acquire(self, semaphore: FairSemaphore):
+        """
+        Waits for a pool slot without blocking the event loop and returns its number. If the
+        waiting task is cancelled, the waiting executor thread gives up its place, so shutting
+        down the executor doesn't wait for a slot. A slot handed out in the meantime is
+        released again.
+        """
+
+        cancel = threading.Event()
+        future = asyncio.get_running_loop().run_in_executor(
+            None, semaphore.acquire, cancel
+        )
+
+        def release(acquired: "asyncio.Future[int | None]"):
+            if (slot := acquired.result()) is not None:
+                semaphore.release(slot)
+
+        try:
+            return aware(await asyncio.shield(future))
+        except asyncio.CancelledError:
+            semaphore.abandon(cancel)
+            future.add_done_callback(release)
+            raise
+
+    def release(self, pid: int):
+        """
+        Removes the given process ID from the tracked processes.
+        """
+        self._manager.release_process(pid)
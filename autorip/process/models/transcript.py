@@ -0,0 +1,13 @@
+from typing import Literal, NotRequired, TypedDict
+
+
+class TranscriptHeader(TypedDict):
+    args: list[str]
+    started_at: float
+
+
+class TranscriptRecord(TypedDict):
+    time: float
+    stream: NotRequired[Literal["stdout", "stderr"]]
+    line: NotRequired[str]
+    returncode: NotRequired[int]
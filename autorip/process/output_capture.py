@@ -0,0 +1,78 @@
+from collections import deque
+from typing import TextIO
+
+DEFAULT_CAPTURE_LINES = 1000
+
+
+class OutputCapture:
+    """
+    Base class of the capture policies for the output streams of a child process. The base
+    policy discards every line.
+    """
+
+    def write(self, line: str):
+        """
+        Captures a single line of output (without trailing newline).
+        """
+
+    def getvalue(self) -> str:
+        """
+        Returns the captured output.
+        """
+        return ""
+
+    def close(self):
+        """
+        Releases the resources of the capture once the stream was drained completely.
+        """
+
+
+class DiscardCapture(OutputCapture):
+    """
+    Discards the whole output, for streams that are only consumed through the line callback.
+    """
+
+
+class RingBufferCapture(OutputCapture):
+    """
+    Keeps only the last `lines` lines of the output in memory.
+
+    Args:
+        - lines (int): The maximum number of lines to keep.
+    """
+
+    def __init__(self, lines: int = DEFAULT_CAPTURE_LINES):
+        self._lines: deque[str] = deque(maxlen=lines)
+
+    def write(self, line: str):
+        self._lines.append(line)
+
+    def getvalue(self):
+        return "\n".join(self._lines)
+
+
+class FileCapture(OutputCapture):
+    """
+    Spools the whole output to a file and keeps only the last `tail` lines in memory, so
+    error messages can still be logged.
+
+    Args:
+        - path (str): The file the output is written to. Existing files are overwritten.
+        - tail (int): The number of trailing lines returned by `getvalue`.
+    """
+
+    def __init__(self, path: str, tail: int = 100):
+        self.path = path
+        self._file: TextIO = open(path, "w", encoding="utf-8")
+        self._tail = RingBufferCapture(tail)
+
+    def write(self, line: str):
+        self._file.write(line)
+        self._file.write("\n")
+        self._tail.write(line)
+
+    def getvalue(self):
+        return self._tail.getvalue()
+
+    def close(self):
+        self._file.close()
@@ -1,13 +1,21 @@
-import errno
+import asyncio
+import contextvars
+import os
 import sys
+import threading
 from _thread import allocate_lock
-from subprocess import PIPE, Popen
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from typing import Callable, Optional
 
+from core.config import PoolConfig, ReplayConfig
 from core.logger import Logger
-from core.utils.typing_utils import aware
+from core.tracing.tracer import span
 
-from process.open_process_wrapper import OpenProcessWrapper
+from process.async_process_manager import AsyncProcessManager
+from process.output_capture import OutputCapture
+from process.resource_pool import FairSemaphore, ResourcePool
+from process.transcripts import TranscriptReplay
 
 
 class SpawnLockedException(Exception):
@@ -20,61 +28,116 @@ class ProcessManager:
 
     Args:
         logger (Logger): A logger instance to log messages.
+        pools (dict[str, PoolConfig] | None): The resource pools limiting and prioritizing
+            the spawned processes, by pool name.
+        replay (ReplayConfig | None): Replays recorded transcripts instead of spawning
+            processes, e.g. to reproduce an issue offline.
     """
 
-    def __init__(self, logger: Logger) -> None:
+    def __init__(
+        self,
+        logger: Logger,
+        pools: dict[str, PoolConfig] | None = None,
+        replay: ReplayConfig | None = None,
+    ) -> None:
         self._logger = logger
         self._threadlock = allocate_lock()
         self._pids: set[int] = set()
+        self._slots: dict[int, tuple[FairSemaphore, int]] = {}
+        self._names: dict[int, str] = {}
         self._startlock = False
 
-    def call(self, args: list[str], cb: Optional[Callable[[str], None]] = None):
+        self._pools = [ResourcePool(name, pool) for name, pool in (pools or {}).items()]
+        self.replay = TranscriptReplay(replay) if replay is not None else None
+
+        self.async_manager = AsyncProcessManager(self, logger)
+
+    def call(
+        self,
+        args: list[str],
+        cb: Optional[Callable[[str], None]] = None,
+        stdout: Optional[OutputCapture] = None,
+        stderr: Optional[OutputCapture] = None,
+        cancel: Optional[threading.Event] = None,
+    ):
         """
         Executes a command with the given arguments and returns the output and error streams.
+        This is the blocking variant of `AsyncProcessManager.call`, which runs the child on an
+        event loop of the calling thread, or of a helper thread if the calling thread already
+        runs a loop. Both streams are drained concurrently, so a child writing a lot to stderr
+        can't block on a full pipe while stdout is being read.
 
         Args:
             - args (list[str]): The command and its arguments to execute.
             - cb (Optional[Callable[[str], None]]): An optional callback function to
             receive the output stream line by line.
+            - stdout (Optional[OutputCapture]): The capture policy of the output stream,
+            defaults to a ring buffer of the last lines.
+            - stderr (Optional[OutputCapture]): The capture policy of the error stream,
+            defaults to a ring buffer of the last lines.
+            - cancel (Optional[threading.Event]): Terminates the child process once set, e.g.
+            by another thread giving up on a group of processes.
+
+        Raises:
+            ProcessCancelledException: If the call was cancelled.
 
         Returns:
-            Tuple[int, str, str]: A tuple containing the return code, the output
-            stream and the error stream.
+            Tuple[int, str, str]: A tuple containing the return code, the captured output
+            stream and the captured error stream.
         """
-        try:
-            with self._open_process(args, stdout=PIPE, stderr=PIPE) as pipe:
-                self._logger.info(f"Executing {' '.join(args)}")
-                sout = ""
 
-                for line in iter(aware(pipe.raw.stdout).readline, b""):
-                    parsed_line = line.decode("utf-8").strip()
-                    sout += parsed_line + "\n"
+        call = self.async_manager.call(args, cb, stdout, stderr, cancel)
+
+        with span(os.path.basename(args[0]), args=" ".join(args)):
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return asyncio.run(call)
 
-                    if cb:
-                        cb(parsed_line)
+            # Called from a coroutine, e.g. an async FastAPI handler, whose loop can't run a
+            # nested one. The call blocks that loop like any other blocking call would
+            with ThreadPoolExecutor(1, thread_name_prefix="process") as executor:
+                context = contextvars.copy_context()
+                return executor.submit(context.run, asyncio.run, call).result()
 
-                remain_sout, serr = pipe.communicate()
-                sout, serr = (
-                    f"{sout}\n{remain_sout.decode('utf-8').strip()}",
-                    serr.decode("utf-8").strip(),
-                )
+    def find_pool(self, args: list[str]):
+        """
+        Returns the resource pool managing the given command or None if it isn't managed.
+        """
+        return next((pool for pool in self._pools if pool.matches(args)), None)
+
+    def process_counts(self):
+        """
+        Returns the number of running child processes by executable name.
+        """
 
-                return (pipe.returncode, sout, serr)
+        with self._threadlock:
+            names = [self._names.get(pid, "") for pid in self._pids]
 
-        except OSError as err:
-            if err.errno == errno.ENOENT:
-                self._logger.error(f"{args[0]} could not be found. Is it installed?")
-            raise
+        return Counter(names)
 
-    def add_process(self, pid: int):
+    def add_process(
+        self,
+        pid: int,
+        semaphore: FairSemaphore | None = None,
+        name: str = "",
+        slot: int | None = None,
+    ):
         """
         Add a process to the set of tracked processes.
 
         Args:
             pid (int): The process ID to add.
+            semaphore (FairSemaphore | None): The semaphore of the pool slot held by the
+                process, which is released together with the process.
+            name (str): The executable of the process.
+            slot (int | None): The number of the pool slot held by the process.
         """
         with self._threadlock:
             self._pids.add(pid)
+            self._names[pid] = name
+            if semaphore is not None and slot is not None:
+                self._slots[pid] = (semaphore, slot)
 
     def release_process(self, pid: int):
         """
@@ -86,6 +149,12 @@ class ProcessManager:
 
         with self._threadlock:
             self._pids.remove(pid)
+            self._names.pop(pid, None)
+            held = self._slots.pop(pid, None)
+
+        if held is not None:
+            (semaphore, slot) = held
+            semaphore.release(slot)
 
     def lock_process_start(self):
         """
@@ -103,24 +172,11 @@ class ProcessManager:
         with self._threadlock:
             self._startlock = False
 
-    def _open_process(self, args: list[str], stdout: int, stderr: int):
+    def check_process_start(self):
         """
-        Spawns a new process with the given arguments and redirects its standard output
-        and error streams to the specified file descriptors.
-
-        Args:
-            - args (list[str]): The command-line arguments to pass to the process.
-            - stdout (int): The file descriptor to use for the process's standard output stream.
-            - stderr (int): The file descriptor to use for the process's standard error stream.
-
-        Returns:
-            An `OpenProcessWrapper` object that wraps the newly spawned process.
+        Raises a SpawnLockedException if spawning new processes is currently locked.
         """
 
         if self._startlock:
             sys.stdout.flush()
             raise SpawnLockedException("process spawning is locked")
-
-        p = Popen(args, stdout=stdout, stderr=stderr)
-        self.add_process(p.pid)
-        return OpenProcessWrapper(p, self)
@@ -0,0 +1,160 @@
+import itertools
+import os
+import threading
+from collections import deque
+
+from core.config import PoolConfig
+
+# Arguments of the tools selecting the device of the child, e.g. "dev:/dev/sr0" of makemkvcon
+DEVICE_PREFIXES = ("dev:", "disc:")
+
+
+class FairSemaphore:
+    """
+    A counting semaphore which hands out its slots strictly in the order they were requested,
+    so a blocked spawn can't be overtaken by later ones. Slots are numbered, so a process can
+    be given resources of its own slot, e.g. a CPU set.
+
+    Args:
+        - value (int): The number of slots.
+    """
+
+    def __init__(self, value: int):
+        self._free = list(range(value))
+        self._waiters: deque[object] = deque()
+        self._condition = threading.Condition()
+
+    @property
+    def waiting(self):
+        """
+        Returns the number of callers currently waiting for a slot.
+        """
+        return len(self._waiters)
+
+    def acquire(self, cancel: threading.Event | None = None):
+        """
+        Blocks until a slot is free and every earlier caller got its slot.
+
+        Args:
+            - cancel (threading.Event | None): Gives up waiting once set with `abandon`.
+
+        Returns:
+            int | None: The number of the acquired slot, the lowest free one, or None if the
+            wait was abandoned.
+        """
+
+        ticket = object()
+
+        with self._condition:
+            self._waiters.append(ticket)
+
+            while self._waiters[0] is not ticket or not self._free:
+                if cancel is not None and cancel.is_set():
+                    # Let the next waiter move up
+                    self._waiters.remove(ticket)
+                    self._condition.notify_all()
+                    return None
+
+                self._condition.wait()
+
+            self._waiters.popleft()
+            slot = min(self._free)
+            self._free.remove(slot)
+
+            # The next waiter may be able to continue as well
+            self._condition.notify_all()
+
+        return slot
+
+    def abandon(self, cancel: threading.Event):
+        """
+        Wakes up the `acquire` waiting with the given event, which then gives up its place.
+        """
+
+        with self._condition:
+            cancel.set()
+            self._condition.notify_all()
+
+    def release(self, slot: int):
+        with self._condition:
+            self._free.append(slot)
+            self._condition.notify_all()
+
+
+class ResourcePool:
+    """
+    Limits how many processes of an executable run at once and with which scheduling
+    priority, CPU affinity and I/O class they are started.
+
+    Args:
+        - name (str): The name of the pool.
+        - config (PoolConfig): The configuration of the pool.
+    """
+
+    def __init__(self, name: str, config: PoolConfig):
+        self.name = name
+        self.executable = config.get("executable", name)
+
+        self._config = config
+        self._lock = threading.Lock()
+        self._semaphores: dict[str, FairSemaphore] = {}
+
+        # Hands out the CPU sets round robin if the pool has no numbered slots
+        self._spawns = itertools.count()
+
+    def matches(self, args: list[str]):
+        """
+        Checks whether the given command is managed by this pool.
+        """
+        return os.path.basename(args[0]) == self.executable
+
+    def semaphore(self, args: list[str]):
+        """
+        Returns the semaphore limiting the given command or None if the pool is unlimited.
+        Pools limited per device have a semaphore per device the command accesses.
+        """
+
+        if "limit" not in self._config:
+            return None
+
+        key = ""
+        if self._config.get("per_device", False):
+            key = next((arg for arg in args if arg.startswith(DEVICE_PREFIXES)), "")
+
+        with self._lock:
+            if key not in self._semaphores:
+                self._semaphores[key] = FairSemaphore(self._config["limit"])
+            return self._semaphores[key]
+
+    def wrap(self, args: list[str], slot: int | None = None):
+        """
+        Prefixes the command with the `ionice`, `nice` and `taskset` calls applying the
+        configured I/O class, niceness and CPU set. Every wrapper execs the next command, so
+        the process id stays the same. With a list of CPU sets, every slot of the pool runs on
+        its own set, so concurrent processes don't compete for the same cores.
+
+        Args:
+            - args (list[str]): The command to wrap.
+            - slot (int | None): The pool slot the process runs in, None if unlimited.
+        """
+
+        prefix: list[str] = []
+
+        if "ionice_class" in self._config:
+            prefix += ["ionice", "-c", self._config["ionice_class"]]
+            if "ionice_level" in self._config:
+                prefix += ["-n", str(self._config["ionice_level"])]
+
+        if "nice" in self._config:
+            prefix += ["nice", "-n", str(self._config["nice"])]
+
+        if "cpu_set" in self._config:
+            cpu_sets = self._config["cpu_set"]
+
+            if isinstance(cpu_sets, list):
+                index = slot if slot is not None else next(self._spawns)
+                cpu_sets = cpu_sets[index % len(cpu_sets)]
+
+            prefix += ["taskset", "-c", cpu_sets]
+
+        return prefix + args
@@ -0,0 +1,273 @@
+import asyncio
+import gzip
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import IO, Any, Iterator, Literal, Type
+
+from core.config import ReplayConfig
+from core.utils.typing_utils import aware
+
+from process.models.transcript import TranscriptHeader, TranscriptRecord
+from process.output_capture import OutputCapture
+
+SUFFIX = ".jsonl.gz"
+
+
+class TranscriptWriter:
+    """
+    Streams the output of a child process into a gzip compressed JSON lines file. The first
+    line is the header with the arguments of the process, every further line an output line
+    with the seconds since the start and its stream, and the last line the return code.
+
+    Args:
+        - path (str): The file the transcript is written to.
+        - args (list[str]): The arguments the process was spawned with.
+    """
+
+    def __init__(self, path: str, args: list[str]):
+        self.path = path
+
+        self._file: IO[str] = gzip.open(path, "wt", encoding="utf-8")
+        self._start = time.monotonic()
+        self._write(TranscriptHeader(args=args, started_at=time.time()))
+
+    def write(self, stream: Literal["stdout", "stderr"], line: str):
+        self._write(
+            TranscriptRecord(
+                time=round(time.monotonic() - self._start, 4), stream=stream, line=line
+            )
+        )
+
+    def close(self, returncode: int | None):
+        if returncode is not None:
+            self._write(
+                TranscriptRecord(
+                    time=round(time.monotonic() - self._start, 4), returncode=returncode
+                )
+            )
+
+        self._file.close()
+
+    def _write(self, record: TranscriptHeader | TranscriptRecord):
+        self._file.write(json.dumps(record))
+        self._file.write("\n")
+
+
+def read_transcript(path: str) -> tuple[TranscriptHeader, Iterator[TranscriptRecord]]:
+    """
+    Opens a transcript and returns its header and an iterator over its records. The file is
+    closed once the records were consumed. Transcripts of processes which were still running
+    when the service stopped end without a return code.
+    """
+
+    f: IO[str] = gzip.open(path, "rt", encoding="utf-8")
+    header: TranscriptHeader = json.loads(f.readline())
+
+    def records():
+        with f:
+            try:
+                for line in f:
+                    yield json.loads(line)
+            except (EOFError, ValueError):
+                return
+
+    return (header, records())
+
+
+class JobTranscripts:
+    """
+    The transcript directory of a single job, numbering the transcripts in spawn order.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+        self._lock = threading.Lock()
+        self._count: int | None = None
+
+    def open(self, args: list[str]):
+        with self._lock:
+            if self._count is None:
+                os.makedirs(self.directory, exist_ok=True)
+                self._count = len(os.listdir(self.directory))
+
+            self._count += 1
+            name = f"{self._count:03}-{os.path.basename(args[0])}{SUFFIX}"
+
+        return TranscriptWriter(os.path.join(self.directory, name), args)
+
+
+# The transcripts of the job the current thread or task works on, None if recording is disabled
+_current: ContextVar[JobTranscripts | None] = ContextVar("transcripts", default=None)
+
+
+def open_transcript(args: list[str]):
+    """
+    Returns the writer of a new transcript for a process spawned with the given arguments or
+    None if the current job doesn't record transcripts.
+    """
+
+    transcripts = _current.get()
+    return transcripts.open(args) if transcripts is not None else None
+
+
+class TranscriptRecorder:
+    """
+    Records the output of every child process spawned while working on a job into a directory
+    per job, e.g. to reproduce an issue by replaying the transcripts later.
+
+    Args:
+        - directory (str): The directory the job directories are created in.
+        - enabled (bool): Whether transcripts are recorded at all.
+    """
+
+    def __init__(self, directory: str, enabled: bool = False):
+        self.directory = directory
+        self.enabled = enabled
+
+    @contextmanager
+    def record(self, job_id: str):
+        """
+        Records the transcripts of the processes spawned in the wrapped block, e.g. a stage
+        of a job.
+        """
+
+        if not self.enabled:
+            yield
+            return
+
+        token = _current.set(JobTranscripts(os.path.join(self.directory, job_id)))
+
+        try:
+            yield
+        finally:
+            _current.reset(token)
+
+
+class TranscriptReplay:
+    """
+    Hands out the recorded transcripts of a directory, e.g. the transcript directory of a job,
+    in place of spawning processes. Every spawned command receives the next unused transcript
+    of the same executable, in recording order, so the arguments may differ from the recorded
+    ones (e.g. temporary paths).
+
+    Args:
+        - config (ReplayConfig): The directory of the transcripts and the replay speed, either
+            "recorded" or "fast" for as fast as possible.
+
+    Raises:
+        ValueError: If the replay speed is unknown.
+    """
+
+    def __init__(self, config: ReplayConfig):
+        speed = config.get("speed", "recorded")
+
+        if speed not in ("recorded", "fast"):
+            raise ValueError(f"Unknown replay speed: {speed}")
+
+        self.directory = config["directory"]
+        self.speed: Literal["recorded", "fast"] = speed
+
+        self._lock = threading.Lock()
+        self._replayed: set[str] = set()
+
+    def next(self, args: list[str]):
+        """
+        Returns the path of the next transcript of the executable of the given command.
+
+        Raises:
+            FileNotFoundError: If all transcripts of the executable were replayed already.
+        """
+
+        suffix = f"-{os.path.basename(args[0])}{SUFFIX}"
+
+        with self._lock:
+            for name in sorted(os.listdir(self.directory)):
+                if name.endswith(suffix) and name not in self._replayed:
+                    self._replayed.add(name)
+                    return os.path.join(self.directory, name)
+
+        raise FileNotFoundError(f"No transcript left to replay {args[0]}")
+
+
+class ReplayedProcess:
+    """
+    Replays a transcript with the interface of `AsyncOpenProcess`. Iterating over it yields the
+    recorded output lines, at the recorded pace or as fast as possible. Only the output is
+    replayed, files written by the recorded process (e.g. rips) are not created.
+
+    Args:
+        - path (str): The transcript to replay.
+        - speed (Literal["recorded", "fast"]): The pace of the replay.
+        - stdout (OutputCapture): The capture policy of the output stream.
+        - stderr (OutputCapture): The capture policy of the error stream.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        speed: Literal["recorded", "fast"],
+        stdout: OutputCapture,
+        stderr: OutputCapture,
+    ):
+        self._path = path
+        self._speed = speed
+        self._stdout = stdout
+        self._stderr = stderr
+
+        self._records: Iterator[TranscriptRecord] | None = None
+        self._returncode: int | None = None
+        self._start = 0.0
+
+    async def __aenter__(self):
+        (_, self._records) = read_transcript(self._path)
+        self._start = time.monotonic()
+        return self
+
+    async def __aexit__(self, errtype: Type[BaseException] | None, _: Any, __: Any):
+        try:
+            if errtype is None:
+                async for _ in self:
+                    pass
+
+                # The recorded process didn't finish, e.g. because the service stopped
+                if self._returncode is None:
+                    self._returncode = -1
+        finally:
+            self._stdout.close()
+            self._stderr.close()
+
+    async def __aiter__(self):
+        for record in aware(self._records):
+            if self._speed == "recorded":
+                delay = record["time"] - (time.monotonic() - self._start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            if "returncode" in record:
+                self._returncode = record["returncode"]
+            elif record.get("stream") == "stderr":
+                self._stderr.write(record.get("line", ""))
+            else:
+                self._stdout.write(record.get("line", ""))
+                yield record.get("line", "")
+
+    @property
+    def pid(self):
+        return 0
+
+    @property
+    def returncode(self):
+        return self._returncode
+
+    @property
+    def stdout(self):
+        return self._stdout.getvalue()
+
+    @property
+    def stderr(self):
+        return self._stderr.getvalue()
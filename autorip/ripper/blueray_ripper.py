@@ -2,15 +2,27 @@ import os
 import subprocess as subp
 from typing import Callable, Literal, Optional
 
+import numpy as np
 from core.config import Config
 from core.logger import Logger
+from core.tracing.tracer import span
 from core.utils.typing_utils import aware
 from makemkv.make_mkv_wrapper import MakeMKVWrapper
-from makemkv.models.disc_properties import Disc, Stream, Title
+from makemkv.models.disc_properties import Disc, Title
 from metadata.metadata_wrapper import MetadataWrapper
 from metadata.models.metadata import MovieMetadata, TvMetadata
 from process.process_manager import ProcessManager
 
+from ripper.main_feature_scorer import METRICS, MainFeatureScorer
+from ripper.models.candidate import Candidate
+from ripper.segment_index import SegmentIndex
+
+# Number of main feature candidates kept for the API, obfuscated discs have hundreds
+MAX_CANDIDATES = 10
+
+# Maximum deviation of an episode title from the episode run time of TMDB, as fraction
+EPISODE_DURATION_TOLERANCE = 0.25
+
 
 class BlueRayRipper:
     """
@@ -34,13 +46,19 @@ class BlueRayRipper:
         self._movie_metadata: MovieMetadata | None = None
         self._tv_metadata: TvMetadata | None = None
 
+        scoring = self._config.get.get("scoring", {})
+        self._scorer = MainFeatureScorer(**scoring)  # type: ignore
+
         self._main_feature: int | None = None
+        self._candidates: list[Candidate] = []
+        self._episodes: list[int] = []
         self._content_type: Literal["movie", "tv"] | None = None
 
     ################################################################################################
     # Actual ripping process                                                                       #
     ################################################################################################
 
+    @span()
     def rip_main_feature(
         self, output_dir: str, cb: Optional[Callable[[float], None]] = None
     ):
@@ -74,6 +92,96 @@ class BlueRayRipper:
 
         return (final_name, os.path.abspath(final_path))
 
+    @span()
+    def rip_episodes(
+        self,
+        output_dir: str,
+        on_episode: Callable[[int, str, str], None],
+        cb: Optional[Callable[[float], None]] = None,
+    ):
+        """
+        Rips the detected episode titles one after another by their title id. Every episode is
+        handed over as soon as its rip finished, while the following episodes are still ripped.
+        Each title is ripped into a directory of its own, so its file is identified without
+        relying on the file names makemkvcon chooses.
+
+        Args:
+            - output_dir (str): The directory the episodes are placed in.
+            - on_episode (Callable[[int, str, str], None]): Receives the number of the episode
+                on the disc (starting at 1), its file name and its path.
+            - cb (Callable[[float], None] | None): Receives the total progress of the rip.
+        """
+
+        if not self._episodes:
+            raise ValueError("No episodes were detected.")
+
+        if self._tv_metadata is None:
+            raise ValueError("No tv metadata was fetched.")
+
+        metadata = self._tv_metadata
+        rip_root = os.path.join(output_dir, ".rip")
+
+        for number, title in enumerate(self._episodes, start=1):
+            rip_dir = os.path.join(rip_root, str(title))
+
+            def rip_callback(progress: float):
+                if cb:
+                    cb((number - 1 + progress) / len(self._episodes))
+
+            self._makemkv_client.rip_blue_ray(title, rip_dir, rip_callback)
+
+            temp_path = self._find_rip(title, rip_dir)
+            if temp_path is None:
+                continue
+
+            final_name = (
+                f"{metadata.get('name')} ({metadata.get('first_air_date')}) - "
+                f"{self._disc.get('name', 'Disc')} - Episode {number:02} - "
+                "[Bluray-1080p].mkv"
+            )
+            final_path = os.path.abspath(os.path.join(output_dir, final_name))
+
+            os.replace(temp_path, final_path)
+            self._remove_if_empty(rip_dir)
+            self._logger.info(f"Ripped episode {number}: {final_name}")
+            on_episode(number, final_name, final_path)
+
+        self._remove_if_empty(rip_root)
+
+        if self._config.get["output"]["eject_disc"]:
+            subp.call(["eject", self._device])
+
+    def _find_rip(self, title: int, rip_dir: str):
+        """
+        Returns the path of the file a rip of a single title produced or None if it can't be
+        identified. Unidentified files are kept in the rip directory for inspection.
+        """
+
+        files = sorted(name for name in os.listdir(rip_dir) if name.endswith(".mkv"))
+        expected = self._titles[title].get("output_file_name")
+
+        if expected in files:
+            name = expected
+        elif len(files) == 1:
+            name = files[0]
+        else:
+            self._logger.warn(
+                f"Could not identify the rip of title {title} in {rip_dir}, found {files}"
+            )
+            return None
+
+        if len(files) > 1:
+            self._logger.warn(
+                f"Rip of title {title} produced unexpected files, keeping them in {rip_dir}"
+            )
+
+        return os.path.join(rip_dir, aware(name))
+
+    @staticmethod
+    def _remove_if_empty(directory: str):
+        if os.path.isdir(directory) and not os.listdir(directory):
+            os.rmdir(directory)
+
     ################################################################################################
     # Metadata-Gathering (MakeMKV, Disc, TMDB)                                                     #
     ################################################################################################
@@ -95,6 +203,26 @@ class BlueRayRipper:
 
         return aware(self._movie_metadata or self._tv_metadata)
 
+    @property
+    def disc_scan(self):
+        """
+        Returns the properties found by the current or last disc scan. While makemkvcon is
+        still scanning the disc, this contains the titles seen so far.
+
+        Returns:
+            dict | None: Whether the scan finished, the disc and the title properties or None
+            if no disc was scanned yet.
+        """
+
+        scan = self._makemkv_client.disc_scan
+
+        if scan is None:
+            return None
+
+        (disc, titles) = scan.snapshot()
+        return {"finished": scan.finished, "disc": disc, "titles": titles}
+
+    @span()
     def read_disc_properties(self):
         """
         Reads the properties of the disc and returns a tuple containing the disc and
@@ -114,11 +242,16 @@ class BlueRayRipper:
         self._titles = titles
 
         self._main_feature = None
+        self._candidates = []
+        self._episodes = []
 
+        # Filter first, so the representative of a segment group has the wanted audio
         self._filter_streams()
+        self._deduplicate_titles()
 
         return self
 
+    @span()
     def fetch_metadata(self, tmdb_id: int, content_type: Literal["movie", "tv"]):
         """
         Fetches movie or TV show metadata from TMDB using the local title and year.
@@ -127,6 +260,10 @@ class BlueRayRipper:
             tmdb_id: The TMDB ID of the movie or tv show associated with the disc.
         """
 
+        # The ripper is reused across jobs, don't keep the metadata of the previous disc
+        self._movie_metadata = None
+        self._tv_metadata = None
+
         self._content_type = content_type
         self._logger.info(f"Fetching metadata from TMDB for id {tmdb_id}...")
 
@@ -136,6 +273,37 @@ class BlueRayRipper:
         elif self._content_type == "tv":
             self._tv_metadata = self._metadata_client.get_tv_details(tmdb_id)
 
+    def _deduplicate_titles(self):
+        """
+        Keeps only one title per group of titles playing the same segments, so obfuscated
+        playlists don't reach scoring and ripping.
+        """
+
+        index = SegmentIndex(self._titles)
+        titles = index.deduplicate()
+
+        for group in index.groups:
+            if not group["real"] or not group["variants"]:
+                continue
+
+            title = group["representative"]
+            self._logger.info(
+                f"Title {title} was judged the real playlist of "
+                f"{len(group['variants']) + 1} orderings of its segments"
+            )
+
+            if group["segments"] != sorted(group["segments"]):
+                self._logger.warn(
+                    f"No ordering of the segments of title {title} is ascending, the real "
+                    f"playlist was picked by segment coverage and title number only"
+                )
+
+        self._logger.info(
+            f"Deduplicated {len(self._titles)} titles into {len(titles)} segment groups"
+        )
+
+        self._titles = titles
+
     def _filter_streams(self):
         """
         Filters out titles that don't have any audio streams and titles that don't have any stream
@@ -187,6 +355,31 @@ class BlueRayRipper:
 
         return (self._main_feature, self._titles[self._main_feature])
 
+    @property
+    def rip_size(self):
+        """
+        Returns the number of bytes the next rip reads from the disc: the size of the episodes
+        if episodes were detected and the size of the main feature otherwise.
+        """
+
+        titles = self._episodes or (
+            [self._main_feature] if self._main_feature is not None else []
+        )
+
+        return sum(int(self._titles[t].get("disk_size_bytes", 0)) for t in titles)
+
+    @property
+    def candidates(self):
+        """
+        Returns the best main feature candidates of the last detection, best first.
+
+        Returns:
+            list[Candidate]: The candidates with their score and its per-metric breakdown.
+        """
+
+        return self._candidates
+
+    @span()
     def detect_main_feature(self):
         """
         Detects the main feature of the Blu-ray disc by analyzing various metrics such as
@@ -198,89 +391,110 @@ class BlueRayRipper:
 
         self._logger.info("Detecting main feature...")
 
-        metrics = self._create_title_metrics()
+        (titles, metrics) = self._create_title_metrics()
 
-        # Metrics weights: duration, chapters, subtitle_streams, audio_streams
-        weights = [0.81, 0.52, 0.089, 0.071, 0.030]
+        self._candidates = self._scorer.rank(titles, metrics, MAX_CANDIDATES)
+        self._logger.debug(f"Best main feature candidates: {self._candidates[:3]}")
 
-        # Largest of each metric, so we can normalize
-        max_of_field = list(
-            max(list(float(x[i]) for x in metrics)) for i in range(len(weights))
-        )
+        self._main_feature = self._candidates[0]["title"]
+        self._logger.info(f"Successfully detected main feature: {self._main_feature}")
 
-        # Prune out any titles shorter than 85% of longest title
-        metrics = list(filter(lambda x: x[0] > 0.85 * max_of_field[0], metrics))
+        return self
 
-        self._logger.info(f"Successfully pruned title metrics: {metrics}")
+    ################################################################################################
+    # Episode Detection                                                                            #
+    ################################################################################################
 
-        # Sort according to weighted sum of metrics
-        metrics = sorted(
-            metrics,
-            key=lambda row: sum(
-                row[i] * weights[i] / max_of_field[i] for i in range(len(metrics))
-            ),
-        )
+    @property
+    def episodes(self):
+        """
+        Returns the titles detected as episodes, in the order they are on the disc.
+        """
 
-        self._main_feature = metrics[0][-1]
-        self._logger.info(f"Successfully detected main feature: {self._main_feature}")
+        return self._episodes
+
+    @span()
+    def detect_episodes(self):
+        """
+        Detects the episodes of a TV disc as the titles whose duration matches the episode run
+        time from TMDB.
+
+        Raises:
+            ValueError: If no tv metadata was fetched or no title matches.
+
+        Returns:
+            The current instance of the BluRayRipper object.
+        """
+
+        if self._tv_metadata is None:
+            raise ValueError("No tv metadata was fetched.")
+
+        self._logger.info("Detecting episodes...")
+
+        run_time = self._tv_metadata.get("episode_run_time") * 60
+
+        tolerance = run_time * EPISODE_DURATION_TOLERANCE
+
+        self._episodes = []
+        for title, title_info in sorted(self._titles.items()):
+            duration = self._duration_to_seconds(title_info.get("duration", "0:00:00"))
+            if abs(duration - run_time) <= tolerance:
+                self._episodes.append(title)
+
+        if not self._episodes:
+            raise ValueError("No episodes were found on the disc.")
+
+        self._logger.info(f"Successfully detected episodes: {self._episodes}")
 
         return self
 
     def _create_title_metrics(self):
         """
-        Creates a list of metrics for each title in the Blu-ray disc.
-
-        Returns:
-        A list of tuples, where each tuple contains the following metrics for a title:
+        Creates the title x metric matrix of the Blu-ray disc, with the metrics in the order of
+        `METRICS`:
             - Duration (in seconds)
-            - Number of chapters
-            - Number of subtitles
+            - Negative difference between the duration and the runtime from TMDB (in seconds)
+            - Number of subtitle streams
             - Number of audio streams
-            - Title number
+            - Number of chapters
+
+        Returns:
+            tuple[list[int], np.ndarray]: The title numbers and their metrics.
         """
 
         if len(self._titles) == 0:
             raise ValueError("No titles were found on the disc.")
 
-        metrics: list[tuple[int, int, int, int, int, int]] = []
+        titles = list(self._titles.keys())
+        metrics = np.zeros((len(titles), len(METRICS)))
 
-        actual_runtime = 0
+        actual_runtime = None
         if self._movie_metadata is not None:
             actual_runtime = self._movie_metadata.get("runtime") * 60
 
-        for title, title_info in self._titles.items():
-            stream = aware(title_info.get("streams")).values()
+        for row, title_info in enumerate(self._titles.values()):
             duration = self._duration_to_seconds(title_info.get("duration", "0:00:00"))
-            duration_diff = -abs(actual_runtime - duration)
-            chapters = int(title_info.get("chapter_count", 0))
-            n_subtitle = len([s for s in stream if self._is_type(s, "subtitle")])
-            s_audio = len([s for s in stream if self._is_type(s, "audio")])
-            metrics.append(
-                (duration, duration_diff, n_subtitle, s_audio, chapters, title)
-            )
 
-        self._logger.debug(f"Successfully created title metrics: {metrics}")
+            subtitles = audio = 0
+            for stream in aware(title_info.get("streams")).values():
+                stream_type = stream.get("type", "").lower()
+                subtitles += "subtitle" in stream_type
+                audio += "audio" in stream_type
+
+            metrics[row] = (
+                duration,
+                -abs(actual_runtime - duration) if actual_runtime else 0,
+                subtitles,
+                audio,
+                int(title_info.get("chapter_count", 0)),
+            )
 
-        return metrics
+        return (titles, metrics)
 
     ################################################################################################
     # Various helper functions                                                                     #
     ################################################################################################
 
-    @staticmethod
-    def _is_type(stream: Stream, stream_type: str):
-        """
-        Check if the given stream is of the specified type.
-
-        Args:
-            - stream (Stream): The stream to check.
-            - stream_type (str): The type of stream to check for.
-
-        Returns:
-            bool: True if the stream is of the specified type, False otherwise.
-        """
-        return "type" in stream and stream_type in stream["type"].lower()
-
     @staticmethod
     def _duration_to_seconds(duration: str):
         """
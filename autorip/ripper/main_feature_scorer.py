@@ -0,0 +1,98 @@
+import numpy as np
+
+from ripper.models.candidate import Candidate
+
+# The metrics every title is scored by, higher values are better for all of them
+METRICS = ("duration", "runtime_match", "subtitles", "audio", "chapters")
+
+DEFAULT_WEIGHTS = {
+    "duration": 0.81,
+    "runtime_match": 0.52,
+    "subtitles": 0.089,
+    "audio": 0.071,
+    "chapters": 0.030,
+}
+
+DEFAULT_MIN_DURATION_RATIO = 0.85
+
+
+class MainFeatureScorer:
+    """
+    Ranks the titles of a disc by the weighted sum of their min-max normalized metrics, all
+    computed at once over a title x metric matrix. Titles shorter than a fraction of the longest
+    title are pruned before normalizing, so extras don't skew the scale.
+
+    Args:
+        - weights (dict[str, float] | None): The weight of every metric in `METRICS`, missing
+            metrics use the default weight.
+        - min_duration_ratio (float): Titles shorter than this fraction of the longest title
+            are pruned.
+    """
+
+    def __init__(
+        self,
+        weights: dict[str, float] | None = None,
+        min_duration_ratio: float = DEFAULT_MIN_DURATION_RATIO,
+    ):
+        weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+
+        unknown = set(weights) - set(METRICS)
+        if unknown:
+            raise ValueError(f"Unknown scoring metrics: {', '.join(sorted(unknown))}")
+
+        self._weights = np.array([weights[metric] for metric in METRICS])
+        self._min_duration_ratio = min_duration_ratio
+
+    def rank(
+        self, titles: list[int], metrics: np.ndarray, limit: int | None = None
+    ) -> list[Candidate]:
+        """
+        Scores the titles and returns the remaining candidates, best first. Titles with the same
+        score are ordered by their title number, so the result doesn't depend on the order of
+        the input.
+
+        Args:
+            - titles (list[int]): The title numbers, one per row of the metrics.
+            - metrics (np.ndarray): A title x metric matrix in the order of `METRICS`.
+            - limit (int | None): The maximum number of candidates to return, all if None.
+
+        Returns:
+            list[Candidate]: The candidates with their score and its per-metric breakdown.
+        """
+
+        if len(titles) == 0:
+            raise ValueError("No titles were found on the disc.")
+
+        title_numbers = np.asarray(titles)
+        metrics = np.asarray(metrics, dtype=np.float64)
+
+        durations = metrics[:, METRICS.index("duration")]
+        keep = durations >= self._min_duration_ratio * durations.max()
+
+        title_numbers, metrics = title_numbers[keep], metrics[keep]
+
+        low = metrics.min(axis=0)
+        span = metrics.max(axis=0) - low
+        # Metrics that are equal for all titles don't tell them apart
+        span[span == 0] = 1
+
+        breakdown = (metrics - low) / span * self._weights
+        scores = breakdown.sum(axis=1)
+
+        # Highest score first, lowest title number on ties
+        order = np.lexsort((title_numbers, -scores))[:limit]
+
+        return [
+            Candidate(
+                title=title,
+                score=score,
+                metrics=dict(zip(METRICS, row)),
+                breakdown=dict(zip(METRICS, contributions)),
+            )
+            for title, score, row, contributions in zip(
+                title_numbers[order].tolist(),
+                scores[order].tolist(),
+                metrics[order].tolist(),
+                breakdown[order].tolist(),
+            )
+        ]
@@ -0,0 +1,8 @@
+from typing import TypedDict
+
+
+class Candidate(TypedDict):
+    title: int
+    score: float
+    metrics: dict[str, float]
+    breakdown: dict[str, float]
@@ -0,0 +1,115 @@
+from typing import TypedDict
+
+from makemkv.models.disc_properties import Title
+
+
+class SegmentGroup(TypedDict):
+    segments: list[int]
+    titles: list[int]
+    representative: int
+    real: bool
+    variants: list[int]
+
+
+class SegmentIndex:
+    """
+    Groups the titles of a disc by the m2ts segments their playlist references, in playback
+    order. Playlist obfuscated discs contain hundreds of playlists which play the same segments
+    in a different order, only one of them in the order of the actual movie. Every group is
+    represented by its lowest title number, and of the groups playing the same set of segments
+    only the one most likely to be the real playlist is flagged as `real`:
+        - its segments are in ascending order, like they were authored
+        - it references every segment only once
+        - it has the lowest title number
+    The representatives of the other orderings are listed as its `variants`. Titles without a
+    segment map form a group of their own.
+
+    Args:
+        - titles (dict[int, Title]): The titles of the disc.
+    """
+
+    def __init__(self, titles: dict[int, Title]):
+        self._titles = titles
+        self._groups: list[SegmentGroup] = []
+
+        members: dict[tuple[int, ...] | int, list[int]] = {}
+
+        for title, title_info in titles.items():
+            segments = self._parse_segments(title_info.get("segments_map"))
+            key = tuple(segments) if segments else title
+            members.setdefault(key, []).append(title)
+
+        orderings: dict[frozenset[int] | int, list[SegmentGroup]] = {}
+
+        for key, group in members.items():
+            segments = list(key) if isinstance(key, tuple) else []
+            entry = SegmentGroup(
+                segments=segments,
+                titles=sorted(group),
+                representative=min(group),
+                real=True,
+                variants=[],
+            )
+            self._groups.append(entry)
+
+            ordering = frozenset(segments) if segments else entry["representative"]
+            orderings.setdefault(ordering, []).append(entry)
+
+        for variants in orderings.values():
+            real = max(variants, key=self._rank)
+
+            for entry in variants:
+                entry["real"] = entry is real
+
+            real["variants"] = sorted(
+                entry["representative"] for entry in variants if entry is not real
+            )
+
+        self._groups.sort(key=lambda g: g["representative"])
+
+    @property
+    def groups(self):
+        """
+        Returns the groups of titles playing the same segments in the same order, ordered by
+        representative.
+        """
+        return self._groups
+
+    def deduplicate(self) -> dict[int, Title]:
+        """
+        Returns only the representative title of every group flagged as the real playlist.
+        """
+
+        return {
+            group["representative"]: self._titles[group["representative"]]
+            for group in self._groups
+            if group["real"]
+        }
+
+    @staticmethod
+    def _rank(group: SegmentGroup):
+        segments = group["segments"]
+
+        monotonic = all(a < b for a, b in zip(segments, segments[1:]))
+        coverage = len(set(segments)) / len(segments) if segments else 0
+
+        return (monotonic, coverage, -group["representative"])
+
+    @staticmethod
+    def _parse_segments(segments_map: str | int | None) -> list[int]:
+        """
+        Parses a segment map like "10,11,12" or "1-3,7" into the list of segment numbers.
+        """
+
+        if segments_map is None or segments_map == "":
+            return []
+
+        segments: list[int] = []
+
+        for part in str(segments_map).split(","):
+            start, _, end = part.strip().partition("-")
+            if not start.isdigit() or (end and not end.isdigit()):
+                return []
+            segments += range(int(start), int(end or start) + 1)
+
+        return segments
@@ -0,0 +1,25 @@
+import tempfile
+
+from core.config import Config
+from core.logger import Logger
+from fakes.fake_tmdb import FakeTmdb
+from process.process_manager import ProcessManager
+from ripper.blueray_ripper import BlueRayRipper
+
+from benchmarks.fixtures import write_config
+
+
+def test_metadata_follows_the_latest_content_type():
+    with tempfile.TemporaryDirectory() as directory, FakeTmdb() as tmdb:
+        config = Config(write_config(directory, metadata={"tmdb_url": tmdb.url}))
+        logger = Logger(config)
+        ripper = BlueRayRipper(config, logger, ProcessManager(logger))
+
+        ripper.fetch_metadata(1, "movie")
+        assert ripper.metadata.get("title") == "Movie 1"
+
+        ripper.fetch_metadata(2, "tv")
+        assert ripper.metadata.get("name") == "Show 2"
+
+        ripper.fetch_metadata(3, "movie")
+        assert ripper.metadata.get("title") == "Movie 3"
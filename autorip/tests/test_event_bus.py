@@ -0,0 +1,25 @@
+import asyncio
+import threading
+
+from core.events.event_bus import EventBus
+
+
+def test_iterating_subscription_is_woken_up_by_other_threads():
+    bus = EventBus()
+
+    async def receive():
+        subscription = bus.subscribe()
+        publisher = threading.Timer(0.1, bus.publish, ("progress", "1"), {"value": 5})
+        publisher.start()
+
+        async for event in subscription:
+            return event
+
+    event = asyncio.run(asyncio.wait_for(receive(), timeout=5))
+
+    assert event is not None
+    assert (event["type"], event["key"], event["data"]) == (
+        "progress",
+        "1",
+        {"value": 5},
+    )
@@ -0,0 +1,37 @@
+import os
+import tempfile
+import threading
+
+from core.config import Config
+from core.logger import LogSampler, Logger
+
+from benchmarks.fixtures import write_config
+
+
+def test_threads_are_sampled_independently():
+    sampler = LogSampler([{"pattern": "^PRGV", "interval": 60}])
+    assert sampler.sample("PRGV:1") == "PRGV:1"
+    assert sampler.sample("PRGV:2") is None
+
+    results: list[str | None] = []
+    for _ in range(2):
+        thread = threading.Thread(
+            target=lambda: results.append(sampler.sample("PRGV:3"))
+        )
+        thread.start()
+        thread.join()
+
+    # Every short-lived thread starts with a fresh state instead of sharing the main one
+    assert results == ["PRGV:3", "PRGV:3"]
+    assert sampler.sample("PRGV:4") is None
+
+
+def test_file_output_is_off_by_default():
+    with tempfile.TemporaryDirectory() as directory:
+        config = Config(write_config(directory))
+        logger = Logger(config)
+        logger.info("message")
+        logger.flush()
+
+        logging_dir = config.get["output"]["logging_dir"]
+        assert not os.path.exists(os.path.join(logging_dir, "autorip.log"))
@@ -0,0 +1,48 @@
+import os
+import tempfile
+import threading
+
+import pytest
+
+from core.config import Config
+from core.logger import Logger
+from process.async_process_manager import ProcessCancelledException
+from process.output_capture import FileCapture
+from process.process_manager import ProcessManager
+
+from benchmarks.fixtures import write_config
+
+
+class ClosingCapture(FileCapture):
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.closed = False
+
+    def close(self):
+        super().close()
+        self.closed = True
+
+
+def test_captures_are_closed_if_the_spawn_fails():
+    with tempfile.TemporaryDirectory() as directory:
+        manager = ProcessManager(Logger(Config(write_config(directory))))
+        stdout = ClosingCapture(os.path.join(directory, "stdout.log"))
+        stderr = ClosingCapture(os.path.join(directory, "stderr.log"))
+
+        with pytest.raises(FileNotFoundError):
+            manager.call(["autorip-missing-binary"], stdout=stdout, stderr=stderr)
+
+        assert stdout.closed and stderr.closed
+
+
+def test_captures_are_closed_if_cancelled_before_the_spawn():
+    with tempfile.TemporaryDirectory() as directory:
+        manager = ProcessManager(Logger(Config(write_config(directory))))
+        stdout = ClosingCapture(os.path.join(directory, "stdout.log"))
+        cancel = threading.Event()
+        cancel.set()
+
+        with pytest.raises(ProcessCancelledException):
+            manager.call(["true"], stdout=stdout, cancel=cancel)
+
+        assert stdout.closed
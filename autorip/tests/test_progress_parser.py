@@ -0,0 +1,31 @@
+import json
+
+from handbrake.parsers.progress_parser import HandbrakeProgressParser
+
+from benchmarks.fixtures import handbrake_progress_lines
+
+
+def parse(lines: list[str]):
+    parser = HandbrakeProgressParser()
+    return [record for line in lines if (record := parser.feed(line)) is not None]
+
+
+def test_multi_line_blocks_match_their_json():
+    lines = handbrake_progress_lines(blocks=40, passes=2)
+    records = parse(lines)
+
+    working = [record for record in records if record["state"] == "WORKING"]
+    assert len(working) == 40
+    assert [record["pass_number"] for record in working] == [1] * 20 + [2] * 20
+    assert all(record["pass_count"] == 2 for record in working)
+    assert working[1]["progress"] == 1 / 20
+    assert [record["state"] for record in records[-2:]] == ["MUXING", "WORKDONE"]
+
+
+def test_single_line_and_truncated_blocks():
+    block = {"State": "MUXING", "Muxing": {"Progress": 0.5}}
+    lines = ["Progress: {", '"State": "WORKING",', f"Progress: {json.dumps(block)}"]
+
+    [record] = parse(lines)
+    assert record["state"] == "MUXING"
+    assert record["progress"] == 0.5
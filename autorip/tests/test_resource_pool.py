@@ -0,0 +1,67 @@
+import tempfile
+import threading
+import time
+
+import pytest
+
+from core.config import Config
+from core.logger import Logger
+from core.utils.typing_utils import aware
+from process.async_process_manager import ProcessCancelledException
+from process.process_manager import ProcessManager
+from process.resource_pool import FairSemaphore
+
+from benchmarks.fixtures import write_config
+
+
+def test_abandoned_waiter_gives_up_its_place():
+    semaphore = FairSemaphore(1)
+    held = aware(semaphore.acquire())
+    cancel = threading.Event()
+    results: list[int | None] = []
+
+    abandoned = threading.Thread(
+        target=lambda: results.append(semaphore.acquire(cancel))
+    )
+    abandoned.start()
+
+    while semaphore.waiting < 1:
+        time.sleep(0.01)
+
+    semaphore.abandon(cancel)
+    abandoned.join(timeout=1)
+
+    assert not abandoned.is_alive()
+    assert results == [None]
+    assert semaphore.waiting == 0
+
+    semaphore.release(held)
+    assert semaphore.acquire() == held
+
+
+def test_cancelled_call_doesnt_wait_for_a_slot():
+    with tempfile.TemporaryDirectory() as directory:
+        logger = Logger(Config(write_config(directory)))
+        manager = ProcessManager(logger, {"sleep": {"executable": "sleep", "limit": 1}})
+
+        holder = threading.Thread(target=manager.call, args=(["sleep", "2"],))
+        holder.start()
+
+        pool = manager.find_pool(["sleep"])
+        semaphore = pool.semaphore(["sleep"]) if pool is not None else None
+        assert semaphore is not None
+
+        while not manager.process_counts():
+            time.sleep(0.01)
+
+        cancel = threading.Event()
+        threading.Timer(0.3, cancel.set).start()
+        started = time.monotonic()
+
+        with pytest.raises(ProcessCancelledException):
+            manager.call(["sleep", "0"], cancel=cancel)
+
+        assert time.monotonic() - started < 1.5
+        assert semaphore.waiting == 0
+
+        holder.join()
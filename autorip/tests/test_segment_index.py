@@ -0,0 +1,23 @@
+from makemkv.models.disc_properties import Title
+from ripper.segment_index import SegmentIndex
+
+
+def test_orderings_of_the_same_segments_are_kept_apart():
+    index = SegmentIndex(
+        {
+            0: Title(segments_map="12,10,11"),
+            1: Title(segments_map="10-12"),
+            2: Title(segments_map="11,12,10"),
+            3: Title(segments_map="10,11,12"),
+            4: Title(segments_map="20"),
+        }
+    )
+
+    assert [group["titles"] for group in index.groups] == [[0], [1, 3], [2], [4]]
+
+    real = [group for group in index.groups if group["real"]]
+    assert [(group["representative"], group["variants"]) for group in real] == [
+        (1, [0, 2]),
+        (4, []),
+    ]
+    assert list(index.deduplicate()) == [1, 4]
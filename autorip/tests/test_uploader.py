@@ -0,0 +1,55 @@
+import hashlib
+import os
+import tempfile
+
+import pytest
+from core.config import Config
+from core.logger import Logger
+from core.utils import file_utils
+from media_management.uploader import Uploader
+
+from benchmarks.fixtures import write_config
+
+METADATA = {"name": "Show", "first_air_date": "2018-01-01"}
+
+
+@pytest.mark.parametrize("verify_copy", [False, True])
+def test_upload_hashes_without_leaving_the_kernel_copy(
+    monkeypatch: pytest.MonkeyPatch, verify_copy: bool
+):
+    used: list[str] = []
+    copy_kernel = file_utils._copy_kernel  # pyright: ignore[reportPrivateUsage]
+
+    def spy_kernel(*args: object, **kwargs: object):
+        used.append("kernel")
+        return copy_kernel(*args, **kwargs)  # type: ignore
+
+    def spy_buffered(*_: object, **__: object):
+        used.append("readinto")
+        raise AssertionError("the upload fell back to the read/write loop")
+
+    monkeypatch.setattr(file_utils, "_copy_kernel", spy_kernel)
+    monkeypatch.setattr(file_utils, "_copy_buffered", spy_buffered)
+
+    with tempfile.TemporaryDirectory() as directory:
+        tv_dir = os.path.join(directory, "tv")
+        config = Config(
+            write_config(
+                directory, media={"tv_dir": tv_dir, "verify_copy": verify_copy}
+            )
+        )
+        uploader = Uploader(config, Logger(config))
+
+        source = os.path.join(directory, "episode.mkv")
+        data = os.urandom(3 * 1024 * 1024 + 17)
+        with open(source, "wb") as f:
+            f.write(data)
+
+        checksum = uploader.upload_file(source, 1, "tv", metadata=METADATA)  # type: ignore
+
+        copied = os.path.join(tv_dir, "Show (2018-01-01)", "episode.mkv")
+        with open(copied, "rb") as f:
+            assert f.read() == data
+
+    assert used and set(used) == {"kernel"}
+    assert checksum == f"blake2b:{hashlib.blake2b(data).hexdigest()}"
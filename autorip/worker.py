@@ -0,0 +1,267 @@
+"""
+Remote encode worker. Leases encodes from an autorip coordinator, downloads the ripped file,
+encodes it with the local HandBrakeCLI and presets, and uploads the result:
+
+    AUTORIP_CONFIG=worker.toml python worker.py http://nas:8000 --name gpu-box
+"""
+
+import argparse
+import os
+import shutil
+import threading
+import time
+
+import requests
+from core.config import Config
+from core.logger import Logger
+from handbrake.handbrake_wrapper import HandbrakeWrapper
+from jobs.models.lease import Lease
+from process.process_manager import ProcessManager
+
+CHUNK_SIZE = 8 * 1024 * 1024
+
+# Seconds to wait for the coordinator to accept a connection and between two reads, so a hung
+# coordinator can't block the claim loop and the heartbeats forever
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 60
+
+
+class EncodeWorker:
+    """
+    Polls a coordinator for encode leases and processes them one after another.
+
+    Args:
+        - coordinator (str): The base URL of the coordinator.
+        - name (str): The name the worker registers with.
+        - config (Config): The configuration providing the presets and working directory.
+        - logger (Logger): The logger object.
+        - poll_interval (float): The seconds to wait after an empty lease request.
+        - heartbeat_interval (float): The seconds between heartbeats of an active lease.
+    """
+
+    def __init__(
+        self,
+        coordinator: str,
+        name: str,
+        config: Config,
+        logger: Logger,
+        poll_interval: float = 5,
+        heartbeat_interval: float = 10,
+    ):
+        self._coordinator = coordinator.rstrip("/")
+        self._name = name
+        self._logger = logger
+        self._poll_interval = poll_interval
+        self._heartbeat_interval = heartbeat_interval
+
+        self._session = requests.Session()
+        self._encoder = HandbrakeWrapper(config, logger, ProcessManager(logger))
+        self._working_dir = os.path.join(config.get["output"]["working_dir"], "worker")
+
+        self._worker_id: str | None = None
+        self._progress = (0.0, 0.0)
+
+    def run(self):
+        while True:
+            try:
+                lease = self._lease()
+            except requests.RequestException as e:
+                self._logger.error(f"Coordinator not reachable: {e}")
+                time.sleep(self._poll_interval)
+                continue
+
+            if lease is None:
+                time.sleep(self._poll_interval)
+                continue
+
+            self._process(lease)
+
+    def _lease(self) -> Lease | None:
+        if self._worker_id is None:
+            response = self._post("/workers", name=self._name)
+            self._worker_id = response["data"]["worker_id"]
+            self._logger.info(f"Registered as worker {self._worker_id}")
+
+        response = self._post(f"/workers/{self._worker_id}/lease")
+
+        # The coordinator restarted or forgot about the worker
+        if response["status"] == 404:
+            self._worker_id = None
+            return self._lease()
+
+        return response["data"]
+
+    def _process(self, lease: Lease):
+        self._logger.info(f"Leased encode of job {lease['job_id']}")
+
+        lease_dir = os.path.join(self._working_dir, lease["id"])
+        input_file = os.path.join(lease_dir, lease["input_name"])
+        output_file = os.path.join(lease_dir, f"encoded-{lease['input_name']}")
+
+        self._progress = (0.0, 0.0)
+        stop = threading.Event()
+        lost = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(lease, stop, lost))
+        heartbeat.start()
+
+        try:
+            os.makedirs(lease_dir, exist_ok=True)
+            self._download(lease, input_file, lost)
+            self._encoder.encode_file(
+                input_file,
+                output_file,
+                lease["preset_type"],
+                self._on_progress,
+                cancel=lost,
+            )
+            self._upload(lease, output_file)
+            self._logger.info(f"Completed encode of job {lease['job_id']}")
+
+        except Exception as e:
+            # The coordinator gave the encode to another worker or encodes it itself
+            if lost.is_set():
+                self._logger.warn(f"Abandoned encode of job {lease['job_id']}")
+                return
+
+            self._logger.error(f"Encode of job {lease['job_id']} failed: {e}")
+            try:
+                self._post(f"/leases/{lease['id']}/fail", error=str(e))
+            except requests.RequestException:
+                pass
+
+        finally:
+            stop.set()
+            heartbeat.join()
+            shutil.rmtree(lease_dir, ignore_errors=True)
+
+    def _download(self, lease: Lease, path: str, lost: threading.Event):
+        """
+        Downloads the file to encode, resuming interrupted transfers with range requests until
+        the lease is lost.
+        """
+
+        url = f"{self._coordinator}/leases/{lease['id']}/input"
+
+        while (offset := self._size(path)) < lease["input_size"]:
+            if lost.is_set():
+                raise ValueError(f"Lease of job {lease['job_id']} was lost")
+
+            headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+            try:
+                with self._session.get(
+                    url,
+                    headers=headers,
+                    stream=True,
+                    timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+                ) as response:
+                    response.raise_for_status()
+
+                    # The coordinator ignored the range, start from the beginning
+                    mode = "ab" if response.status_code == 206 else "wb"
+
+                    with open(path, mode) as f:
+                        for chunk in response.iter_content(CHUNK_SIZE):
+                            f.write(chunk)
+
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._logger.warn(f"Download interrupted at {offset} bytes: {e}")
+                time.sleep(self._poll_interval)
+
+    def _upload(self, lease: Lease, path: str):
+        with open(path, "rb") as f:
+            response = self._session.put(
+                f"{self._coordinator}/leases/{lease['id']}/result",
+                data=f,
+                timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+            )
+
+        response.raise_for_status()
+
+        if response.json()["status"] != 200:
+            raise ValueError(response.json()["msg"])
+
+    def _heartbeat(self, lease: Lease, stop: threading.Event, lost: threading.Event):
+        """
+        Keeps the lease alive until stopped. Sets `lost` once the coordinator no longer knows
+        the lease, e.g. because it expired, or once no heartbeat got through for as long as
+        the lease lasts, after which the coordinator expired it, which stops the encode.
+        """
+
+        renewed_at = time.monotonic()
+
+        while not stop.wait(self._heartbeat_interval):
+            (progress, eta) = self._progress
+
+            try:
+                # A heartbeat arriving after the next one is due is of no use
+                response = self._post(
+                    f"/leases/{lease['id']}/heartbeat",
+                    timeout=self._heartbeat_interval,
+                    progress=progress,
+                    eta=eta,
+                )
+            except requests.RequestException as e:
+                self._logger.warn(f"Heartbeat failed: {e}")
+
+                if time.monotonic() - renewed_at >= lease["expires_in"]:
+                    self._logger.warn(
+                        f"Lease of job {lease['job_id']} expired without heartbeats, stopping"
+                    )
+                    lost.set()
+                    return
+
+                continue
+
+            renewed_at = time.monotonic()
+
+            if response["status"] == 404:
+                self._logger.warn(f"Lease of job {lease['job_id']} expired, stopping")
+                lost.set()
+                return
+
+    def _on_progress(self, key: str, value: float):
+        (progress, eta) = self._progress
+
+        if key == "progress":
+            self._progress = (value, eta)
+        elif key == "eta":
+            self._progress = (progress, value)
+
+    def _post(self, path: str, timeout: float = READ_TIMEOUT, **params: str | float):
+        response = self._session.post(
+            f"{self._coordinator}{path}",
+            params=params,
+            timeout=(CONNECT_TIMEOUT, timeout),
+        )
+        response.raise_for_status()
+        return response.json()
+
+    @staticmethod
+    def _size(path: str):
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remote autorip encode worker")
+    parser.add_argument("coordinator", help="base URL of the autorip coordinator")
+    parser.add_argument("--name", default=os.uname().nodename)
+    parser.add_argument("--poll-interval", type=float, default=5)
+    parser.add_argument("--heartbeat-interval", type=float, default=10)
+    args = parser.parse_args()
+
+    config = Config(os.environ.get("AUTORIP_CONFIG", "autorip.toml"))
+    logger = Logger(config)
+
+    EncodeWorker(
+        args.coordinator,
+        args.name,
+        config,
+        logger,
+        args.poll_interval,
+        args.heartbeat_interval,
+    ).run()
+
+
+if __name__ == "__main__":
+    main()